@@ -0,0 +1,133 @@
+"""
+로컬 임베딩 가속 경로 벤치마크. (src/local_accel.py)
+
+같은 텍스트로 기존 SentenceTransformer.encode(none) 과 가속 경로(fp32 / int8 / onnx / onnx-int8)를
+비교한다. API 호출 없음. onnx 계열은 python -m src.local_accel --model ... 로 먼저 export.
+
+사용법 (backend 디렉터리에서):
+
+    (SKY_venv) $ python bench_local_embed.py --model BAAI/bge-m3 \
+        --accel none,fp32,int8,onnx,onnx-int8 --threads 4 --n 512 --out local_embed.json
+
+결과 (variant 별):
+    load_s                    모델 로드 시간
+    single_ms                 텍스트 1건 encode 지연 분포 (/analyze 단건 경로)
+    batch_texts_per_s         n 건을 한 번에 encode 한 처리량 (precompute / micro-batch 경로)
+    padding_ratio             bucketing 후 padding 토큰 비율 (가속 경로만)
+    drift_cos_mean / _min     기준(none) 벡터와의 코사인 유사도
+"""
+
+import os
+import json
+import time
+import argparse
+import platform
+
+import numpy as np
+
+from bench_analyze import synth_attack, synth_normal, percentiles
+from src.local_accel import ACCEL_MODES, load_local_encoder
+
+
+def make_texts(n, seed=0):
+    """짧은 질문부터 여러 문단 길이까지 섞어 padding 낭비가 드러나게 한다."""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for i in range(n):
+        text = synth_attack(rng, i) if rng.random() < 0.5 else synth_normal(rng, i)
+        repeat = int(rng.choice([1, 1, 1, 2, 4, 8, 16]))
+        extra = [synth_normal(rng, i + k) for k in range(repeat - 1)]
+        texts.append(". ".join([text, *extra]))
+    return texts
+
+
+def cosine_rows(a, b):
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return (a * b).sum(axis=1)
+
+
+def run_variant(model, accel, texts, single, threads, batch_size):
+    t0 = time.perf_counter()
+    encoder = load_local_encoder(model, accel=accel, threads=threads, batch_size=batch_size)
+    load_s = time.perf_counter() - t0
+
+    encoder.encode(texts[:4])   # warmup (첫 호출의 graph 최적화 / 메모리 할당 제외)
+
+    timings = []
+    for text in texts[:single]:
+        t0 = time.perf_counter()
+        encoder.encode([text])
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    vecs = np.asarray(encoder.encode(texts), dtype="float32")
+    batch_s = time.perf_counter() - t0
+
+    return vecs, {
+        "accel": accel,
+        "load_s": round(load_s, 3),
+        "single_ms": percentiles(timings),
+        "batch_s": round(batch_s, 3),
+        "batch_texts_per_s": round(len(texts) / max(batch_s, 1e-9), 1),
+        "padding_ratio": (round(encoder.last_padding_ratio, 4)
+                          if getattr(encoder, "last_padding_ratio", None) is not None else None),
+        "dim": int(vecs.shape[1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="sentence-transformers/all-MiniLM-L6-v2",
+                        help="HF 모델 이름 (Embedder 의 LOCAL_MODELS 중 하나)")
+    parser.add_argument("--accel", type=str, default="none,fp32,int8",
+                        help=f"비교할 경로 (첫 번째가 drift 기준, 가능: {', '.join(ACCEL_MODES)})")
+    parser.add_argument("--n", type=int, default=512, help="처리량 / drift 측정 텍스트 수")
+    parser.add_argument("--single", type=int, default=100, help="단건 지연 측정 횟수")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("SKYSHIELD_LOCAL_THREADS", "0")))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=None)
+    args = parser.parse_args()
+
+    texts = make_texts(args.n, seed=args.seed)
+    accels = [a.strip() for a in args.accel.split(",") if a.strip()]
+
+    results, reference = [], None
+    for accel in accels:
+        try:
+            vecs, row = run_variant(args.model, accel, texts, args.single, args.threads, args.batch_size)
+        except RuntimeError as e:
+            # 패키지 미설치 / ONNX 미export 는 건너뛰고 나머지만 비교
+            print(f"[{accel}] 건너뜀: {e}")
+            continue
+
+        if reference is None:
+            reference = vecs
+        if vecs.shape == reference.shape:
+            cos = cosine_rows(vecs, reference)
+            row["drift_cos_mean"] = round(float(cos.mean()), 6)
+            row["drift_cos_min"] = round(float(cos.min()), 6)
+        results.append(row)
+
+        single = row["single_ms"]
+        print(f"{accel:10s} load={row['load_s']}s single p50={single.get('p50')}ms "
+              f"p95={single.get('p95')}ms batch={row['batch_texts_per_s']}/s "
+              f"pad={row['padding_ratio']} cos_min={row.get('drift_cos_min')}")
+
+    if args.out:
+        report = {
+            "model": args.model,
+            "n_texts": len(texts),
+            "threads": args.threads,
+            "batch_size": args.batch_size,
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+base_threshold / sensitivity / 길이 S-curve 오프라인 보정. (src/calibration.py)
+
+사전 계산된 공격 벡터(npy)와 정상 벡터(memmap)로 점수를 한 번만 계산하고
+격자 전체를 벡터 연산으로 평가해 ROC / PR 표와 추천 운영점을 JSON 으로 저장한다.
+API 호출은 없다.
+
+사용법 (backend 디렉터리에서):
+
+    (SKY_venv) $ python calibrate_thresholds.py --embed-model "OpenAI Embedding" --summ-model OpenAI
+
+    # 여러 모델, 정상 샘플 5만 개만, S-curve 크기도 함께 탐색
+    (SKY_venv) $ python calibrate_thresholds.py --embed-model "OpenAI Embedding" \
+        --embed-model "BAAI/bge-m3" --max-normals 50000 --boosts 0.0,0.12,0.18,0.24
+
+결과: precomputed/calibration/calibration_{model}.json
+    score_curves : score_basic 임계값별 TPR / FPR / precision + AUC
+    grid         : 격자점별 block / flag 지표
+    recommended  : current (UI 기본값) / max_f1 / fpr_target / flag_fpr_target
+"""
+
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from src.calibration import (
+    DEFAULT_BASE_THRESHOLDS,
+    DEFAULT_BOOSTS,
+    DEFAULT_SENSITIVITIES,
+    attack_scores,
+    cluster_scores,
+    evaluate_grid,
+    normal_scores,
+    recommend,
+    score_curves,
+)
+from src.artifacts import load_cluster_artifact
+from src.utils import (
+    PRE_DIR,
+    cluster_artifact_path,
+    load_attack_vectors,
+    load_attack_texts,
+    load_normal_memmap,
+    load_normal_texts,
+    safe_name,
+)
+
+
+def parse_floats(value):
+    return [float(x) for x in value.split(",") if x.strip()]
+
+
+def load_analyzer(embed_model, summ_model):
+    """클러스터 아티팩트가 있으면 analyzer, 없으면 None (SkyShield 기본 판정만 보정)."""
+    if not summ_model:
+        return None
+    path = cluster_artifact_path(embed_model, summ_model)
+    if not (path / "manifest.json").exists():
+        print(f"[calibrate] 클러스터 아티팩트 없음 → 클러스터 단계 제외: {path}")
+        return None
+    analyzer, _, _ = load_cluster_artifact(path, verify=False)
+    return analyzer
+
+
+def text_lengths(texts, n, fixed_length, kind):
+    if fixed_length is not None:
+        return np.full(n, fixed_length, dtype="float64")
+    if len(texts) != n:
+        raise RuntimeError(
+            f"{kind} 텍스트 수({len(texts)})와 벡터 수({n})가 다릅니다. "
+            f"precompute 를 다시 실행하거나 --fixed-length 를 지정하세요."
+        )
+    return np.array([len(t) for t in texts], dtype="float64")
+
+
+def calibrate(embed_model, summ_model, base_thresholds, sensitivities, boosts,
+              max_normals=None, fixed_length=None, target_fpr=0.01, seed=0):
+    t0 = time.perf_counter()
+    atk_vec = load_attack_vectors(embed_model)
+    norm_mem = load_normal_memmap(embed_model)
+    analyzer = load_analyzer(embed_model, summ_model)
+
+    atk_texts, norm_texts = (([], []) if fixed_length is not None
+                             else (load_attack_texts(), load_normal_texts()))
+    atk_len = text_lengths(atk_texts, len(atk_vec), fixed_length, "공격")
+    norm_len = text_lengths(norm_texts, norm_mem.shape[0], fixed_length, "정상")
+
+    rows = None
+    if max_normals and norm_mem.shape[0] > max_normals:
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(norm_mem.shape[0], max_normals, replace=False))
+        norm_len = norm_len[rows]
+
+    # 1) 점수: 공격은 leave-one-out, 정상은 memmap chunk 스캔 1회
+    atk_basic = attack_scores(atk_vec)
+    atk_cluster = cluster_scores(analyzer, atk_vec)
+    norm_basic, norm_cluster = normal_scores(norm_mem, atk_vec, analyzer, rows=rows)
+    t_scores = time.perf_counter() - t0
+
+    scores = np.concatenate([atk_basic, norm_basic])
+    labels = np.concatenate([np.ones(len(atk_basic), "int8"), np.zeros(len(norm_basic), "int8")])
+    lengths = np.concatenate([atk_len, norm_len])
+    cluster_sims = None if analyzer is None else np.concatenate([atk_cluster, norm_cluster])
+
+    # 2) 격자
+    grid = evaluate_grid(scores, labels, lengths, cluster_sims,
+                         base_thresholds=base_thresholds,
+                         sensitivities=sensitivities, boosts=boosts)
+    t_total = time.perf_counter() - t0
+
+    return {
+        "embed_model": embed_model,
+        "summ_model": summ_model if analyzer is not None else None,
+        "n_attacks": int(len(atk_basic)),
+        "n_normals": int(len(norm_basic)),
+        "n_normals_total": int(norm_mem.shape[0]),
+        "fixed_length": fixed_length,
+        "timing_s": {"scores": round(t_scores, 3), "total": round(t_total, 3)},
+        "score_curves": score_curves(scores, labels),
+        "grid": grid,
+        "recommended": recommend(grid, target_fpr=target_fpr),
+    }
+
+
+def describe(name, row):
+    if row is None:
+        return f"  {name:16s} -"
+    sens = "-" if row["sensitivity"] is None else f"{row['sensitivity']:.2f}"
+    return (
+        f"  {name:16s} base={row['base_threshold']:.2f} sens={sens} boost={row['boost']:.2f} | "
+        f"block tpr={row['block']['tpr']:.3f} fpr={row['block']['fpr']:.4f} "
+        f"f1={row['block']['f1']:.3f} | flag tpr={row['flag']['tpr']:.3f} "
+        f"fpr={row['flag']['fpr']:.4f} | review={row['review_rate']:.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-model", type=str, action="append", default=[],
+                        help="보정할 임베딩 모델 (여러 번 지정 가능, 기본 OpenAI Embedding)")
+    parser.add_argument("--summ-model", type=str, default="OpenAI",
+                        help="클러스터 아티팩트의 요약 모델 ('' 이면 클러스터 단계 제외)")
+    parser.add_argument("--base-thresholds", type=parse_floats,
+                        default=list(DEFAULT_BASE_THRESHOLDS))
+    parser.add_argument("--sensitivities", type=parse_floats,
+                        default=list(DEFAULT_SENSITIVITIES))
+    parser.add_argument("--boosts", type=parse_floats, default=list(DEFAULT_BOOSTS),
+                        help="길이 S-curve 최대 boost 후보 (기본 0.18)")
+    parser.add_argument("--max-normals", type=int, default=None,
+                        help="정상 샘플 상한 (무작위 추출, 기본 전체)")
+    parser.add_argument("--fixed-length", type=float, default=None,
+                        help="텍스트 대신 모든 샘플에 이 길이를 사용 (텍스트와 벡터가 맞지 않을 때)")
+    parser.add_argument("--target-fpr", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", type=str, default=str(PRE_DIR / "calibration"))
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    for embed_model in args.embed_model or ["OpenAI Embedding"]:
+        report = calibrate(
+            embed_model, args.summ_model,
+            base_thresholds=args.base_thresholds,
+            sensitivities=args.sensitivities,
+            boosts=args.boosts,
+            max_normals=args.max_normals,
+            fixed_length=args.fixed_length,
+            target_fpr=args.target_fpr,
+            seed=args.seed,
+        )
+        out_path = out_dir / f"calibration_{safe_name(embed_model)}.json"
+        with open(out_path, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        rec = report["recommended"]
+        print(f"[{embed_model}] attacks={report['n_attacks']} normals={report['n_normals']} "
+              f"auc={report['score_curves']['auc']} grid={len(report['grid'])} "
+              f"({report['timing_s']['total']}s) → {out_path}")
+        print(describe("current", rec["current"]))
+        print(describe("max_f1", rec["max_f1"]))
+        print(describe(f"fpr<={rec['target_fpr']}", rec["fpr_target"]))
+        print(describe(f"flag fpr<={rec['target_fpr']}", rec["flag_fpr_target"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+축소 차원 임베딩의 정확도 비교 (전체 차원 대비). (src/reduction.py)
+
+기본 모델의 사전 계산 벡터(라벨 CSV 의 공격 / 정상 텍스트)를 메모리에서 잘라내거나
+PCA 로 투영해 SkyShield 점수(score_basic)를 다시 계산하고 전체 차원과 비교한다. API 호출 없음.
+
+사용법 (backend 디렉터리에서):
+
+    (SKY_venv) $ python eval_reduction.py --embed-model "OpenAI Embedding" \
+        --dims 256,512,1024 --kinds truncate,pca --max-normals 50000
+
+결과 (variant 별):
+    auc / best_f1 / tpr_at_fpr   : score_basic 의 분리 성능
+    score_corr                   : 전체 차원 score_basic 과의 상관계수
+    decision_agreement           : base_threshold 에서 BLOCK / REVIEW / ALLOW 일치율
+    bytes_per_vector / normal_mb : 저장 / 캐시 크기
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+
+from src.calibration import attack_scores, normal_scores, score_curves
+from src.detector import SkyShield
+from src.reduction import REDUCTION_SEP, Reduction, fit_pca
+from src.utils import load_attack_vectors, load_normal_memmap, reduction_path
+
+
+def decisions(scores, threshold):
+    return np.where(scores >= threshold, 2, np.where(scores >= threshold * SkyShield.REVIEW_RATIO, 1, 0))
+
+
+def tpr_at_fpr(pos, neg, target_fpr):
+    thr = np.quantile(neg, 1.0 - target_fpr) if len(neg) else 1.0
+    return float((pos > thr).mean()) if len(pos) else 0.0, float(thr)
+
+
+def make_reduction(embed_model, kind, dim, atk_full, norm_full, fit_rows):
+    if kind == "truncate":
+        return Reduction("truncate", dim)
+
+    # precompute 로 저장된 투영이 있으면 그대로 사용 (서빙과 같은 행렬)
+    path = reduction_path(f"{embed_model}{REDUCTION_SEP}pca{dim}")
+    if path.exists():
+        return Reduction.load(path)
+    return fit_pca([atk_full, norm_full[fit_rows]], dim)
+
+
+def evaluate(name, reduction, atk_full, norm_full, rows, full_scores, base_threshold, target_fpr):
+    t0 = time.perf_counter()
+    transform = reduction.apply if reduction is not None else None
+    atk = atk_full if reduction is None else reduction.apply(atk_full)
+    pos = attack_scores(atk)
+    neg, _ = normal_scores(norm_full, atk, rows=rows, transform=transform)
+    elapsed = time.perf_counter() - t0
+
+    scores = np.concatenate([pos, neg])
+    labels = np.concatenate([np.ones(len(pos), "int8"), np.zeros(len(neg), "int8")])
+    curves = score_curves(scores, labels)
+    f1s = [
+        2 * r["precision"] * r["tpr"] / (r["precision"] + r["tpr"])
+        for r in curves["table"] if r["precision"] + r["tpr"] > 0
+    ]
+    tpr, thr = tpr_at_fpr(pos, neg, target_fpr)
+    dim = atk.shape[1]
+
+    out = {
+        "variant": name,
+        "dim": int(dim),
+        "auc": curves["auc"],
+        "best_f1": round(max(f1s), 6) if f1s else 0.0,
+        "tpr_at_fpr": round(tpr, 6),
+        "threshold_at_fpr": round(thr, 6),
+        "bytes_per_vector": int(dim * 4),
+        "normal_mb": round(norm_full.shape[0] * dim * 4 / 1e6, 1),
+        "score_s": round(elapsed, 3),
+    }
+    if full_scores is not None:
+        out["score_corr"] = round(float(np.corrcoef(scores, full_scores)[0, 1]), 6)
+        out["decision_agreement"] = round(float(
+            (decisions(scores, base_threshold) == decisions(full_scores, base_threshold)).mean()
+        ), 6)
+    if getattr(reduction, "explained_variance", None) is not None:
+        out["explained_variance"] = round(reduction.explained_variance, 6)
+    return out, scores
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-model", type=str, default="OpenAI Embedding",
+                        help="전체 차원 기본 모델 (precompute 완료 상태)")
+    parser.add_argument("--dims", type=str, default="256,512,1024")
+    parser.add_argument("--kinds", type=str, default="truncate,pca")
+    parser.add_argument("--max-normals", type=int, default=50_000,
+                        help="비교에 쓸 정상 샘플 수 (무작위, 0 = 전체)")
+    parser.add_argument("--pca-fit-rows", type=int, default=20_000,
+                        help="저장된 투영이 없을 때 PCA 학습에 쓸 정상 샘플 수")
+    parser.add_argument("--base-threshold", type=float, default=0.40)
+    parser.add_argument("--target-fpr", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=None)
+    args = parser.parse_args()
+
+    atk_full = load_attack_vectors(args.embed_model)
+    norm_full = load_normal_memmap(args.embed_model)
+    n_norm = norm_full.shape[0]
+
+    rng = np.random.default_rng(args.seed)
+    rows = None
+    if args.max_normals and n_norm > args.max_normals:
+        rows = np.sort(rng.choice(n_norm, args.max_normals, replace=False))
+    fit_rows = np.sort(rng.choice(n_norm, min(args.pca_fit_rows, n_norm), replace=False))
+
+    results = []
+    full, full_scores = evaluate("full", None, atk_full, norm_full, rows, None,
+                                 args.base_threshold, args.target_fpr)
+    results.append(full)
+
+    dims = [int(d) for d in args.dims.split(",") if d.strip()]
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    for kind in kinds:
+        for dim in dims:
+            if dim >= atk_full.shape[1]:
+                continue
+            reduction = make_reduction(args.embed_model, kind, dim, atk_full, norm_full, fit_rows)
+            name = f"{args.embed_model}{REDUCTION_SEP}{reduction.name}"
+            row, _ = evaluate(name, reduction, atk_full, norm_full, rows, full_scores,
+                              args.base_threshold, args.target_fpr)
+            results.append(row)
+
+    for r in results:
+        print(
+            f"{r['variant']:32s} dim={r['dim']:5d} auc={r['auc']} f1={r['best_f1']:.4f} "
+            f"tpr@{args.target_fpr}={r['tpr_at_fpr']:.4f} "
+            f"corr={r.get('score_corr', 1.0):.4f} agree={r.get('decision_agreement', 1.0):.4f} "
+            f"normal={r['normal_mb']}MB score={r['score_s']}s"
+        )
+
+    if args.out:
+        report = {
+            "embed_model": args.embed_model,
+            "n_attacks": int(atk_full.shape[0]),
+            "n_normals": int(n_norm if rows is None else len(rows)),
+            "base_threshold": args.base_threshold,
+            "target_fpr": args.target_fpr,
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+새 공격 텍스트를 전체 precompute 없이 편입하는 CLI. (src/ingest.py)
+
+사용법 (backend 디렉터리에서):
+
+    (SKY_venv) $ python ingest_attacks.py --embed-model "OpenAI Embedding" \
+        --file new_attacks.txt            # 한 줄에 하나 (또는 text 열이 있는 .csv)
+
+    (SKY_venv) $ python ingest_attacks.py --text "Ignore all previous ..." --recluster never
+
+attack_{model}.npy 가 있는 모든 임베딩 모델로 같은 텍스트를 임베딩해 추가한다
+(--embed-model 은 중복 판정 기준 모델).
+편입이 끝나면 precomputed/corpus_version.json 이 바뀌므로, 떠 있는 서버의 워커들은
+재시작 없이 다음 요청에서 새 벡터 / 인덱스 / 아티팩트를 읽는다.
+"""
+
+import argparse
+import json
+
+from dotenv import load_dotenv
+
+from src.ingest import RECLUSTER_MODES, ingest_attacks, read_texts_file
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-model", type=str, default="OpenAI Embedding")
+    parser.add_argument("--file", type=str, default=None,
+                        help="공격 텍스트 파일 (.txt 한 줄에 하나 / .csv text 열)")
+    parser.add_argument("--text", type=str, action="append", default=[],
+                        help="공격 텍스트 (여러 번 지정 가능)")
+    parser.add_argument("--recluster", type=str, default="auto", choices=RECLUSTER_MODES)
+    args = parser.parse_args()
+
+    texts = list(args.text)
+    if args.file:
+        texts += read_texts_file(args.file)
+    if not texts:
+        parser.error("--file 또는 --text 로 공격 텍스트를 지정하세요.")
+
+    report = ingest_attacks(texts, args.embed_model, recluster=args.recluster)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,98 @@
 from typing import Optional
-from pathlib import Path
 from functools import lru_cache
-from pathlib import Path
+import os
+import hmac
+import json
+import time
+import uuid
+import asyncio
 import pickle
+from contextlib import asynccontextmanager
+
+import numpy as np
  
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Header, BackgroundTasks, Response
 from functools import lru_cache
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
 from dotenv import load_dotenv
 
 from src.utils import (
     load_attack_data,
+    load_attack_index,
+    load_normal_texts,
+    load_normal_memmap,
+    load_normal_index,
     get_length_adaptive_threshold,
+    sensitivity_thresholds,
     get_embedding_client,
+    get_async_embedding_client,
+    cluster_artifact_path,
+    load_projection,
     safe_name,
+    corpus_version_stamp,
+    PRE_DIR,
 )
 from src.embedding import Embedder
+from src.batching import MicroBatcher
 from src.summarizer import Summarizer
 from src.detector import SkyShield
+from src.knn import TwoSidedScorer
+from src.projection import KIND_NAMES
 from src.cluster_analyzer import ClusterAnalyzer
+from src.artifacts import load_cluster_artifact
+from src.ingest import RECLUSTER_MODES, ingest_attacks, recluster_artifact
+from src.warmup import ModelLoadState, parse_warmup_pairs
+from src.registry import registry
+from src.metrics import METRICS, REQUESTS, DECISIONS, TIER_DECISIONS, StageTimer
+from src.embed_store import default_store_stats
+from src.summarizer import SUMMARY_CACHE
+from src.summary_jobs import SUMMARY_JOBS
+from src.shared_store import prune as prune_shared_store
+from src.tiers import (
+    PIPELINE_MODES,
+    ExactMatchIndex,
+    ATTACK as EXACT_ATTACK,
+    lexical_hits,
+    escalation_reasons,
+)
 
 # .env 로드
 load_dotenv()
 
+# 시작 시 미리 로드할 (embed_model, summ_model) 조합 상태
+MODEL_STATE = ModelLoadState()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    SKYSHIELD_WARMUP 에 나열된 조합을 서버 시작 시 로드.
+    - 기본: 백그라운드에서 로드하고 /ready 가 완료 여부를 보고
+    - SKYSHIELD_WARMUP_BLOCKING=1 이면 로드가 끝난 뒤에 요청을 받기 시작
+    """
+    pairs = parse_warmup_pairs(os.getenv("SKYSHIELD_WARMUP", ""))
+    keys = [MODEL_STATE.register(e, s) for e, s in pairs]
+
+    task = None
+    if keys:
+        task = asyncio.ensure_future(asyncio.to_thread(warmup_all, pairs, keys))
+        if os.getenv("SKYSHIELD_WARMUP_BLOCKING", "0") == "1":
+            await task
+
+    yield
+
+    if task is not None and not task.done():
+        task.cancel()
+
+
 app = FastAPI(
     title="SkyShield Backend",
     version="1.0.0",
     description="Adaptive LLM Jailbreak Detection & Prompt Risk Analysis",
+    lifespan=lifespan,
 )
 
 # CORS 설정 (개발용: 전부 허용)
@@ -53,7 +117,20 @@ def get_embedder(model_name: str) -> Embedder:
     OpenAI / Mistral / DeepSeek / sentence-transformers 모두 여기로 통일.
     """
     client = get_embedding_client(model_name)
-    return Embedder(model_name, client=client)
+    async_client = get_async_embedding_client(model_name)
+    embedder = Embedder(model_name, client=client, async_client=async_client)
+    # 동시 요청의 단건 임베딩을 한 번의 호출로 묶음 (SKYSHIELD_MICROBATCH_WINDOW_MS=0 이면 끔)
+    embedder.batcher = MicroBatcher.from_env(embedder._aencode_uncached, name=model_name)
+    return embedder
+
+
+@lru_cache(maxsize=8)
+def get_summarizer(backend: str) -> Summarizer:
+    """
+    요약 백엔드별 Summarizer 인스턴스 캐시.
+    API 클라이언트(HTTP keep-alive 풀)와 요약 캐시를 요청 간에 공유.
+    """
+    return Summarizer(backend)
 
 
 @lru_cache(maxsize=8)
@@ -66,22 +143,99 @@ def get_attack_dataset(model_name: str):
     return atk_texts, atk_vec
 
 
+@lru_cache(maxsize=8)
+def get_attack_index(model_name: str):
+    """
+    precompute_jailbreak.py --index 로 만든 공격 벡터 검색 인덱스 로드.
+    (없으면 정규화된 FlatIndex 를 한 번만 만들어 재사용)
+    """
+    return load_attack_index(model_name)
+
+
+@lru_cache(maxsize=8)
+def get_knn_scorer(model_name: str) -> TwoSidedScorer:
+    """
+    detect_mode="two_sided" 용 공격 / 정상 양쪽 kNN 스코어러.
+    정상 벡터는 memmap (또는 SKYSHIELD_NORMAL_QUANT 압축 저장소) 을 chunk 단위로 검색.
+    """
+    quant = os.getenv("SKYSHIELD_NORMAL_QUANT") or None
+    rerank_k = int(os.getenv("SKYSHIELD_NORMAL_RERANK_K", "0"))
+    return TwoSidedScorer(
+        get_attack_index(model_name),
+        load_normal_index(model_name, quant=quant, rerank_k=rerank_k),
+        k=int(os.getenv("SKYSHIELD_KNN_K", "10")),
+        margin_thr=float(os.getenv("SKYSHIELD_KNN_MARGIN", "0.0")),
+    )
+
+
+@lru_cache(maxsize=8)
+def get_normal_vectors(model_name: str):
+    """정상 벡터 float32 memmap (tiered 정확 일치 입력의 벡터를 행 단위로 읽음)."""
+    return load_normal_memmap(model_name)
+
+
+@lru_cache(maxsize=8)
+def get_exact_index(model_name: str) -> ExactMatchIndex:
+    """
+    pipeline_mode="tiered" 의 정확 일치 조회용 텍스트 해시.
+    텍스트 수와 벡터 행 수가 다르면 (precompute 이후 CSV 변경) 그 종류는 제외한다.
+    """
+    atk_texts, atk_vec = get_attack_dataset(model_name)
+    if len(atk_texts) != len(atk_vec):
+        atk_texts = []
+
+    norm_texts = []
+    try:
+        norm_texts = load_normal_texts()
+        if len(norm_texts) != get_normal_vectors(model_name).shape[0]:
+            norm_texts = []
+    except RuntimeError:
+        pass
+    return ExactMatchIndex.build(atk_texts, norm_texts)
+
+
+@lru_cache(maxsize=8)
+def get_projection(model_name: str):
+    """precompute_jailbreak.py 에서 학습한 UMAP 2D 투영 (src/projection.py) 로드."""
+    return load_projection(model_name)
+
+
+@lru_cache(maxsize=16)
+def get_center_coords(embed_model: str, summ_model: str):
+    """
+    클러스터 중심의 2D 좌표. 투영 번들에 저장된 중심과 현재 아티팩트가 같으면 그대로,
+    (편입 / 재클러스터링으로) 달라졌으면 현재 중심을 한 번 투영해 캐시한다.
+    """
+    projection = get_projection(embed_model)
+    analyzer = get_precomputed_analyzer(embed_model, summ_model)
+    analyzer._ensure_center_matrix()
+    ids = np.asarray(analyzer.center_ids, dtype="int64")
+    if np.array_equal(ids, projection.center_ids):
+        return ids, projection.center_coords
+    if len(ids) == 0:
+        return ids, np.empty((0, 2), dtype="float32")
+    return ids, projection.transform(analyzer.center_matrix)
+
+
 @lru_cache(maxsize=16)
 def get_precomputed_analyzer(embed_model: str, summ_model: str) -> ClusterAnalyzer:
     """
-    precompute_jailbreak.py 에서 만든
-    precomputed/cluster_{embed_model}_{summ_model}.pkl 로부터
-    ClusterAnalyzer 인스턴스를 로드.
+    precompute_jailbreak.py 에서 만든 클러스터 아티팩트
+    precomputed/artifacts/cluster_{embed_model}_{summ_model}/ 를 mmap 으로 로드.
+    (아티팩트가 없으면 예전 포맷인 cluster_*.pkl 을 읽는다)
     """
-    base_dir = Path(__file__).resolve().parent
-    pre_dir = base_dir / "precomputed"
+    artifact_dir = cluster_artifact_path(embed_model, summ_model)
+    if (artifact_dir / "manifest.json").exists():
+        verify = os.getenv("SKYSHIELD_VERIFY_ARTIFACTS", "1") == "1"
+        analyzer, _, _ = load_cluster_artifact(artifact_dir, verify=verify)
+        return analyzer
 
     fname = f"cluster_{safe_name(embed_model)}_{safe_name(summ_model)}.pkl"
-    path = pre_dir / fname
+    path = PRE_DIR / fname
 
     if not path.exists():
         raise RuntimeError(
-            f"사전 계산된 클러스터 파일을 찾을 수 없습니다: {path}\n"
+            f"사전 계산된 클러스터 파일을 찾을 수 없습니다: {artifact_dir}\n"
             f"backend 디렉터리에서 precompute_jailbreak.py 를 먼저 실행하세요."
         )
 
@@ -99,11 +253,21 @@ class AnalysisRequest(BaseModel):
     summ_model: str           # 예: "OpenAI"
     base_threshold: float     # UI에서 설정하는 Base Threshold
     sensitivity: float        # 0.0 ~ 1.0 민감도 슬라이더 값
+    detect_mode: str = "attack"  # "attack" (공격 최대 유사도) / "two_sided" (공격·정상 kNN margin)
+    cluster_mode: str = "centroid"  # "centroid" (중심 코사인) / "density" (HDBSCAN membership)
+    summary_mode: str = "inline"    # "inline" / "skip" / "deferred" (요약은 request_id 로 나중에)
+    pipeline_mode: str = "full"     # "full" (항상 LLM 요약) / "tiered" (애매한 입력만 LLM 요약)
+    force_summary: bool = False     # tiered 에서도 LLM 요약 강제
 
 
 class AnalysisResponse(BaseModel):
     final_decision: str       # "ALLOW" / "REVIEW" / "BLOCK"
-    summary: str
+    summary: str | None = None   # summary_mode 가 skip / deferred 면 None
+    summary_status: str = "done"  # "done" / "skipped" / "pending"
+    request_id: str | None = None  # deferred: GET /analyze/{request_id}/summary
+    # pipeline_mode="tiered" 일 때만 채워짐: "exact" / "confident" / "escalated"
+    tier: str | None = None
+    tier_reasons: list[str] | None = None
     adaptive_thr: float
     base_threshold: float
 
@@ -119,6 +283,182 @@ class AnalysisResponse(BaseModel):
 
     cluster_name: str | None = None
 
+    # 클러스터 중심별 유사도 (레이더 차트 등에서 재계산 없이 사용)
+    cluster_ids: list[int] | None = None
+    cluster_sims: list[float] | None = None
+
+    # detect_mode="two_sided" 일 때만 채워짐
+    knn_margin: float | None = None
+    knn_attack_sim: float | None = None
+    knn_normal_sim: float | None = None
+    knn_ms: float | None = None
+
+    # cluster_mode="density" 일 때만 채워짐 (cluster_sim 에는 strength 가 들어감)
+    cluster_strength: float | None = None
+    cluster_outlier: float | None = None
+
+
+class BatchAnalysisRequest(BaseModel):
+    texts: list[str]          # 같은 모델/임계값 설정을 공유하는 입력 목록
+    embed_model: str
+    summ_model: str
+    base_threshold: float
+    sensitivity: float
+    llm_summary: bool = False # True 면 입력마다 LLM 요약 (느림), 기본은 로컬 요약
+    detect_mode: str = "attack"
+    cluster_mode: str = "centroid"
+
+
+class SummaryResult(BaseModel):
+    request_id: str
+    status: str               # "done" / "pending"
+    summary: str | None = None
+
+
+class BatchAnalysisResponse(BaseModel):
+    results: list[AnalysisResponse]  # 요청 texts 순서와 동일
+
+
+class AttackIngestRequest(BaseModel):
+    texts: list[str]          # 새로 편입할 공격 텍스트
+    embed_model: str
+    recluster: str = "background"  # "background" / "auto" / "never" / "force"
+
+
+class VisualizeRequest(BaseModel):
+    text: str
+    embed_model: str
+    summ_model: str
+    include_points: bool = True   # 배경 샘플 좌표 (한 번 받아 두면 이후엔 False 로 입력만)
+
+
+class VisualPoint(BaseModel):
+    x: float
+    y: float
+    type: str                     # "공격" / "정상" / "입력" / "중심"
+    cluster_id: Optional[int] = None
+    label: Optional[str] = None
+
+
+class VisualizeResponse(BaseModel):
+    input: VisualPoint
+    centers: list[VisualPoint]
+    points: list[VisualPoint]     # include_points=False 면 빈 목록
+    transform_ms: float           # 입력 1개 투영 시간
+
+
+# 배치 1회당 최대 입력 수
+MAX_BATCH_SIZE = int(os.getenv("SKYSHIELD_MAX_BATCH", "2048"))
+
+# 단계별 타임아웃 (초)
+EMBED_TIMEOUT = float(os.getenv("SKYSHIELD_EMBED_TIMEOUT", "10"))
+SUMMARY_TIMEOUT = float(os.getenv("SKYSHIELD_SUMMARY_TIMEOUT", "15"))
+
+# 응답에 Server-Timing 헤더 (단계별 ms) 를 붙일지
+SERVER_TIMING = os.getenv("SKYSHIELD_SERVER_TIMING", "0") == "1"
+
+DETECT_MODES = ("attack", "two_sided")
+CLUSTER_MODES = ("centroid", "density")
+SUMMARY_MODES = ("inline", "skip", "deferred")
+SUMMARY_STATUS = {"inline": "done", "skip": "skipped", "deferred": "pending"}
+
+
+# --------------------------------------------------------
+# 판정 헬퍼 (단건 / 배치 공통)
+# --------------------------------------------------------
+def rejudge_cluster(cluster_sim: float, novel_thr: float, susp_thr: float) -> str:
+    """민감도 기준에 따라 클러스터 판정 재조정."""
+    if cluster_sim < novel_thr:
+        return "NOVEL_ATTACK"
+    elif cluster_sim < susp_thr:
+        return "SUSPICIOUS"
+    return "KNOWN_ATTACK"
+
+
+def final_decision_of(cluster_decision: str, decision_basic: str) -> str:
+    """최종 Block/Review/Allow 결정."""
+    if cluster_decision == "NOVEL_ATTACK":
+        return "BLOCK"
+    elif cluster_decision == "SUSPICIOUS":
+        return "REVIEW"
+    return decision_basic
+
+
+def check_detect_mode(detect_mode: str):
+    if detect_mode not in DETECT_MODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"detect_mode 는 {DETECT_MODES} 중 하나여야 합니다: {detect_mode}",
+        )
+
+
+def check_summary_mode(summary_mode: str):
+    if summary_mode not in SUMMARY_MODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"summary_mode 는 {SUMMARY_MODES} 중 하나여야 합니다: {summary_mode}",
+        )
+
+
+def check_pipeline_mode(pipeline_mode: str):
+    if pipeline_mode not in PIPELINE_MODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"지원하지 않는 pipeline_mode 입니다: {pipeline_mode} (가능: {', '.join(PIPELINE_MODES)})",
+        )
+
+
+def check_cluster_mode(cluster_mode: str, analyzer: ClusterAnalyzer):
+    if cluster_mode not in CLUSTER_MODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"cluster_mode 는 {CLUSTER_MODES} 중 하나여야 합니다: {cluster_mode}",
+        )
+    if cluster_mode == "density" and getattr(analyzer, "density", None) is None:
+        raise HTTPException(
+            status_code=409,
+            detail="이 클러스터 아티팩트에는 밀도 membership 데이터가 없습니다. "
+                   "precompute_jailbreak.py 로 다시 생성하세요.",
+        )
+
+
+def density_candidates(cluster_mode: str, atk_index, analyzer: ClusterAnalyzer) -> int:
+    """
+    cluster_mode="density" 에서 SkyShield 검색과 함께 받아 올 최근접 후보 수.
+    공격 인덱스 행 수가 밀도 학습 벡터와 다르면 (행 순서를 보장할 수 없음) 0 → 전체 스캔.
+    """
+    density = getattr(analyzer, "density", None)
+    if cluster_mode != "density" or density is None or len(atk_index) != len(density):
+        return 0
+    return density.n_candidates
+
+
+def density_fields(strength: float | None, outlier: float | None) -> dict:
+    if strength is None:
+        return {}
+    return {"cluster_strength": float(strength), "cluster_outlier": float(outlier)}
+
+
+def knn_fields(knn: dict | None, knn_ms: float | None = None) -> dict:
+    """two_sided 결과를 AnalysisResponse 필드로 변환."""
+    if knn is None:
+        return {}
+    return {
+        "knn_margin": float(knn["margin"]),
+        "knn_attack_sim": float(knn["attack_sim"]),
+        "knn_normal_sim": float(knn["normal_sim"]),
+        "knn_ms": knn_ms,
+    }
+
+
+def cluster_name_of(analyzer: ClusterAnalyzer, cluster_id):
+    """클러스터 의미 태그."""
+    if cluster_id is not None and hasattr(analyzer, "cluster_names"):
+        names = analyzer.cluster_names
+        if isinstance(names, dict) and cluster_id in names:
+            return names[cluster_id]
+    return None
+
 
 # --------------------------------------------------------
 # 헬스체크
@@ -129,74 +469,221 @@ def health():
 
 
 # --------------------------------------------------------
-# 분석 엔드포인트
+# Warmup + 준비 상태
 # --------------------------------------------------------
-@app.post("/analyze", response_model=AnalysisResponse)
-def analyze(req: AnalysisRequest):
+def warmup_pair(key: str, embed_model: str, summ_model: str):
     """
-    전체 흐름:
-    1) 사전 계산된 공격 벡터 + 클러스터 분석기 로드
-    2) 사용자 입력 1개만 임베딩
-    3) 길이 기반 Adaptive Threshold 계산
-    4) SkyShield 기본 유사도 검사
-    5) HDBSCAN 클러스터 기반 패턴 분석
-    6) 최종 판단(ALLOW / REVIEW / BLOCK) 및 메타 정보 반환
+    한 조합의 Embedder / 공격 인덱스 / 클러스터 분석기 / Summarizer 를 로드하고
+    더미 입력으로 임베딩 + 판정을 한 번 돌려 첫 요청 지연을 없앤다.
     """
+    embedder = MODEL_STATE.run_stage(key, "embedder", get_embedder, embed_model)
+    atk_index = MODEL_STATE.run_stage(key, "attack_index", get_attack_index, embed_model)
+    analyzer = MODEL_STATE.run_stage(
+        key, "analyzer", get_precomputed_analyzer, embed_model, summ_model
+    )
+    MODEL_STATE.run_stage(key, "summarizer", get_summarizer, summ_model)
+
+    if os.getenv("SKYSHIELD_WARMUP_INFERENCE", "1") == "1":
+        def dummy_inference():
+            vec = embedder.encode(["warmup"], use_cache=False, save_cache=False)[0]
+            SkyShield(index=atk_index).predict(vec)
+            analyzer.detect(vec)
+
+        MODEL_STATE.run_stage(key, "inference", dummy_inference)
+
+
+def warmup_all(pairs, keys):
+    for (embed_model, summ_model), key in zip(pairs, keys):
+        try:
+            warmup_pair(key, embed_model, summ_model)
+        except Exception as e:
+            MODEL_STATE.mark(key, "error", error=str(e))
+        else:
+            MODEL_STATE.mark(key, "ready")
+
+
+@app.get("/ready")
+def ready():
+    """
+    warmup 대상 모델이 모두 로드되었는지 보고 (로드밸런서용).
+    준비되지 않았으면 503. 백엔드 라이브러리 import 리포트도 함께 반환.
+    """
+    is_ready = MODEL_STATE.is_ready()
+    body = {
+        "ready": is_ready,
+        "models": MODEL_STATE.snapshot(),
+        "imports": registry.report(),
+    }
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+
+# --------------------------------------------------------
+# Prometheus 메트릭
+# --------------------------------------------------------
+@METRICS.register_collector
+def cache_metrics():
+    """임베딩 / 요약 / 아티팩트(lru_cache) 캐시 적중 수. scrape 시점에만 읽는다."""
+    rows = []
+    store = default_store_stats()
+    if store is not None:
+        rows += [
+            (("embedding", "hit_memory"), store["hits_memory"]),
+            (("embedding", "hit_disk"), store["hits_disk"]),
+            (("embedding", "miss"), store["misses"]),
+        ]
+    rows += [
+        (("summary", "hit"), SUMMARY_CACHE.hits),
+        (("summary", "miss"), SUMMARY_CACHE.misses),
+    ]
+    for name, loader in (
+        ("embedder", get_embedder),
+        ("attack_index", get_attack_index),
+        ("knn_scorer", get_knn_scorer),
+        ("cluster_artifact", get_precomputed_analyzer),
+    ):
+        info = loader.cache_info()
+        rows += [((name, "hit"), info.hits), ((name, "miss"), info.misses)]
 
-    # 1) Embedder + 공격 데이터 로드 (전부 캐시)
-    embedder = get_embedder(req.embed_model)
-    atk_texts, atk_vec = get_attack_dataset(req.embed_model)
+    return [(
+        "skyshield_cache_lookups_total", "counter",
+        "Cache lookups by cache and result", ("cache", "result"), rows,
+    )]
 
-    # 2) 사용자 입력 임베딩
-    user_vec = embedder.encode([req.text])[0]
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+# --------------------------------------------------------
+# 분석 엔드포인트
+# --------------------------------------------------------
+async def load_pipeline(req: AnalysisRequest, timer: StageTimer):
+    """Embedder + 공격 데이터 + 클러스터 분석기 + Summarizer 로드 (전부 캐시, 첫 로드는 스레드에서)."""
+    check_detect_mode(req.detect_mode)
+    check_summary_mode(req.summary_mode)
+    check_pipeline_mode(req.pipeline_mode)
+    with timer.stage("load"):
+        refresh_if_corpus_changed()
+        embedder = await asyncio.to_thread(get_embedder, req.embed_model)
+        atk_index = await asyncio.to_thread(get_attack_index, req.embed_model)
+        analyzer = await asyncio.to_thread(get_precomputed_analyzer, req.embed_model, req.summ_model)
+        summarizer = get_summarizer(req.summ_model)
+    check_cluster_mode(req.cluster_mode, analyzer)
+    return embedder, atk_index, analyzer, summarizer
+
+
+async def summary_or_fallback(summarizer: Summarizer, text: str, timer: StageTimer):
+    """LLM 요약 (타임아웃이면 로컬 fallback 요약)."""
+    try:
+        return await asyncio.wait_for(timer.timed("summary", summarizer.asummarize(text)), SUMMARY_TIMEOUT)
+    except asyncio.TimeoutError:
+        return summarizer.failure_summary(text)
+
+
+def start_summary(req: AnalysisRequest, summarizer: Summarizer, timer: StageTimer):
+    """summary_mode 에 따라 LLM 요약 시작 → (inline Task, deferred request_id)."""
+    if req.summary_mode == "inline":
+        return asyncio.ensure_future(summary_or_fallback(summarizer, req.text, timer)), None
+    if req.summary_mode == "deferred":
+        return None, SUMMARY_JOBS.submit(summary_or_fallback(summarizer, req.text, timer))
+    return None, None
+
+
+async def exact_vector(req: AnalysisRequest, timer: StageTimer):
+    """tiered 0단계: 데이터셋 원문과 같은 입력이면 저장된 벡터, 아니면 None."""
+    with timer.stage("exact"):
+        index = await asyncio.to_thread(get_exact_index, req.embed_model)
+        hit = index.lookup(req.text)
+        if hit is None:
+            return None
+        kind, row = hit
+        if kind == EXACT_ATTACK:
+            vecs = get_attack_dataset(req.embed_model)[1]
+        else:
+            vecs = get_normal_vectors(req.embed_model)
+        return np.array(vecs[row], dtype="float32")
+
+
+def tier_of(exact: bool, reasons) -> str:
+    return "escalated" if reasons else ("exact" if exact else "confident")
+
+
+async def embed_one(embedder: Embedder, text: str, timer: StageTimer, summary_task=None):
+    """입력 임베딩 (타임아웃이면 504, 실패 시 함께 돌던 요약 작업 취소)."""
+    try:
+        return (await asyncio.wait_for(timer.timed("embed", embedder.aencode([text])), EMBED_TIMEOUT))[0]
+    except asyncio.TimeoutError:
+        if summary_task is not None:
+            summary_task.cancel()
+        raise HTTPException(
+            status_code=504,
+            detail=f"임베딩 호출이 {EMBED_TIMEOUT}s 안에 끝나지 않았습니다.",
+        )
+    except Exception:
+        if summary_task is not None:
+            summary_task.cancel()
+        raise
+
+
+async def detect_one(req: AnalysisRequest, user_vec, atk_index, analyzer: ClusterAnalyzer,
+                     timer: StageTimer) -> dict:
+    """
+    요약을 제외한 판정 전체 (AnalysisResponse 필드 dict).
+    3) Adaptive Threshold → 4) SkyShield (+ two_sided kNN) → 5) 클러스터 → 6) 최종 판단
+    """
     # 3) Adaptive Threshold 계산
     adaptive_thr = get_length_adaptive_threshold(req.base_threshold, req.text)
 
-    # 4) Summarizer (사용자 입력 요약만 수행)
-    summarizer = Summarizer(req.summ_model)
-    summary = summarizer.summarize(req.text)
+    # 4) SkyShield 기본 유사도 검사
+    #    density 모드면 같은 인덱스 검색에서 membership 용 최근접 후보도 받는다
+    with timer.stage("skyshield"):
+        base_detector = SkyShield(index=atk_index, threshold_block=adaptive_thr)
+        n_candidates = density_candidates(req.cluster_mode, atk_index, analyzer)
+        neighbors = None
+        if n_candidates:
+            [(decision_basic, score_basic)], neighbors = base_detector.predict_with_neighbors(
+                np.asarray(user_vec)[None, :], n_candidates
+            )
+        else:
+            decision_basic, score_basic = base_detector.predict(user_vec)
 
-    # 5) SkyShield 기본 유사도 검사
-    base_detector = SkyShield(attack_vectors=atk_vec, threshold_block=adaptive_thr)
-    decision_basic, score_basic = base_detector.predict(user_vec)
+    # 정상 memmap 까지 훑는 kNN 은 디스크 I/O 가 있으므로 스레드에서 실행
+    knn, knn_ms = None, None
+    if req.detect_mode == "two_sided":
+        scorer = await asyncio.to_thread(get_knn_scorer, req.embed_model)
+        t0 = time.perf_counter()
+        knn = (await asyncio.to_thread(scorer.score, user_vec))[0]
+        knn_ms = (time.perf_counter() - t0) * 1000
+        timer.record("knn", knn_ms / 1000)
+        decision_basic = scorer.adjust(decision_basic, knn)
 
-    # 6) HDBSCAN 기반 클러스터 분석 (사전 계산된 analyzer 사용)
-    analyzer = get_precomputed_analyzer(req.embed_model, req.summ_model)
-    cluster_decision, cluster_id, cluster_sim = analyzer.detect(user_vec)
+    # 5) HDBSCAN 기반 클러스터 분석 (사전 계산된 analyzer 사용)
+    #    중심 유사도 벡터는 GEMV 1회로 계산해 판정과 응답에 함께 사용
+    with timer.stage("cluster"):
+        center_sims = analyzer.center_similarities(user_vec)
+        strength, outlier = None, None
+        if req.cluster_mode == "density":
+            # 중심 대신 HDBSCAN membership: cluster_sim 자리에 strength (noise 는 0)
+            cluster_decision, cluster_id, cluster_sim, outlier = analyzer.detect_membership(user_vec, neighbors)[0]
+            strength = cluster_sim
+        else:
+            cluster_decision, cluster_id, cluster_sim = analyzer.classify(center_sims)
 
     # 민감도 기반 Novel / Suspicious 기준
-    novel_thr = 0.05 + 0.15 * req.sensitivity
-    susp_thr = novel_thr + (0.20 + 0.20 * req.sensitivity)
-
-    cluster_decision, cluster_id, cluster_sim = analyzer.detect(user_vec)
+    novel_thr, susp_thr = sensitivity_thresholds(req.sensitivity)
 
     # 민감도 기준에 따라 판정 재조정
-    if cluster_sim < novel_thr:
-        cluster_decision = "NOVEL_ATTACK"
-    elif cluster_sim < susp_thr:
-        cluster_decision = "SUSPICIOUS"
-    else:
-        cluster_decision = "KNOWN_ATTACK"
+    cluster_decision = rejudge_cluster(cluster_sim, novel_thr, susp_thr)
 
     # 최종 Block/Review/Allow 결정
-    if cluster_decision == "NOVEL_ATTACK":
-        final_decision = "BLOCK"
-    elif cluster_decision == "SUSPICIOUS":
-        final_decision = "REVIEW"
-    else:
-        final_decision = decision_basic
+    final_decision = final_decision_of(cluster_decision, decision_basic)
 
-    # 클러스터 의미 태그
-    cluster_name = None
-    if cluster_id is not None and hasattr(analyzer, "cluster_names"):
-        names = analyzer.cluster_names
-        if isinstance(names, dict) and cluster_id in names:
-            cluster_name = names[cluster_id]
+    REQUESTS.inc(timer.endpoint, req.embed_model)
+    DECISIONS.inc(req.embed_model, final_decision)
 
-    return AnalysisResponse(
+    return dict(
         final_decision=final_decision,
-        summary=summary,
         adaptive_thr=float(adaptive_thr),
         base_threshold=float(req.base_threshold),
         decision_basic=decision_basic,
@@ -206,5 +693,415 @@ def analyze(req: AnalysisRequest):
         cluster_sim=float(cluster_sim),
         novel_thr=float(novel_thr),
         susp_thr=float(susp_thr),
-        cluster_name=cluster_name,
+        # 클러스터 의미 태그
+        cluster_name=cluster_name_of(analyzer, cluster_id),
+        cluster_ids=[int(c) for c in analyzer.center_ids],
+        cluster_sims=[float(x) for x in center_sims],
+        **knn_fields(knn, knn_ms),
+        **density_fields(strength, outlier),
+    )
+
+
+@app.post("/analyze", response_model=AnalysisResponse)
+async def analyze(req: AnalysisRequest, response: Response):
+    """
+    전체 흐름:
+    1) 사전 계산된 공격 벡터 + 클러스터 분석기 로드
+    2) 사용자 입력 임베딩 + LLM 요약을 동시에 실행 (단계별 타임아웃)
+    3) 길이 기반 Adaptive Threshold 계산
+    4) SkyShield 기본 유사도 검사 (two_sided 면 정상 kNN margin 으로 보정)
+    5) HDBSCAN 클러스터 기반 패턴 분석
+    6) 최종 판단(ALLOW / REVIEW / BLOCK) 및 메타 정보 반환
+
+    summary_mode:
+    - inline   : 요약까지 기다려 함께 반환 (기존 동작)
+    - skip     : 요약 없이 판정만 (summary=None)
+    - deferred : 판정만 바로 반환하고 요약은 GET /analyze/{request_id}/summary 로
+
+    pipeline_mode="tiered" (src/tiers.py):
+    - 데이터셋 원문과 같으면 임베딩 API 대신 저장된 벡터 사용
+    - LLM 요약은 REVIEW / 임계값 근처 / lexical 규칙 / force_summary 일 때만,
+      나머지는 로컬 요약 (판정은 full 과 같음)
+    """
+    timer = StageTimer("analyze")
+    embedder, atk_index, analyzer, summarizer = await load_pipeline(req, timer)
+
+    # 2) 임베딩과 요약은 서로 독립 → 동시에 실행
+    #    tiered 는 요약이 필요하다고 미리 알 수 있을 때만 (lexical / force_summary)
+    tiered = req.pipeline_mode == "tiered"
+    lexical = lexical_hits(req.text) if tiered else []
+    summary_task, request_id = None, None
+    if not tiered or lexical or req.force_summary:
+        summary_task, request_id = start_summary(req, summarizer, timer)
+
+    try:
+        user_vec = await exact_vector(req, timer) if tiered else None
+        exact = user_vec is not None
+        if user_vec is None:
+            user_vec = await embed_one(embedder, req.text, timer, summary_task)
+        fields = await detect_one(req, user_vec, atk_index, analyzer, timer)
+    except BaseException:
+        # 판정 실패 → request_id 가 응답으로 나가지 않으므로 deferred 요약도 취소
+        if request_id is not None:
+            SUMMARY_JOBS.cancel(request_id)
+        raise
+
+    summary, summary_status = None, SUMMARY_STATUS[req.summary_mode]
+    if tiered:
+        reasons = escalation_reasons(fields, lexical, req.force_summary)
+        fields.update(tier=tier_of(exact, reasons), tier_reasons=reasons)
+        TIER_DECISIONS.inc(req.embed_model, fields["tier"])
+        if reasons and summary_task is None and request_id is None:
+            summary_task, request_id = start_summary(req, summarizer, timer)
+        elif not reasons and req.summary_mode != "skip":
+            # 확신 구간: LLM 호출 없이 로컬 요약으로 바로 완료
+            summary, summary_status = summarizer.summarize(req.text, use_llm=False), "done"
+
+    if summary_task is not None:
+        summary = await summary_task
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timer.server_timing()
+
+    return AnalysisResponse(
+        summary=summary,
+        summary_status=summary_status,
+        request_id=request_id,
+        **fields,
+    )
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(req: AnalysisRequest, accept: str | None = Header(default=None)):
+    """
+    판정 먼저, 요약은 나중에 보내는 스트리밍 버전.
+    NDJSON (기본, application/x-ndjson) 또는 Accept: text/event-stream 이면 SSE.
+
+        {"event": "decision", ...판정 필드, "request_id", "time_to_decision_ms"}
+        {"event": "summary", "request_id", "summary"}      (summary_mode="skip" 이면 없음)
+
+    요약은 처음부터 임베딩과 동시에 돌고 있으므로 판정 이후 남은 시간만 기다린다.
+    요약 작업은 request_id 로 SUMMARY_JOBS 에 등록되므로, 판정을 받은 뒤 스트림이 끊겨도
+    요약은 계속 돌고 GET /analyze/{request_id}/summary 로 받아 갈 수 있다
+    (summary_status="skipped" 면 등록된 작업이 없어 404).
+    pipeline_mode="tiered" 면 /analyze 와 같은 규칙으로 LLM 요약 여부를 정하고,
+    확신 구간이면 로컬 요약을 판정 직후 summary 이벤트로 보낸다.
+    """
+    t0 = time.perf_counter()
+    timer = StageTimer("analyze_stream")
+    embedder, atk_index, analyzer, summarizer = await load_pipeline(req, timer)
+
+    request_id = uuid.uuid4().hex
+
+    def llm_summary():
+        SUMMARY_JOBS.submit(summary_or_fallback(summarizer, req.text, timer), request_id)
+        return SUMMARY_JOBS.get(request_id)
+
+    tiered = req.pipeline_mode == "tiered"
+    lexical = lexical_hits(req.text) if tiered else []
+    summary_task = None
+    if req.summary_mode != "skip" and (not tiered or lexical or req.force_summary):
+        summary_task = llm_summary()
+
+    # 임베딩 / 판정 오류는 스트림 시작 전에 HTTP 상태 코드로 반환 (등록한 요약 작업은 취소)
+    try:
+        user_vec = await exact_vector(req, timer) if tiered else None
+        exact = user_vec is not None
+        if user_vec is None:
+            user_vec = await embed_one(embedder, req.text, timer, summary_task)
+        fields = await detect_one(req, user_vec, atk_index, analyzer, timer)
+    except BaseException:
+        SUMMARY_JOBS.cancel(request_id)
+        raise
+
+    local_summary = None
+    if tiered:
+        reasons = escalation_reasons(fields, lexical, req.force_summary)
+        fields.update(tier=tier_of(exact, reasons), tier_reasons=reasons)
+        TIER_DECISIONS.inc(req.embed_model, fields["tier"])
+        if req.summary_mode != "skip":
+            if not reasons:
+                local_summary = summarizer.summarize(req.text, use_llm=False)
+                SUMMARY_JOBS.put(local_summary, request_id)
+            elif summary_task is None:
+                summary_task = llm_summary()
+
+    decision = {
+        "event": "decision",
+        "request_id": request_id,
+        "summary_status": ("pending" if summary_task is not None
+                           else "done" if local_summary is not None else "skipped"),
+        "time_to_decision_ms": round((time.perf_counter() - t0) * 1000, 3),
+        **fields,
+    }
+
+    sse = "text/event-stream" in (accept or "")
+
+    def encode(event):
+        data = json.dumps(event, ensure_ascii=False)
+        return f"event: {event['event']}\ndata: {data}\n\n" if sse else data + "\n"
+
+    async def events():
+        # 클라이언트가 중간에 끊어도 요약 작업은 취소하지 않는다 (request_id 로 조회 가능, TTL 후 정리)
+        yield encode(decision)
+        if local_summary is not None:
+            yield encode({"event": "summary", "request_id": request_id, "summary": local_summary})
+        elif summary_task is not None:
+            summary = await asyncio.shield(summary_task)
+            yield encode({"event": "summary", "request_id": request_id, "summary": summary})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/analyze/{request_id}/summary", response_model=SummaryResult)
+async def deferred_summary(request_id: str, wait: float = 0.0):
+    """
+    summary_mode="deferred" 요약 조회. wait 초 동안 완료를 기다린다 (최대 SUMMARY_TIMEOUT).
+    아직 진행 중이면 202 + status="pending", 없거나 만료되면 404.
+    """
+    status, summary = await SUMMARY_JOBS.wait(request_id, timeout=min(max(wait, 0.0), SUMMARY_TIMEOUT))
+    if status == "missing":
+        raise HTTPException(status_code=404, detail=f"요약 작업이 없거나 만료되었습니다: {request_id}")
+
+    body = SummaryResult(request_id=request_id, status=status, summary=summary)
+    if status == "pending":
+        return JSONResponse(body.model_dump(), status_code=202)
+    return body
+
+
+# --------------------------------------------------------
+# 배치 분석 엔드포인트
+# --------------------------------------------------------
+@app.post("/analyze/batch", response_model=BatchAnalysisResponse)
+def analyze_batch(req: BatchAnalysisRequest, response: Response):
+    """
+    여러 입력을 한 번에 분석.
+    - 임베딩: Embedder.encode 1회 호출 (API batch)
+    - SkyShield / ClusterAnalyzer: 입력 전체를 행렬곱 1회로 판정
+    결과는 요청 texts 순서대로 반환.
+    """
+    if len(req.texts) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"배치 크기 {len(req.texts)} 가 최대값 {MAX_BATCH_SIZE} 를 초과합니다.",
+        )
+    check_detect_mode(req.detect_mode)
+    if not req.texts:
+        return BatchAnalysisResponse(results=[])
+
+    timer = StageTimer("analyze_batch")
+    with timer.stage("load"):
+        refresh_if_corpus_changed()
+        embedder = get_embedder(req.embed_model)
+        atk_index = get_attack_index(req.embed_model)
+        analyzer = get_precomputed_analyzer(req.embed_model, req.summ_model)
+        summarizer = get_summarizer(req.summ_model)
+    check_cluster_mode(req.cluster_mode, analyzer)
+
+    with timer.stage("embed"):
+        user_vecs = embedder.encode(list(req.texts))
+
+    adaptive_thrs = [
+        get_length_adaptive_threshold(req.base_threshold, text) for text in req.texts
+    ]
+    with timer.stage("skyshield"):
+        base_detector = SkyShield(index=atk_index, threshold_block=req.base_threshold)
+        n_candidates = density_candidates(req.cluster_mode, atk_index, analyzer)
+        neighbors = None
+        if n_candidates:
+            basics, neighbors = base_detector.predict_with_neighbors(
+                user_vecs, n_candidates, thresholds=adaptive_thrs
+            )
+        else:
+            basics = base_detector.predict_batch(user_vecs, thresholds=adaptive_thrs)
+
+    with timer.stage("cluster"):
+        if req.cluster_mode == "density":
+            memberships = analyzer.detect_membership(user_vecs, neighbors)
+            clusters = [(d, cid, strength) for d, cid, strength, _ in memberships]
+            densities = [(strength, outlier) for _, _, strength, outlier in memberships]
+        else:
+            clusters = analyzer.detect_batch(user_vecs)
+            densities = [(None, None)] * len(req.texts)
+
+    # two_sided: 정상 memmap 1회 스캔으로 배치 전체의 kNN margin 계산
+    knns = [None] * len(req.texts)
+    if req.detect_mode == "two_sided":
+        with timer.stage("knn"):
+            scorer = get_knn_scorer(req.embed_model)
+            knns = scorer.score(user_vecs)
+        basics = [
+            (scorer.adjust(decision, knn), score)
+            for (decision, score), knn in zip(basics, knns)
+        ]
+
+    with timer.stage("summary"):
+        summaries = [summarizer.summarize(text, use_llm=req.llm_summary) for text in req.texts]
+
+    novel_thr, susp_thr = sensitivity_thresholds(req.sensitivity)
+
+    results = []
+    for summary, adaptive_thr, (decision_basic, score_basic), (_, cluster_id, cluster_sim), knn, density in zip(
+        summaries, adaptive_thrs, basics, clusters, knns, densities
+    ):
+        cluster_decision = rejudge_cluster(cluster_sim, novel_thr, susp_thr)
+        results.append(AnalysisResponse(
+            final_decision=final_decision_of(cluster_decision, decision_basic),
+            summary=summary,
+            adaptive_thr=float(adaptive_thr),
+            base_threshold=float(req.base_threshold),
+            decision_basic=decision_basic,
+            score_basic=float(score_basic),
+            cluster_decision=cluster_decision,
+            cluster_id=int(cluster_id) if cluster_id is not None else None,
+            cluster_sim=float(cluster_sim),
+            novel_thr=float(novel_thr),
+            susp_thr=float(susp_thr),
+            cluster_name=cluster_name_of(analyzer, cluster_id),
+            **knn_fields(knn),
+            **density_fields(*density),
+        ))
+
+    REQUESTS.inc("analyze_batch", req.embed_model)
+    for r in results:
+        DECISIONS.inc(req.embed_model, r.final_decision)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timer.server_timing()
+
+    return BatchAnalysisResponse(results=results)
+
+
+# --------------------------------------------------------
+# UMAP 시각화 (precompute 에서 학습한 투영 재사용)
+# --------------------------------------------------------
+@app.post("/visualize", response_model=VisualizeResponse)
+async def visualize(req: VisualizeRequest):
+    """
+    입력 1개만 임베딩해 저장된 UMAP 투영으로 옮긴다 (UMAP 재학습 없음).
+    좌표는 프론트 차트 축에 맞춰 0~100 으로 정규화해서 반환.
+    """
+    refresh_if_corpus_changed()
+    try:
+        embedder = await asyncio.to_thread(get_embedder, req.embed_model)
+        projection = await asyncio.to_thread(get_projection, req.embed_model)
+        analyzer = await asyncio.to_thread(get_precomputed_analyzer, req.embed_model, req.summ_model)
+        center_ids, center_coords = await asyncio.to_thread(get_center_coords, req.embed_model, req.summ_model)
+    except RuntimeError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        user_vec = (await asyncio.wait_for(embedder.aencode([req.text]), EMBED_TIMEOUT))[0]
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"임베딩 호출이 {EMBED_TIMEOUT}s 안에 끝나지 않았습니다.",
+        )
+
+    t0 = time.perf_counter()
+    xy = projection.scale(projection.transform(user_vec))[0]
+    transform_ms = (time.perf_counter() - t0) * 1000
+
+    centers = [
+        VisualPoint(x=float(x), y=float(y), type="중심", cluster_id=int(cid),
+                    label=cluster_name_of(analyzer, int(cid)))
+        for cid, (x, y) in zip(center_ids, projection.scale(center_coords))
+    ]
+
+    points = []
+    if req.include_points:
+        points = [
+            VisualPoint(x=float(x), y=float(y), type=KIND_NAMES[int(kind)])
+            for (x, y), kind in zip(projection.scale(projection.coords), projection.kinds)
+        ]
+
+    return VisualizeResponse(
+        input=VisualPoint(x=float(xy[0]), y=float(xy[1]), type="입력"),
+        centers=centers,
+        points=points,
+        transform_ms=round(transform_ms, 3),
     )
+
+
+# --------------------------------------------------------
+# 관리자: 공격 코퍼스 온라인 편입
+# --------------------------------------------------------
+def clear_detection_caches():
+    """편입 / 재클러스터링 후 공격 벡터·인덱스·클러스터 캐시를 비워 새 파일을 읽게 함."""
+    get_attack_dataset.cache_clear()
+    get_exact_index.cache_clear()
+    get_attack_index.cache_clear()
+    get_knn_scorer.cache_clear()
+    get_precomputed_analyzer.cache_clear()
+    get_center_coords.cache_clear()
+    # 원본 파일이 바뀐 shared memory 세그먼트는 unlink (다른 워커의 기존 매핑은 유지)
+    prune_shared_store()
+
+
+# 이 워커가 마지막으로 캐시를 맞춘 corpus_version.json (src/ingest.py 가 편입마다 교체)
+_CORPUS_STAMP = corpus_version_stamp()
+
+
+def refresh_if_corpus_changed():
+    """
+    다른 워커 / CLI 가 편입·재클러스터링했으면 캐시를 비운다.
+    요청마다 stat 한 번이라 로드 단계에서 매번 호출해도 된다.
+    """
+    global _CORPUS_STAMP
+    stamp = corpus_version_stamp()
+    if stamp != _CORPUS_STAMP:
+        _CORPUS_STAMP = stamp
+        clear_detection_caches()
+
+
+def check_admin_token(token: str | None):
+    expected = os.getenv("SKYSHIELD_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="SKYSHIELD_ADMIN_TOKEN 이 설정되지 않아 관리자 API 가 비활성화되어 있습니다.")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="관리자 토큰이 올바르지 않습니다.")
+
+
+def recluster_in_background(pairs):
+    for entry in pairs:
+        recluster_artifact(entry["embed_model"], entry["summ_model"])
+    refresh_if_corpus_changed()
+
+
+@app.post("/admin/attacks")
+def ingest_attack_texts(req: AttackIngestRequest, background_tasks: BackgroundTasks,
+                        x_admin_token: str | None = Header(default=None)):
+    """
+    새 공격 텍스트를 임베딩해 공격 벡터 / 인덱스 / 클러스터 아티팩트에 바로 추가.
+    recluster="background" 면 drift 가 기준을 넘은 아티팩트만 응답 후 재학습한다.
+    """
+    check_admin_token(x_admin_token)
+    if req.recluster != "background" and req.recluster not in RECLUSTER_MODES:
+        raise HTTPException(status_code=422, detail=f"지원하지 않는 recluster 값입니다: {req.recluster}")
+    if len(req.texts) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"배치 크기 {len(req.texts)} 가 최대값 {MAX_BATCH_SIZE} 를 초과합니다.",
+        )
+
+    mode = "never" if req.recluster == "background" else req.recluster
+    try:
+        report = ingest_attacks(
+            req.texts, req.embed_model, embedder=get_embedder(req.embed_model), recluster=mode,
+            embedder_factory=get_embedder,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    refresh_if_corpus_changed()
+
+    if req.recluster == "background":
+        pending = [
+            {"embed_model": c["embed_model"], "summ_model": c["summ_model"]}
+            for c in report["clusters"] if c["recluster_needed"]
+        ]
+        if pending:
+            background_tasks.add_task(recluster_in_background, pending)
+        report["recluster_scheduled"] = pending
+    return report
@@ -6,7 +6,17 @@
 
     (SKY_venv) $ python precompute_jailbreak.py \
         --embed-model "OpenAI Embedding" \
-        --summ-model "OpenAI"
+        --summ-model "OpenAI" \
+        --concurrency 8 --rpm 3000 --tpm 1000000
+
+정상 벡터 임베딩은 normal_{model}.progress.json 에 완료 구간을 기록하므로
+중간에 죽어도 같은 명령으로 다시 실행하면 이어서 진행한다.
+
+축소 차원 모드 ("OpenAI Embedding@256" / "OpenAI Embedding@pca256", src/reduction.py)는
+기본 모델 벡터가 이미 있으면 API 호출 없이 그 벡터를 잘라내거나 PCA 로 투영해 만든다.
+
+결과는 src/utils.PRE_DIR (기본 backend/precomputed, SKYSHIELD_PRECOMPUTED_DIR 로 변경) 에 저장하므로
+서버 / 편입 / 벤치마크와 같은 환경변수로 실행하면 같은 디렉터리를 읽고 쓴다.
 
 전제:
 - backend/.env 에 OPENAI_API_KEY 가 설정되어 있어야 함.
@@ -14,7 +24,10 @@
 """
 
 import argparse
+import hashlib
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
@@ -24,19 +37,27 @@ from dotenv import load_dotenv
 from src.embedding import Embedder
 from src.cluster_analyzer import ClusterAnalyzer
 from src.summarizer import Summarizer
-from src.utils import get_embedding_client
+from src.utils import (
+    DATA_DIR,
+    PRE_DIR,
+    VEC_DIR,
+    INDEX_DIR,
+    ARTIFACT_DIR,
+    PROJECTION_DIR,
+    TEXT_DIR,
+    safe_name,
+    get_embedding_client,
+)
+from src.index import FlatIndex, ChunkedFlatIndex, build_index, recall_report, scaling_report
+from src.quantize import QuantizedIndex, write_quantized_store, drift_report
+from src.artifacts import save_cluster_artifact
+from src.reduction import fit_pca, parse_model_name
+from src.projection import fit_projection
+from src.textstore import write_texts
+from src.ratelimit import TokenBucket, call_with_retry
 
 load_dotenv()
 
-BASE_DIR = Path(__file__).resolve().parent
-DATA_DIR = BASE_DIR / "data"
-PRE_DIR = BASE_DIR / "precomputed"
-VEC_DIR = PRE_DIR / "vectors"
-
-
-def safe_name(s: str) -> str:
-    return s.replace("/", "_").replace(" ", "_")
-
 
 def load_dataset():
     """jailbreak_dataset + customed 를 합쳐서 공격/정상 텍스트 분리."""
@@ -50,12 +71,40 @@ def load_dataset():
     return atk_texts, norm_texts
 
 
-def precompute_embeddings(embed_model: str, batch_size: int = 128):
+def precompute_texts(atk_texts, norm_texts=None):
+    """
+    텍스트 sidecar (src/textstore.py): 서빙 / 편입 / 보정이 CSV 를 다시 읽지 않도록
+    벡터 행 순서 그대로 저장. norm_texts=None 이면 공격 텍스트만.
+    """
+    write_texts(TEXT_DIR / "attack", atk_texts)
+    print(f"  - 공격 텍스트 sidecar 저장: {TEXT_DIR / 'attack'} (n={len(atk_texts)})")
+    if norm_texts is not None:
+        write_texts(TEXT_DIR / "normal", norm_texts)
+        print(f"  - 정상 텍스트 sidecar 저장: {TEXT_DIR / 'normal'} (n={len(norm_texts)})")
+
+
+def save_attack_vectors(embed_model: str, atk_vec):
+    """
+    attack_{model}.npy + attack_{model}.meta.json.
+    meta 의 모델 이름으로 편입(src/ingest.py)이 모든 모델의 공격 벡터에 같은 행을 추가한다.
+    """
+    atk_path = VEC_DIR / f"attack_{safe_name(embed_model)}.npy"
+    np.save(atk_path, atk_vec)
+    with open(VEC_DIR / f"attack_{safe_name(embed_model)}.meta.json", "w", encoding="utf-8") as f:
+        json.dump({"embed_model": embed_model, "n": int(atk_vec.shape[0]), "dim": int(atk_vec.shape[1])},
+                  f, ensure_ascii=False, indent=2)
+    return atk_path
+
+
+def precompute_embeddings(embed_model: str, batch_size: int = 128, concurrency: int = 4,
+                          rpm: float = 0, tpm: float = 0, max_retries: int = 6,
+                          restart: bool = False, normal_texts: bool = True):
     """
     전체 텍스트(공격 + 정상)를 chunk 단위로 임베딩해서 디스크에 저장.
 
     - 공격 벡터: npy (작음)
     - 정상 벡터: memmap(.dat) + meta.json
+      (동시 batch 요청 + rate limit + 체크포인트, 중단 후 재실행 시 이어서 진행)
     """
     VEC_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -63,6 +112,7 @@ def precompute_embeddings(embed_model: str, batch_size: int = 128):
     print(f"[1/3] 데이터 로드 완료")
     print(f"  - 공격 텍스트 개수: {len(atk_texts)}")
     print(f"  - 정상 텍스트 개수: {len(norm_texts)}")
+    precompute_texts(atk_texts, norm_texts if normal_texts else None)
 
     client = get_embedding_client(embed_model)
     embedder = Embedder(embed_model, client=client, batch_size=batch_size)
@@ -70,57 +120,398 @@ def precompute_embeddings(embed_model: str, batch_size: int = 128):
     # 1) 공격 벡터는 한 번에 임베딩 (개수가 1,000 정도라 메모리 여유)
     print("[1-1] 공격 텍스트 임베딩 중...")
     atk_vec = embedder.encode(atk_texts).astype("float32")
-    atk_path = VEC_DIR / f"attack_{safe_name(embed_model)}.npy"
-    np.save(atk_path, atk_vec)
+    atk_path = save_attack_vectors(embed_model, atk_vec)
     print(f"  - 공격 벡터 저장: {atk_path} (shape={atk_vec.shape})")
 
     # 2) 정상 텍스트는 memmap으로 chunk 임베딩
     print("[1-2] 정상 텍스트 임베딩 (chunk + memmap) 중...")
-    n_norm = len(norm_texts)
-    if n_norm == 0:
+    if len(norm_texts) == 0:
         print("  - 정상 텍스트가 없습니다. 건너뜀.")
         return atk_path, atk_texts
 
-    # 첫 batch 임베딩해서 차원 확인
-    first_batch = norm_texts[:batch_size]
-    first_vecs = embedder.encode(first_batch).astype("float32")
-    dim = first_vecs.shape[1]
+    embed_normals(
+        embedder, norm_texts, embed_model,
+        batch_size=batch_size,
+        concurrency=1 if embedder.is_local else concurrency,
+        rpm=rpm, tpm=tpm,
+        max_retries=max_retries,
+        restart=restart,
+    )
+    return atk_path, atk_texts
 
+
+# ------------------------------------------------------------
+# 정상 벡터: 동시 요청 + 체크포인트
+# ------------------------------------------------------------
+class Progress:
+    """
+    memmap 옆에 완료된 행 구간을 기록하는 체크포인트.
+    normal_{model}.progress.json = {n_normals, dim, texts_sha256, done: [[start, end], ...]}
+    """
+
+    def __init__(self, path: Path, n: int, dim: int, texts_sha256: str, done=None):
+        self.path = path
+        self.n = n
+        self.dim = dim
+        self.texts_sha256 = texts_sha256
+        self.done = done or []
+
+    @classmethod
+    def load(cls, path: Path):
+        if not path.exists():
+            return None
+        d = json.load(open(path, encoding="utf-8"))
+        return cls(path, d["n_normals"], d["dim"], d["texts_sha256"], [tuple(r) for r in d["done"]])
+
+    def add(self, start: int, end: int):
+        ranges = sorted(self.done + [(start, end)])
+        merged = [ranges[0]]
+        for s, e in ranges[1:]:
+            if s <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        self.done = merged
+
+    def completed_rows(self):
+        return sum(e - s for s, e in self.done)
+
+    def pending(self, batch_size: int):
+        """아직 끝나지 않은 [start, end) batch 목록."""
+        out, cursor = [], 0
+        for s, e in self.done + [(self.n, self.n)]:
+            for b in range(cursor, s, batch_size):
+                out.append((b, min(b + batch_size, s)))
+            cursor = max(cursor, e)
+        return out
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "n_normals": self.n,
+                "dim": self.dim,
+                "texts_sha256": self.texts_sha256,
+                "done": [list(r) for r in self.done],
+            }, f)
+        tmp.replace(self.path)
+
+
+def _texts_sha256(texts):
+    h = hashlib.sha256()
+    for t in texts:
+        h.update(t.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def embed_normals(embedder: Embedder, norm_texts, embed_model: str, batch_size: int = 128,
+                  concurrency: int = 4, rpm: float = 0, tpm: float = 0,
+                  max_retries: int = 6, restart: bool = False, flush_every: int = 20):
+    n_norm = len(norm_texts)
     norm_path = VEC_DIR / f"normal_{safe_name(embed_model)}.dat"
-    norm_mem = np.memmap(norm_path, dtype="float32", mode="w+", shape=(n_norm, dim))
-
-    # 첫 batch 기록
-    norm_mem[0:first_vecs.shape[0], :] = first_vecs
-    idx = first_vecs.shape[0]
-    print(f"  - 첫 batch 완료: {idx}/{n_norm}")
-
-    # 나머지 batch
-    while idx < n_norm:
-        batch_texts = norm_texts[idx: idx + batch_size]
-        vecs = embedder.encode(batch_texts).astype("float32")
-        end = idx + vecs.shape[0]
-        norm_mem[idx:end, :] = vecs
-        idx = end
-        print(f"  - 진행 중: {idx}/{n_norm}")
+    meta_path = VEC_DIR / f"normal_{safe_name(embed_model)}.meta.json"
+    prog_path = VEC_DIR / f"normal_{safe_name(embed_model)}.progress.json"
+
+    req_bucket = TokenBucket.per_minute(rpm)
+    tok_bucket = TokenBucket.per_minute(tpm)
+
+    def embed_batch(start, end):
+        texts = norm_texts[start:end]
+        if req_bucket:
+            req_bucket.acquire(1)
+        if tok_bucket:
+            # 토큰 수는 문자 4개 ≈ 1 토큰으로 추정
+            tok_bucket.acquire(sum(len(t) for t in texts) / 4)
+        # 체크포인트가 재시작을 담당하므로 텍스트 단위 캐시는 쓰지 않음
+        return embedder.encode(texts, use_cache=False, save_cache=False).astype("float32")
+
+    def on_retry(attempt, delay, err):
+        print(f"  - 재시도 {attempt}/{max_retries} ({delay:.1f}s 후): {err}")
+
+    def embed_with_retry(start, end):
+        return call_with_retry(embed_batch, start, end, max_retries=max_retries, on_retry=on_retry)
+
+    texts_sha = _texts_sha256(norm_texts)
+    progress = None if restart else Progress.load(prog_path)
+    if progress and (progress.n != n_norm or progress.texts_sha256 != texts_sha or not norm_path.exists()):
+        print("  - 체크포인트가 현재 데이터셋과 맞지 않아 처음부터 다시 계산합니다.")
+        progress = None
+
+    if progress:
+        norm_mem = np.memmap(norm_path, dtype="float32", mode="r+", shape=(n_norm, progress.dim))
+        print(f"  - 체크포인트에서 재개: {progress.completed_rows()}/{n_norm} 완료")
+    else:
+        # 첫 batch 임베딩해서 차원 확인
+        first_end = min(batch_size, n_norm)
+        first_vecs = embed_with_retry(0, first_end)
+        dim = first_vecs.shape[1]
+
+        norm_mem = np.memmap(norm_path, dtype="float32", mode="w+", shape=(n_norm, dim))
+        norm_mem[0:first_end, :] = first_vecs
+        norm_mem.flush()
+
+        progress = Progress(prog_path, n_norm, dim, texts_sha)
+        progress.add(0, first_end)
+        progress.save()
+        print(f"  - 첫 batch 완료: {first_end}/{n_norm}")
+
+    pending = progress.pending(batch_size)
+    remaining = sum(e - s for s, e in pending)
+    print(f"  - 남은 batch: {len(pending)} (rows={remaining}, concurrency={concurrency})")
+
+    t0 = time.perf_counter()
+    rows_done = 0
+    since_flush = 0
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = {pool.submit(embed_with_retry, s, e): (s, e) for s, e in pending}
+        for fut in as_completed(futures):
+            start, end = futures[fut]
+            norm_mem[start:end, :] = fut.result()
+            progress.add(start, end)
+            rows_done += end - start
+            since_flush += 1
+
+            # memmap 을 먼저 flush 해야 체크포인트가 실제 기록된 행만 가리킨다
+            if since_flush >= flush_every:
+                norm_mem.flush()
+                progress.save()
+                since_flush = 0
+
+            elapsed = time.perf_counter() - t0
+            rate = rows_done / elapsed if elapsed > 0 else 0.0
+            eta = (remaining - rows_done) / rate if rate > 0 else float("inf")
+            print(
+                f"  - 진행 중: {progress.completed_rows()}/{n_norm} "
+                f"({rate:.1f} rows/s, ETA {eta / 60:.1f} min)"
+            )
+    except BaseException:
+        # 실패/중단 시 대기 중인 batch 는 취소하고, 완료된 구간까지만 체크포인트에 남김
+        pool.shutdown(wait=True, cancel_futures=True)
+        norm_mem.flush()
+        progress.save()
+        print(f"  - 중단됨: {progress.completed_rows()}/{n_norm} 완료 (다시 실행하면 이어서 진행)")
+        raise
+    pool.shutdown(wait=True)
 
     norm_mem.flush()
+    progress.save()
+    dim = progress.dim
     del norm_mem
 
-    # meta 정보 저장
+    # meta 정보 저장 (완료 표시) 후 체크포인트 제거
     meta = {"n_normals": int(n_norm), "dim": int(dim)}
-    meta_path = VEC_DIR / f"normal_{safe_name(embed_model)}.meta.json"
+    if embedder.reduction is not None:
+        meta["reduction"] = embedder.reduction.describe()
     with open(meta_path, "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
+    prog_path.unlink(missing_ok=True)
 
     print(f"  - 정상 벡터 memmap 저장: {norm_path} (n={n_norm}, dim={dim})")
     print(f"  - meta 저장: {meta_path}")
 
+
+# ------------------------------------------------------------
+# 축소 차원 모드: 전체 차원 벡터에서 API 호출 없이 만들기
+# ------------------------------------------------------------
+def precompute_reduced(embed_model: str, chunk_rows: int = 8192, normal_texts: bool = True):
+    """
+    "모델@256" / "모델@pca256" 의 벡터를 기본 모델의 사전 계산 벡터로부터 만든다.
+    - truncate : 앞 dim 차원 + 재정규화 (OpenAI dimensions 파라미터 결과와 같음)
+    - pca      : 공격 + 정상 벡터 전체로 PCA 학습 → reduction_{model}.npz 저장 후 투영
+    """
+    base_model, reduction = parse_model_name(embed_model)
+    base_atk = VEC_DIR / f"attack_{safe_name(base_model)}.npy"
+    base_meta = VEC_DIR / f"normal_{safe_name(base_model)}.meta.json"
+    base_dat = VEC_DIR / f"normal_{safe_name(base_model)}.dat"
+    if not base_atk.exists():
+        raise RuntimeError(
+            f"기본 모델 벡터가 없습니다: {base_atk}\n"
+            f"--embed-model \"{base_model}\" 로 먼저 precompute 하세요."
+        )
+
+    atk_texts, norm_texts = load_dataset()
+    precompute_texts(atk_texts, norm_texts if normal_texts else None)
+    atk_full = np.load(base_atk, mmap_mode="r")
+    norm_full = None
+    if base_meta.exists() and base_dat.exists():
+        meta = json.load(open(base_meta))
+        norm_full = np.memmap(base_dat, dtype="float32", mode="r", shape=(meta["n_normals"], meta["dim"]))
+
+    def full_chunks():
+        yield atk_full
+        if norm_full is not None:
+            for s in range(0, norm_full.shape[0], chunk_rows):
+                yield norm_full[s:s + chunk_rows]
+
+    if reduction.kind == "pca":
+        print(f"[1/3] PCA 학습 ({atk_full.shape[1]} → {reduction.dim})")
+        reduction = fit_pca(full_chunks(), reduction.dim)
+        red_path = VEC_DIR / f"reduction_{safe_name(embed_model)}.npz"
+        reduction.save(red_path)
+        print(f"  - 설명 분산 비율: {reduction.explained_variance:.4f} → {red_path}")
+    else:
+        print(f"[1/3] 전체 차원 벡터 잘라내기 ({atk_full.shape[1]} → {reduction.dim})")
+
+    atk_vec = reduction.apply(atk_full)
+    atk_path = save_attack_vectors(embed_model, atk_vec)
+    print(f"  - 공격 벡터 저장: {atk_path} (shape={atk_vec.shape})")
+
+    if norm_full is not None:
+        n_norm = norm_full.shape[0]
+        norm_path = VEC_DIR / f"normal_{safe_name(embed_model)}.dat"
+        norm_mem = np.memmap(norm_path, dtype="float32", mode="w+", shape=(n_norm, reduction.dim))
+        for s in range(0, n_norm, chunk_rows):
+            norm_mem[s:s + chunk_rows] = reduction.apply(norm_full[s:s + chunk_rows])
+        norm_mem.flush()
+        del norm_mem
+
+        meta = {"n_normals": int(n_norm), "dim": reduction.dim,
+                "reduction": {**reduction.describe(), "base_model": base_model}}
+        with open(VEC_DIR / f"normal_{safe_name(embed_model)}.meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        print(f"  - 정상 벡터 memmap 저장: {norm_path} (n={n_norm}, dim={reduction.dim})")
+
     return atk_path, atk_texts
 
 
+def _sample_queries(embed_model: str, atk_vec, n_queries: int, seed: int = 0):
+    """
+    recall 측정용 질의: 정상 벡터 memmap 에서 무작위 샘플 (실제 트래픽과 유사).
+    정상 벡터가 없으면 공격 벡터에 노이즈를 섞어 사용.
+    """
+    rng = np.random.default_rng(seed)
+    meta_path = VEC_DIR / f"normal_{safe_name(embed_model)}.meta.json"
+    dat_path = VEC_DIR / f"normal_{safe_name(embed_model)}.dat"
+
+    if meta_path.exists() and dat_path.exists():
+        meta = json.load(open(meta_path))
+        mem = np.memmap(dat_path, dtype="float32", mode="r", shape=(meta["n_normals"], meta["dim"]))
+        rows = np.sort(rng.choice(mem.shape[0], min(n_queries, mem.shape[0]), replace=False))
+        return np.asarray(mem[rows])
+
+    rows = rng.choice(atk_vec.shape[0], min(n_queries, atk_vec.shape[0]), replace=False)
+    noise = rng.normal(scale=0.05 / np.sqrt(atk_vec.shape[1]), size=(len(rows), atk_vec.shape[1]))
+    return (atk_vec[rows] + noise).astype("float32")
+
+
+def precompute_index(embed_model: str, atk_vec_path: Path, kind: str = "flat",
+                     n_lists=None, nprobe=None, n_queries: int = 1000):
+    """
+    공격 벡터 검색 인덱스를 만들어 precomputed/index/ 에 저장.
+
+    - flat 인덱스(정규화된 벡터)는 항상 저장
+    - kind 가 근사 인덱스(ivf)면 추가로 만들고 exact 대비 recall 리포트를 남김
+      (코퍼스 크기 N/16, N/4, N 별 recall / 질의당 훑는 벡터 수도 "scaling" 에 기록)
+    """
+    print(f"[1-3] 공격 벡터 인덱스 생성 중... (kind={kind})")
+    atk_vec = np.load(atk_vec_path)
+
+    flat = FlatIndex(atk_vec)
+    flat_path = flat.save(INDEX_DIR / f"attack_{safe_name(embed_model)}.flat")
+    print(f"  - flat 인덱스 저장: {flat_path}")
+
+    if kind == "flat":
+        return flat_path
+
+    kwargs = {}
+    if n_lists:
+        kwargs["n_lists"] = n_lists
+    if nprobe:
+        kwargs["nprobe"] = nprobe
+    index = build_index(kind, atk_vec, **kwargs)
+    out_path = index.save(INDEX_DIR / f"attack_{safe_name(embed_model)}.{kind}")
+    print(f"  - {kind} 인덱스 저장: {out_path}")
+
+    queries = _sample_queries(embed_model, atk_vec, n_queries)
+    report = recall_report(index, flat, queries, k=10)
+    sizes = sorted({n for n in (len(atk_vec) // 16, len(atk_vec) // 4) if n >= 1000} | {len(atk_vec)})
+    report["scaling"] = scaling_report(
+        atk_vec, lambda subset: _sample_queries(embed_model, subset, n_queries // 4), sizes, k=10,
+        **{key: value for key, value in kwargs.items() if key == "nprobe"},
+    )
+    report_path = INDEX_DIR / f"attack_{safe_name(embed_model)}.{kind}.recall.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"  - recall 리포트: {report_path}")
+    for key, value in report.items():
+        if key != "scaling":
+            print(f"      {key}: {value}")
+    for row in report["scaling"]:
+        print(f"      N={row['n_vectors']}: recall@1={row['recall@1']:.3f} "
+              f"scanned/query={row['scanned_per_query']:.0f} ({row['scanned_per_sqrt_n']:.1f}*sqrt(N))")
+    return out_path
+
+
+def precompute_quantized(embed_model: str, atk_vec_path: Path, kinds, pq_m=None,
+                         rerank_k: int = 32, n_queries: int = 500, chunk_rows: int = 65_536):
+    """
+    공격 / 정상 벡터 저장소의 압축본 (fp16 / int8 / pq) 을 만들고
+    판정 drift 리포트를 남긴다.
+
+    - 공격: precomputed/index/attack_{model}.{kind}/   (SKYSHIELD_INDEX={kind} 로 서빙)
+    - 정상: precomputed/vectors/normal_{model}.{kind}/ (load_normal_memmap(quant=kind))
+    - 리포트: precomputed/vectors/quantize_{model}.drift.json
+    """
+    print(f"[1-4] 벡터 압축 중... (kinds={','.join(kinds)})")
+    atk_vec = np.load(atk_vec_path)
+    codec_kwargs = lambda kind: {"m": pq_m} if kind == "pq" and pq_m else {}
+
+    meta_path = VEC_DIR / f"normal_{safe_name(embed_model)}.meta.json"
+    dat_path = VEC_DIR / f"normal_{safe_name(embed_model)}.dat"
+    norm_mem = None
+    if meta_path.exists() and dat_path.exists():
+        meta = json.load(open(meta_path))
+        norm_mem = np.memmap(dat_path, dtype="float32", mode="r", shape=(meta["n_normals"], meta["dim"]))
+
+    atk_exact = FlatIndex(atk_vec)
+    atk_queries = _sample_queries(embed_model, atk_vec, n_queries)
+    report = {"embed_model": embed_model, "attack": [], "normal": []}
+
+    for kind in kinds:
+        # 1) 공격 벡터
+        index = QuantizedIndex.build(kind, atk_vec, **codec_kwargs(kind))
+        out_path = index.save(INDEX_DIR / f"attack_{safe_name(embed_model)}.{kind}")
+        print(f"  - 공격 {kind} 저장: {out_path} ({index.nbytes / 1e6:.1f}MB)")
+
+        report["attack"].append(drift_report(index, atk_exact, atk_queries, atk_exact.vectors.nbytes))
+        index.rerank_vectors, index.rerank_k = atk_exact.vectors, rerank_k
+        report["attack"].append(drift_report(index, atk_exact, atk_queries, atk_exact.vectors.nbytes))
+
+        # 2) 정상 벡터 (chunk 단위로 압축, 질의는 공격 벡터 샘플)
+        if norm_mem is None:
+            continue
+        q_path = VEC_DIR / f"normal_{safe_name(embed_model)}.{kind}"
+        norm_index = write_quantized_store(kind, norm_mem, q_path, chunk_rows=chunk_rows, **codec_kwargs(kind))
+        print(f"  - 정상 {kind} 저장: {q_path} ({norm_index.nbytes / 1e6:.1f}MB)")
+
+        rng = np.random.default_rng(0)
+        rows = rng.choice(len(atk_vec), min(n_queries, len(atk_vec)), replace=False)
+        norm_exact = ChunkedFlatIndex(norm_mem, chunk_rows=chunk_rows)
+        report["normal"].append(drift_report(norm_index, norm_exact, atk_vec[rows], norm_mem.nbytes))
+        norm_index.rerank_vectors, norm_index.rerank_k = norm_mem, rerank_k
+        report["normal"].append(drift_report(norm_index, norm_exact, atk_vec[rows], norm_mem.nbytes))
+
+    report_path = VEC_DIR / f"quantize_{safe_name(embed_model)}.drift.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"  - drift 리포트: {report_path}")
+    for side in ("attack", "normal"):
+        for r in report[side]:
+            print(
+                f"      {side:6s} {r['kind']:4s} rerank={r['rerank_k']:<3d} "
+                f"x{r['compression']:.1f}  err_max={r['score_abs_err_max']:.4f}  "
+                f"flip={max(r['decision_flip_rate'].values()):.4f}"
+            )
+
+
 def precompute_clusters(embed_model: str, summ_model: str, atk_vec_path: Path, atk_texts):
     """
-    공격 벡터 + 텍스트를 이용해 HDBSCAN 클러스터링 + 클러스터 이름 생성 후 pkl에 저장.
+    공격 벡터 + 텍스트를 이용해 HDBSCAN 클러스터링 + 클러스터 이름 생성 후
+    버전 관리되는 아티팩트 번들(npy + manifest.json)로 저장.
     """
     PRE_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -134,19 +525,63 @@ def precompute_clusters(embed_model: str, summ_model: str, atk_vec_path: Path, a
     analyzer.fit(atk_vec)
     analyzer.generate_cluster_names(atk_texts, summarizer)
 
-    fname = f"cluster_{safe_name(embed_model)}_{safe_name(summ_model)}.pkl"
-    out_path = PRE_DIR / fname
+    out_dir = ARTIFACT_DIR / f"cluster_{safe_name(embed_model)}_{safe_name(summ_model)}"
+    print(f"[3/3] 클러스터 아티팩트 저장 중... -> {out_dir}")
+    save_cluster_artifact(out_dir, analyzer, atk_vec, embed_model, summ_model)
 
-    print(f"[3/3] 클러스터 분석기 저장 중... -> {out_path}")
-    import pickle
+    print("완료! 이제 FastAPI에서 사전 계산된 클러스터를 재사용할 수 있습니다.")
+    return analyzer
 
-    # 🔥 Summarizer(OpenAI 클라이언트)는 pickle 불가 + 런타임에서 필요 없으므로 제거
-    analyzer.summarizer = None
 
-    with open(out_path, "wb") as f:
-        pickle.dump(analyzer, f)
+def precompute_projection(embed_model: str, atk_vec_path: Path, analyzer=None,
+                          n_attacks: int = 1500, n_normals: int = 1500):
+    """
+    시각화용 UMAP 을 모델별로 한 번 학습해 저장 (/visualize 는 transform 만 수행).
+    precomputed/projection/umap_{model}/ (src/projection.py 포맷)
+    """
+    print(f"[+] UMAP 투영 학습 중... (공격 {n_attacks} / 정상 {n_normals} 샘플)")
+    atk_vec = np.load(atk_vec_path)
 
-    print("완료! 이제 FastAPI에서 사전 계산된 클러스터를 재사용할 수 있습니다.")
+    meta_path = VEC_DIR / f"normal_{safe_name(embed_model)}.meta.json"
+    dat_path = VEC_DIR / f"normal_{safe_name(embed_model)}.dat"
+    norm_mem = None
+    if meta_path.exists() and dat_path.exists():
+        meta = json.load(open(meta_path))
+        norm_mem = np.memmap(dat_path, dtype="float32", mode="r", shape=(meta["n_normals"], meta["dim"]))
+
+    centers, center_ids = None, None
+    if analyzer is not None:
+        analyzer._ensure_center_matrix()
+        centers, center_ids = analyzer.center_matrix, analyzer.center_ids
+
+    t0 = time.perf_counter()
+    projection, reducer = fit_projection(
+        atk_vec, norm_mem, centers=centers, center_ids=center_ids,
+        n_attacks=n_attacks, n_normals=n_normals,
+    )
+    projection.meta["embed_model"] = embed_model
+    out_dir = projection.save(PROJECTION_DIR / f"umap_{safe_name(embed_model)}", reducer=reducer)
+    print(f"  - 저장: {out_dir} (n={len(projection)}, {time.perf_counter() - t0:.1f}s)")
+    return out_dir
+
+
+def convert_pickle(embed_model: str, summ_model: str):
+    """
+    예전 포맷(cluster_*.pkl)을 재클러스터링 없이 아티팩트 번들로 변환.
+    (pickle 을 읽기 위해 이 단계에서만 hdbscan 이 필요)
+    """
+    import pickle
+
+    pkl_path = PRE_DIR / f"cluster_{safe_name(embed_model)}_{safe_name(summ_model)}.pkl"
+    with open(pkl_path, "rb") as f:
+        analyzer = pickle.load(f)
+
+    atk_vec = np.load(VEC_DIR / f"attack_{safe_name(embed_model)}.npy")
+    # 예전 pickle 은 prediction data 가 없으므로 여기서 밀도 membership 데이터를 만든다
+    analyzer.ensure_density(atk_vec)
+    out_dir = ARTIFACT_DIR / f"cluster_{safe_name(embed_model)}_{safe_name(summ_model)}"
+    save_cluster_artifact(out_dir, analyzer, atk_vec, embed_model, summ_model)
+    print(f"변환 완료: {pkl_path} -> {out_dir}")
 
 
 def main():
@@ -154,17 +589,68 @@ def main():
     parser.add_argument("--embed-model", type=str, default="OpenAI Embedding")
     parser.add_argument("--summ-model", type=str, default="OpenAI")
     parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="동시에 보낼 임베딩 API batch 수 (로컬 모델은 1)")
+    parser.add_argument("--rpm", type=float, default=0, help="분당 요청 수 제한 (0=제한 없음)")
+    parser.add_argument("--tpm", type=float, default=0, help="분당 토큰 수 제한 (0=제한 없음)")
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--restart", action="store_true",
+                        help="체크포인트를 무시하고 정상 벡터를 처음부터 다시 계산")
+    parser.add_argument("--index", type=str, default="flat", choices=["flat", "ivf"])
+    parser.add_argument("--ivf-lists", type=int, default=None)
+    parser.add_argument("--ivf-nprobe", type=int, default=None)
+    parser.add_argument("--quantize", type=str, default="",
+                        help="쉼표로 구분한 압축 형식 (fp16,int8,pq)")
+    parser.add_argument("--pq-m", type=int, default=None, help="PQ 부분공간 수 (기본 dim/8)")
+    parser.add_argument("--umap-samples", type=int, default=1500,
+                        help="UMAP 투영 학습에 쓸 공격 / 정상 샘플 수 (각각)")
+    parser.add_argument("--no-projection", action="store_true",
+                        help="시각화용 UMAP 투영을 만들지 않음")
+    parser.add_argument("--no-normal-texts", action="store_true",
+                        help="텍스트 sidecar 에 정상 텍스트는 저장하지 않음 (공격 텍스트만)")
+    parser.add_argument("--convert-pickle", action="store_true",
+                        help="기존 cluster_*.pkl 을 아티팩트 번들로 변환만 수행")
     args = parser.parse_args()
 
     embed_model = args.embed_model
     summ_model = args.summ_model
 
+    if args.convert_pickle:
+        convert_pickle(embed_model, summ_model)
+        return
+
     print(f"[0] embed_model={embed_model}, summ_model={summ_model}")
-    atk_vec_path, atk_texts = precompute_embeddings(
+    base_model, reduction = parse_model_name(embed_model)
+    if reduction is not None and (
+        reduction.kind == "pca" or (VEC_DIR / f"attack_{safe_name(base_model)}.npy").exists()
+    ):
+        # 축소 모드: 기본 모델 벡터가 있으면 API 를 다시 부르지 않는다 (pca 는 필수)
+        atk_vec_path, atk_texts = precompute_reduced(embed_model, normal_texts=not args.no_normal_texts)
+    else:
+        atk_vec_path, atk_texts = precompute_embeddings(
+            embed_model,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            rpm=args.rpm,
+            tpm=args.tpm,
+            max_retries=args.max_retries,
+            restart=args.restart,
+            normal_texts=not args.no_normal_texts,
+        )
+    precompute_index(
         embed_model,
-        batch_size=args.batch_size,
+        atk_vec_path,
+        kind=args.index,
+        n_lists=args.ivf_lists,
+        nprobe=args.ivf_nprobe,
     )
-    precompute_clusters(embed_model, summ_model, atk_vec_path, atk_texts)
+    kinds = [k.strip() for k in args.quantize.split(",") if k.strip()]
+    if kinds:
+        precompute_quantized(embed_model, atk_vec_path, kinds, pq_m=args.pq_m)
+    analyzer = precompute_clusters(embed_model, summ_model, atk_vec_path, atk_texts)
+    if not args.no_projection:
+        precompute_projection(embed_model, atk_vec_path, analyzer,
+                              n_attacks=args.umap_samples, n_normals=args.umap_samples)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+"""
+클러스터 분석 결과 아티팩트 (pickle 대체).
+
+precomputed/artifacts/cluster_{embed}_{summ}/
+    manifest.json       포맷 버전, 모델 정보, 파일별 sha256 / shape / dtype
+    attack_vectors.npy  공격 벡터 (float32)
+    center_ids.npy      클러스터 id (int64)
+    centers.npy         정규화된 클러스터 중심 (float32, center_ids 순서)
+    labels.npy          공격 벡터별 HDBSCAN 라벨 (int64, -1 = noise)
+    probabilities.npy   공격 벡터별 membership 확률 (float32)
+    cluster_names.json  {cluster_id: 이름}
+    density_*.npy       (선택) 밀도 기반 membership 배열 (src/density.py)
+
+모든 배열은 읽기 전용 mmap (SKYSHIELD_SHARED_STORE 면 워커 공용 shared memory,
+src/shared_store.py) 으로 복사 없이 올리며,
+서빙 시 hdbscan 등 클러스터링 라이브러리를 import 하지 않는다.
+"""
+
+import json
+import time
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from .cluster_analyzer import ClusterAnalyzer
+from .density import ARRAY_NAMES as DENSITY_ARRAYS, DensityModel
+from .index import l2_normalize
+from .reduction import parse_model_name
+from .shared_store import load_npy
+
+ARTIFACT_FORMAT = "skyshield-cluster"
+ARTIFACT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def _sha256(path: Path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _file_entry(path: Path, arr=None):
+    entry = {"sha256": _sha256(path), "bytes": path.stat().st_size}
+    if arr is not None:
+        entry["shape"] = list(arr.shape)
+        entry["dtype"] = str(arr.dtype)
+    return entry
+
+
+# ------------------------------------------------------------
+# 저장
+# ------------------------------------------------------------
+def _reduction_info(embed_model):
+    """축소 차원 모드 ("모델@256" / "모델@pca256") 이면 방식과 차원."""
+    base_model, reduction = parse_model_name(embed_model)
+    if reduction is None:
+        return None
+    return {"kind": reduction.kind, "dim": reduction.dim, "base_model": base_model}
+
+
+def save_cluster_artifact(out_dir, analyzer: ClusterAnalyzer, attack_vecs,
+                          embed_model: str, summ_model: str, extra=None):
+    """extra 는 manifest 에 그대로 합쳐진다 (예: 온라인 편입 통계 "ingest")."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    analyzer._ensure_center_matrix()
+    arrays = {
+        "attack_vectors": np.ascontiguousarray(attack_vecs, dtype="float32"),
+        "center_ids": np.asarray(analyzer.center_ids, dtype="int64"),
+        "centers": l2_normalize(analyzer.center_matrix) if len(analyzer.center_ids)
+                   else np.empty((0, np.shape(attack_vecs)[1]), dtype="float32"),
+        "labels": np.asarray(analyzer.labels, dtype="int64"),
+        "probabilities": np.asarray(analyzer.probabilities, dtype="float32"),
+    }
+
+    density = getattr(analyzer, "density", None)
+    if density is not None:
+        if len(density) != arrays["attack_vectors"].shape[0]:
+            raise RuntimeError(
+                f"밀도 데이터 행 수({len(density)})와 공격 벡터 수"
+                f"({arrays['attack_vectors'].shape[0]})가 다릅니다."
+            )
+        for name, arr in density.arrays().items():
+            arrays[f"density_{name}"] = np.ascontiguousarray(arr)
+
+    files = {}
+    for name, arr in arrays.items():
+        path = out_dir / f"{name}.npy"
+        np.save(path, arr)
+        files[path.name] = _file_entry(path, arr)
+
+    names = {str(int(k)): v for k, v in (analyzer.cluster_names or {}).items()}
+    names_path = out_dir / "cluster_names.json"
+    with open(names_path, "w", encoding="utf-8") as f:
+        json.dump(names, f, ensure_ascii=False, indent=2)
+    files[names_path.name] = _file_entry(names_path)
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "embed_model": embed_model,
+        "summ_model": summ_model,
+        "dim": int(arrays["attack_vectors"].shape[1]),
+        "reduction": _reduction_info(embed_model),
+        "n_attacks": int(arrays["attack_vectors"].shape[0]),
+        "n_clusters": int(len(arrays["center_ids"])),
+        "hdbscan": {
+            "min_cluster_size": analyzer.min_cluster_size,
+            "min_samples": analyzer.min_samples,
+        },
+        "density": {"min_samples": density.min_samples} if density is not None else None,
+        "files": files,
+        **(extra or {}),
+    }
+    # manifest 는 마지막에 기록 → manifest 가 있으면 번들이 완성된 것
+    tmp = out_dir / (MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp.replace(out_dir / MANIFEST)
+    return out_dir
+
+
+# ------------------------------------------------------------
+# 로드
+# ------------------------------------------------------------
+def read_manifest(path):
+    path = Path(path)
+    manifest_path = path / MANIFEST
+    if not manifest_path.exists():
+        raise RuntimeError(f"아티팩트 manifest 를 찾을 수 없습니다: {manifest_path}")
+
+    manifest = json.load(open(manifest_path, encoding="utf-8"))
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise RuntimeError(f"아티팩트 포맷이 다릅니다: {manifest.get('format')} ({path})")
+    if manifest.get("format_version") != ARTIFACT_VERSION:
+        raise RuntimeError(
+            f"지원하지 않는 아티팩트 버전입니다: {manifest.get('format_version')} ({path})"
+        )
+    return manifest
+
+
+def verify_artifact(path, manifest=None):
+    path = Path(path)
+    manifest = manifest or read_manifest(path)
+    for fname, entry in manifest["files"].items():
+        actual = _sha256(path / fname)
+        if actual != entry["sha256"]:
+            raise RuntimeError(f"아티팩트 checksum 불일치: {path / fname}")
+    return manifest
+
+
+def load_cluster_artifact(path, verify=True, mmap=True):
+    """
+    아티팩트 번들 → ClusterAnalyzer (+ 공격 벡터, manifest).
+    fit 된 HDBSCAN 객체는 포함하지 않으므로 detect 계열만 사용할 수 있다.
+    """
+    path = Path(path)
+    manifest = verify_artifact(path) if verify else read_manifest(path)
+
+    def arr(name):
+        # mmap 이면 읽기 전용 (SKYSHIELD_SHARED_STORE 면 호스트 공용 shared memory)
+        return load_npy(path / f"{name}.npy", mmap=mmap)
+
+    analyzer = ClusterAnalyzer(
+        min_cluster_size=manifest["hdbscan"]["min_cluster_size"],
+        min_samples=manifest["hdbscan"]["min_samples"],
+    )
+    analyzer.labels = arr("labels")
+    analyzer.probabilities = arr("probabilities")
+    analyzer.center_ids = np.load(path / "center_ids.npy")
+    analyzer.center_matrix = arr("centers")
+    analyzer.cluster_centers = {
+        int(cid): analyzer.center_matrix[i] for i, cid in enumerate(analyzer.center_ids)
+    }
+
+    names = json.load(open(path / "cluster_names.json", encoding="utf-8"))
+    analyzer.cluster_names = {int(k): v for k, v in names.items()}
+
+    attack_vectors = arr("attack_vectors")
+    if manifest.get("density"):
+        analyzer.density = DensityModel(
+            attack_vectors,
+            manifest["density"]["min_samples"],
+            {name: arr(f"density_{name}") for name in DENSITY_ARRAYS},
+        )
+
+    return analyzer, attack_vectors, manifest
@@ -0,0 +1,102 @@
+"""
+요청 간 임베딩 micro-batching.
+
+동시에 들어온 /analyze 요청은 각자 embedder.aencode([text]) 를 부르므로
+API 왕복(또는 로컬 모델 forward) 이 요청 수만큼 생긴다.
+MicroBatcher 는 짧은 창(window) 동안 들어온 텍스트를 모아 한 번에 보내고
+결과 행을 요청별 Future 로 나눠 준다.
+
+    - 창은 첫 텍스트가 들어온 순간 시작 (SKYSHIELD_MICROBATCH_WINDOW_MS, 기본 2ms)
+    - max_batch 개가 모이면 창을 기다리지 않고 바로 전송 (SKYSHIELD_MICROBATCH_MAX, 기본 64)
+    - 같은 배치 안의 중복 텍스트는 한 번만 계산
+    - 배치 호출이 실패하면 그 배치의 호출자 모두에게 같은 예외 (배치가 취소되면 호출자도 취소)
+    - 호출자가 타임아웃으로 취소돼도 배치는 계속 진행 (다른 호출자 결과에 영향 없음)
+
+지표: skyshield_embed_batch_size (배치당 텍스트 수),
+      skyshield_embed_queue_seconds (텍스트별 대기 시간).
+window 를 0 으로 두면 get_embedder 가 batcher 를 만들지 않는다 (요청별 개별 호출).
+"""
+
+import os
+import time
+import asyncio
+
+from .metrics import EMBED_BATCH_SIZE, EMBED_QUEUE_SECONDS
+
+MICROBATCH_WINDOW_MS = float(os.getenv("SKYSHIELD_MICROBATCH_WINDOW_MS", "2"))
+MICROBATCH_MAX = int(os.getenv("SKYSHIELD_MICROBATCH_MAX", "64"))
+
+
+class MicroBatcher:
+    def __init__(self, encode_fn, window_ms=MICROBATCH_WINDOW_MS, max_batch=MICROBATCH_MAX, name=""):
+        self.encode_fn = encode_fn          # async (list[str]) → (n, dim) 행 순서대로
+        self.window = max(float(window_ms), 0.0) / 1000
+        self.max_batch = max(int(max_batch), 1)
+        self.name = name                    # 지표 라벨 (embed_model)
+        self._loop = None
+        self._pending = []                  # [(text, future, enqueued_at)]
+        self._timer = None
+        self._tasks = set()                 # 진행 중 배치 Task (루프는 약한 참조만 가짐)
+        self.batches = 0
+        self.items = 0
+
+    @classmethod
+    def from_env(cls, encode_fn, name=""):
+        """SKYSHIELD_MICROBATCH_WINDOW_MS=0 이면 None (micro-batching 끔)."""
+        if MICROBATCH_WINDOW_MS <= 0:
+            return None
+        return cls(encode_fn, MICROBATCH_WINDOW_MS, MICROBATCH_MAX, name=name)
+
+    async def submit(self, text):
+        """텍스트 하나를 큐에 넣고 그 행(벡터)을 기다린다."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Embedder 는 프로세스 단위 캐시라 다른 이벤트 루프에서 재사용될 수 있음
+            self._loop, self._pending, self._timer = loop, [], None
+
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            EMBED_QUEUE_SECONDS.observe(self.name, value=now - enqueued_at)
+
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        EMBED_BATCH_SIZE.observe(self.name, value=len(texts))
+        self.batches += 1
+        self.items += len(batch)
+
+        try:
+            vecs = await self.encode_fn(texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            # 배치 Task 가 취소되면 (루프 종료 등) 기다리던 호출자도 취소로 깨운다
+            for _, future, _ in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+
+        by_text = dict(zip(texts, vecs))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
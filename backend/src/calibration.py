@@ -0,0 +1,231 @@
+"""
+오프라인 임계값 보정 (calibrate_thresholds.py).
+
+사전 계산된 공격 / 정상 벡터에 대해 점수를 한 번만 계산한 뒤
+(base_threshold × sensitivity × S-curve boost) 격자 전체를 numpy 연산으로 평가한다.
+
+    1) 점수 (한 번)
+       - score_basic : 공격 벡터 최대 코사인 유사도 (공격 샘플은 자기 자신 제외, leave-one-out)
+       - cluster_sim : 클러스터 중심 최대 유사도 (centroid 모드, 아티팩트가 있을 때만)
+       - length      : 텍스트 길이 (length-adaptive threshold 용)
+       정상 벡터는 memmap 을 chunk 단위로 훑으며 같은 chunk 로 두 점수를 함께 계산한다.
+    2) 격자 (점수 재계산 없음)
+       adaptive = min(ADAPTIVE_MAX, base + boost(length))
+       basic    = BLOCK / REVIEW / ALLOW  (SkyShield._decide)
+       cluster  = cluster_sim < novel → BLOCK, < susp → REVIEW, 아니면 basic  (/analyze 와 동일)
+
+양성(positive) 기준은 두 가지를 함께 낸다.
+    block : BLOCK 만 양성
+    flag  : BLOCK + REVIEW 를 양성
+
+주의: 클러스터는 공격 벡터로 학습되었으므로 공격 샘플의 cluster_sim 은 in-sample 값이다.
+"""
+
+import numpy as np
+
+from .detector import SkyShield
+from .index import FlatIndex, l2_normalize
+from .utils import ADAPTIVE_MAX, LENGTH_BOOST, length_boost, sensitivity_thresholds
+
+# 판정 코드 (int8 배열)
+ALLOW, REVIEW, BLOCK = 0, 1, 2
+PASS = -1   # 클러스터 단계가 판정을 넘기는 경우 (KNOWN_ATTACK → basic 판정 사용)
+
+DEFAULT_BASE_THRESHOLDS = np.round(np.arange(0.20, 0.901, 0.02), 2)
+DEFAULT_SENSITIVITIES = np.round(np.arange(0.0, 1.001, 0.1), 2)
+DEFAULT_BOOSTS = (LENGTH_BOOST,)
+
+# UI 기본값 (frontend App.jsx: baseThreshold 40, sensitivity 40)
+CURRENT_BASE_THRESHOLD = 0.40
+CURRENT_SENSITIVITY = 0.40
+
+
+# ------------------------------------------------------------
+# 1) 점수 계산 (한 번)
+# ------------------------------------------------------------
+def attack_scores(atk_vecs, chunk_rows=4096):
+    """공격 샘플별 다른 공격 벡터와의 최대 유사도 (자기 자신 제외)."""
+    atk = l2_normalize(atk_vecs)
+    n = atk.shape[0]
+    out = np.full(n, -1.0, dtype="float32")
+    if n < 2:
+        return out
+
+    for s in range(0, n, chunk_rows):
+        e = min(n, s + chunk_rows)
+        sims = atk[s:e] @ atk.T
+        sims[np.arange(e - s), np.arange(s, e)] = -np.inf
+        out[s:e] = sims.max(axis=1)
+    return out
+
+
+def cluster_scores(analyzer, vecs):
+    """centroid 모드 cluster_sim (클러스터가 없으면 -1 → /analyze 와 같이 NOVEL)."""
+    if analyzer is None:
+        return None
+    sims = analyzer.center_similarities(np.atleast_2d(vecs))
+    if sims.shape[1] == 0:
+        return np.full(sims.shape[0], -1.0, dtype="float32")
+    return sims.max(axis=1).astype("float32")
+
+
+def normal_scores(normal_vecs, atk_vecs, analyzer=None, rows=None, chunk_rows=8192,
+                  transform=None):
+    """
+    정상 벡터(memmap 가능)를 chunk 단위로 읽어 score_basic / cluster_sim 계산.
+    rows 를 주면 그 행만 (정렬된 인덱스) 사용한다.
+    transform 을 주면 읽은 chunk 에 먼저 적용한다 (축소 차원 비교 등).
+    """
+    index = FlatIndex(atk_vecs)
+    rows = np.arange(normal_vecs.shape[0]) if rows is None else np.asarray(rows)
+    basic = np.empty(len(rows), dtype="float32")
+    cluster = np.empty(len(rows), dtype="float32") if analyzer is not None else None
+
+    for s in range(0, len(rows), chunk_rows):
+        e = min(len(rows), s + chunk_rows)
+        chunk = np.asarray(normal_vecs[rows[s:e]], dtype="float32")
+        if transform is not None:
+            chunk = transform(chunk)
+        basic[s:e] = index.max_similarity(chunk)
+        if cluster is not None:
+            cluster[s:e] = cluster_scores(analyzer, chunk)
+    return basic, cluster
+
+
+# ------------------------------------------------------------
+# 2) 격자 평가
+# ------------------------------------------------------------
+def _rates(final, labels):
+    """final (n_base, n) 판정 코드 → block / flag 기준 TP, FP 개수 (n_base,)."""
+    pos = labels == 1
+    blocked = final == BLOCK
+    flagged = final >= REVIEW
+    return (
+        blocked[:, pos].sum(axis=1), blocked[:, ~pos].sum(axis=1),
+        flagged[:, pos].sum(axis=1), flagged[:, ~pos].sum(axis=1),
+        (final == REVIEW).sum(axis=1),
+    )
+
+
+def _metrics(tp, fp, n_pos, n_neg):
+    tpr = tp / max(n_pos, 1)
+    fpr = fp / max(n_neg, 1)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    f1 = 2 * precision * tpr / (precision + tpr) if precision + tpr else 0.0
+    return {"tpr": round(tpr, 6), "fpr": round(fpr, 6),
+            "precision": round(precision, 6), "f1": round(f1, 6)}
+
+
+def evaluate_grid(scores, labels, lengths, cluster_sims=None,
+                  base_thresholds=DEFAULT_BASE_THRESHOLDS,
+                  sensitivities=DEFAULT_SENSITIVITIES,
+                  boosts=DEFAULT_BOOSTS):
+    """
+    격자점별 block / flag 지표 행 목록.
+    boost 당 basic 판정 (n_base, n) 을 한 번 만들고, 민감도마다 클러스터 판정만 덮어쓴다.
+    cluster_sims 가 None 이면 클러스터 단계 없이 SkyShield 기본 판정만 평가 (sensitivity 무시).
+    """
+    scores = np.asarray(scores, dtype="float32")
+    labels = np.asarray(labels)
+    bases = np.asarray(base_thresholds, dtype="float32")
+    n_pos = int((labels == 1).sum())
+    n_neg = int(len(labels) - n_pos)
+    n = len(labels)
+
+    rows = []
+    for amp in boosts:
+        thr = np.minimum(ADAPTIVE_MAX, bases[:, None] + length_boost(lengths, amp)[None, :])
+        basic = np.where(scores >= thr, BLOCK,
+                         np.where(scores >= thr * SkyShield.REVIEW_RATIO, REVIEW, ALLOW)).astype("int8")
+
+        sens_list = sensitivities if cluster_sims is not None else (None,)
+        for sens in sens_list:
+            if sens is None:
+                final = basic
+            else:
+                novel_thr, susp_thr = sensitivity_thresholds(float(sens))
+                cluster = np.where(cluster_sims < novel_thr, BLOCK,
+                                   np.where(cluster_sims < susp_thr, REVIEW, PASS)).astype("int8")
+                final = np.where(cluster >= 0, cluster, basic)
+
+            tp_b, fp_b, tp_f, fp_f, n_review = _rates(final, labels)
+            for i, base in enumerate(bases):
+                rows.append({
+                    "base_threshold": round(float(base), 4),
+                    "sensitivity": None if sens is None else round(float(sens), 4),
+                    "boost": round(float(amp), 4),
+                    "block": _metrics(int(tp_b[i]), int(fp_b[i]), n_pos, n_neg),
+                    "flag": _metrics(int(tp_f[i]), int(fp_f[i]), n_pos, n_neg),
+                    "review_rate": round(float(n_review[i]) / max(n, 1), 6),
+                })
+    return rows
+
+
+# ------------------------------------------------------------
+# 3) 임계값 없는 score_basic ROC / PR
+# ------------------------------------------------------------
+def score_curves(scores, labels, points=None):
+    """
+    score_basic 자체의 ROC / PR 곡선 (고정 임계값 points 에서) + ROC AUC.
+    정렬 1회 + searchsorted 로 모든 임계값을 한 번에 계산한다.
+    """
+    points = np.round(np.arange(0.0, 1.001, 0.02), 2) if points is None else np.asarray(points)
+    scores = np.asarray(scores, dtype="float64")
+    labels = np.asarray(labels)
+    pos = np.sort(scores[labels == 1])
+    neg = np.sort(scores[labels == 0])
+
+    tp = len(pos) - np.searchsorted(pos, points, side="left")
+    fp = len(neg) - np.searchsorted(neg, points, side="left")
+    tpr = tp / max(len(pos), 1)
+    fpr = fp / max(len(neg), 1)
+    precision = np.divide(tp, tp + fp, out=np.zeros(len(points)), where=(tp + fp) > 0)
+
+    # AUC = P(score_pos > score_neg) + P(동점) / 2
+    auc = None
+    if len(pos) and len(neg):
+        below = np.searchsorted(neg, pos, side="left")
+        ties = np.searchsorted(neg, pos, side="right") - below
+        auc = (below.sum() + 0.5 * ties.sum()) / (len(pos) * len(neg))
+
+    return {
+        "auc": None if auc is None else round(float(auc), 6),
+        "table": [
+            {"threshold": round(float(t), 4), "tpr": round(float(a), 6),
+             "fpr": round(float(b), 6), "precision": round(float(c), 6)}
+            for t, a, b, c in zip(points, tpr, fpr, precision)
+        ],
+    }
+
+
+# ------------------------------------------------------------
+# 4) 추천 운영점
+# ------------------------------------------------------------
+def _find(rows, base, sens, boost):
+    for row in rows:
+        if (abs(row["base_threshold"] - base) < 1e-6 and abs(row["boost"] - boost) < 1e-6
+                and (row["sensitivity"] is None or abs(row["sensitivity"] - sens) < 1e-6)):
+            return row
+    return None
+
+
+def recommend(rows, target_fpr=0.01):
+    """
+    - current        : UI 기본값 (base 0.40, sensitivity 0.40, boost 0.18) 의 성능
+    - max_f1         : block F1 최대
+    - fpr_target     : block FPR <= target_fpr 중 block TPR 최대 (동률이면 REVIEW 비율이 낮은 쪽)
+    - flag_fpr_target: flag(BLOCK+REVIEW) 기준 같은 조건
+    """
+    def best(key, metric, cond=lambda r: True):
+        cands = [r for r in rows if cond(r)]
+        if not cands:
+            return None
+        return max(cands, key=lambda r: (r[key][metric], -r["review_rate"]))
+
+    return {
+        "current": _find(rows, CURRENT_BASE_THRESHOLD, CURRENT_SENSITIVITY, LENGTH_BOOST),
+        "max_f1": best("block", "f1"),
+        "fpr_target": best("block", "tpr", lambda r: r["block"]["fpr"] <= target_fpr),
+        "flag_fpr_target": best("flag", "tpr", lambda r: r["flag"]["fpr"] <= target_fpr),
+        "target_fpr": target_fpr,
+    }
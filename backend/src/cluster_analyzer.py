@@ -1,6 +1,8 @@
 import numpy as np
-import hdbscan
-from sklearn.metrics.pairwise import cosine_similarity
+
+from .index import l2_normalize
+from .density import DensityModel
+from .registry import registry
 
 
 class ClusterAnalyzer:
@@ -19,15 +21,26 @@ class ClusterAnalyzer:
         self.cluster_centers = None
         self.cluster_names = None
 
+        # 검색용: 정규화된 중심 행렬 (k, dim) + 행별 클러스터 id (k,)
+        self.center_ids = None
+        self.center_matrix = None
+
+        # 밀도 기반 membership (HDBSCAN prediction data 압축본, src/density.py)
+        self.density = None
+
     # -----------------------------------------------------
     # HDBSCAN 학습
     # -----------------------------------------------------
     def fit(self, attack_vecs):
+        # hdbscan 은 학습(precompute) 시에만 필요 → 서빙 프로세스에서는 import 하지 않음
+        hdbscan = registry.get("hdbscan")
+
         self.clusterer = hdbscan.HDBSCAN(
             min_cluster_size=self.min_cluster_size,
             min_samples=self.min_samples,
             metric="euclidean",
-            cluster_selection_method='eom'
+            cluster_selection_method='eom',
+            prediction_data=True,   # 새 공격 편입 시 approximate_predict 용
         ).fit(attack_vecs)
 
         self.labels = self.clusterer.labels_                # 클러스터 번호 (-1 포함)
@@ -35,8 +48,18 @@ class ClusterAnalyzer:
 
         # 클러스터 중심 계산 (평균값 기반)
         self.cluster_centers = self._compute_centers(attack_vecs)
+        self._build_center_matrix()
+        self.density = DensityModel.from_clusterer(self.clusterer, attack_vecs)
         return self
 
+    def ensure_density(self, attack_vecs):
+        """예전 pickle (prediction_data 없이 학습) 에서 밀도 데이터를 만든다."""
+        if getattr(self, "density", None) is None and self.clusterer is not None:
+            if getattr(self.clusterer, "prediction_data_", None) is None:
+                self.clusterer.generate_prediction_data()
+            self.density = DensityModel.from_clusterer(self.clusterer, attack_vecs)
+        return self.density
+
     # -----------------------------------------------------
     # 클러스터 중심 계산
     # -----------------------------------------------------
@@ -51,19 +74,85 @@ class ClusterAnalyzer:
 
         return centers
 
+    # -----------------------------------------------------
+    # 중심 행렬 (정규화 + contiguous)
+    # -----------------------------------------------------
+    def _build_center_matrix(self):
+        ids = sorted(self.cluster_centers.keys()) if self.cluster_centers else []
+        self.center_ids = np.asarray(ids, dtype="int64")
+        if ids:
+            self.center_matrix = l2_normalize(np.stack([self.cluster_centers[c] for c in ids]))
+        else:
+            self.center_matrix = np.empty((0, 0), dtype="float32")
+
+    def _ensure_center_matrix(self):
+        # 예전 pickle 로 저장된 analyzer 는 중심 행렬이 없으므로 처음 한 번 생성
+        if getattr(self, "center_matrix", None) is None:
+            self._build_center_matrix()
+
+    def center_similarities(self, user_vecs):
+        """
+        모든 클러스터 중심과의 코사인 유사도.
+        - 1차원 입력 (dim,)   → (k,)   : GEMV 1회
+        - 2차원 입력 (n, dim) → (n, k) : GEMM 1회
+        열 순서는 self.center_ids 와 같다.
+        """
+        self._ensure_center_matrix()
+        vecs = np.asarray(user_vecs)
+        if len(self.center_ids) == 0:
+            sims = np.empty((1 if vecs.ndim == 1 else len(vecs), 0), dtype="float32")
+        else:
+            sims = l2_normalize(vecs) @ self.center_matrix.T
+        return sims[0] if vecs.ndim == 1 else sims
+
     # -----------------------------------------------------
     # HDBSCAN 기반 anomaly detection
     # -----------------------------------------------------
     def detect(self, user_vec):
-        max_sim = -1
-        best_cluster = None
+        return self.classify(self.center_similarities(user_vec))
 
-        for cid, center in self.cluster_centers.items():
-            sim = float(cosine_similarity([user_vec], [center])[0][0])
-            if sim > max_sim:
-                max_sim = sim
-                best_cluster = cid
+    def detect_batch(self, user_vecs):
+        """
+        여러 입력을 중심 행렬과 한 번의 행렬곱으로 비교.
+        반환: [(decision, cluster_id, max_sim), ...] (입력 순서 유지)
+        """
+        sims = self.center_similarities(np.atleast_2d(user_vecs))
+        return [self.classify(row) for row in sims]
 
+    def classify(self, sims):
+        """center_similarities 결과 1행 → (decision, cluster_id, max_sim)."""
+        if len(sims) == 0:
+            return self._decide(None, -1)
+        j = int(np.argmax(sims))
+        return self._decide(int(self.center_ids[j]), float(sims[j]))
+
+    # -----------------------------------------------------
+    # 밀도 기반 membership (HDBSCAN approximate_predict 와 동일 규칙)
+    # -----------------------------------------------------
+    def membership(self, user_vecs, candidates=None):
+        """
+        입력별 (label, strength, outlier_score) 배열.
+        candidates (SkyShield 가 공격 인덱스에서 찾은 최근접 행 번호) 가 있으면 그 행만 재정렬,
+        없으면 학습 벡터 전체를 훑는다 (DensityModel.membership).
+        """
+        if getattr(self, "density", None) is None:
+            raise RuntimeError("밀도 membership 데이터가 없습니다. precompute_jailbreak.py 를 다시 실행하세요.")
+        return self.density.membership(np.atleast_2d(user_vecs), candidates)
+
+    def detect_membership(self, user_vecs, candidates=None):
+        """
+        membership 기반 판정. 반환: [(decision, cluster_id, strength, outlier), ...]
+        strength 를 유사도 자리에 넣어 같은 기준(_decide)으로 판정하며,
+        noise 는 cluster_id=-1, strength=0 → NOVEL_ATTACK.
+        """
+        labels, strengths, outliers = self.membership(user_vecs, candidates)
+        return [
+            (*self._decide(int(label), float(strength)), float(outlier))
+            for label, strength, outlier in zip(labels, strengths, outliers)
+        ]
+
+    @staticmethod
+    def _decide(best_cluster, max_sim):
         # ============================
         # 완화된(less aggressive) 기준
         # ============================
@@ -79,6 +168,64 @@ class ClusterAnalyzer:
         # 그 이상은 Known Attack
         return "KNOWN_ATTACK", best_cluster, max_sim
 
+    # -----------------------------------------------------
+    # 새 공격 벡터 편입 (재학습 없이)
+    # -----------------------------------------------------
+    def assign(self, new_vecs):
+        """
+        새 공격 벡터를 기존 클러스터에 배정 → (labels, probabilities).
+        - fit 된 HDBSCAN 이 있으면 hdbscan.approximate_predict
+        - 아티팩트의 밀도 데이터가 있으면 같은 규칙의 DensityModel
+        - 둘 다 없으면 (예전 아티팩트) 최근접 중심:
+          KNOWN_ATTACK 기준 이상이면 그 클러스터, 아니면 noise(-1)
+        """
+        vecs = np.atleast_2d(np.asarray(new_vecs, dtype="float32"))
+
+        if self.clusterer is not None and getattr(self.clusterer, "prediction_data_", None) is not None:
+            hdbscan = registry.get("hdbscan")
+            labels, strengths = hdbscan.approximate_predict(self.clusterer, vecs)
+            return np.asarray(labels, dtype="int64"), np.asarray(strengths, dtype="float32")
+
+        if getattr(self, "density", None) is not None:
+            labels, strengths, _ = self.density.membership(vecs)
+            return labels, strengths
+
+        labels = np.full(len(vecs), -1, dtype="int64")
+        probs = np.zeros(len(vecs), dtype="float32")
+        for i, row in enumerate(self.center_similarities(vecs)):
+            decision, cid, sim = self.classify(row)
+            if decision == "KNOWN_ATTACK":
+                labels[i] = cid
+                probs[i] = min(1.0, max(0.0, sim))
+        return labels, probs
+
+    def extend(self, new_vecs, labels, probabilities):
+        """
+        assign 결과를 labels / probabilities 뒤에 붙이고,
+        새 멤버가 생긴 클러스터 중심을 방향 평균(기존 멤버 수 가중)으로 갱신.
+        """
+        self._ensure_center_matrix()
+        old_labels = np.asarray(self.labels)
+        vecs = l2_normalize(np.atleast_2d(np.asarray(new_vecs, dtype="float32")))
+
+        centers = dict(self.cluster_centers or {})
+        for cid in set(int(c) for c in labels) - {-1}:
+            n_old = int((old_labels == cid).sum())
+            added = vecs[labels == cid]
+            old_center = l2_normalize(np.asarray(centers[cid])[None, :])[0]
+            centers[cid] = (old_center * n_old + added.sum(axis=0)) / (n_old + len(added))
+
+        self.labels = np.concatenate([old_labels, labels]).astype("int64")
+        self.probabilities = np.concatenate(
+            [np.asarray(self.probabilities), probabilities]
+        ).astype("float32")
+        self.cluster_centers = centers
+        self._build_center_matrix()
+        if getattr(self, "density", None) is not None:
+            raw = np.atleast_2d(np.asarray(new_vecs, dtype="float32"))
+            self.density = self.density.extend(raw, np.vstack([self.density.data, raw]))
+        return self
+
     # -----------------------------------------------------
     # 클러스터 의미 자동 라벨링
     # -----------------------------------------------------
@@ -0,0 +1,207 @@
+"""
+HDBSCAN prediction data 를 서빙용 배열로 압축한 밀도 기반 membership.
+
+hdbscan.approximate_predict 와 같은 규칙을 numpy 로만 계산한다.
+    1) 질의별 학습 벡터 2*min_samples 최근접 이웃 (유클리드)
+       - candidates 를 주면 그 행들만 재정렬 (서빙: SkyShield 가 공격 인덱스에서 이미 찾은
+         코사인 상위 n_candidates 개 → 질의당 O(n_candidates * dim), 학습 벡터 전체를 다시 훑지 않음)
+       - 없으면 학습 벡터 전체 GEMM + chunk top-k (정확, 편입 / 오프라인 용)
+    2) mutual reachability 거리 max(core_q, core_j, d(q, j)) 가 최소인 이웃 선택
+    3) 그 이웃의 condensed tree 위치에서 lambda = 1 / 거리 에 맞는 클러스터까지 올라감
+    4) strength = lambda / 클러스터 max lambda
+       outlier  = 1 - lambda / (최근접 이웃 노드 아래 subtree 의 max lambda)  (GLOSH,
+                  hdbscan.prediction.approximate_predict_scores 를 0~1 로 clip)
+
+서빙 시 필요한 것은 학습 벡터(아티팩트의 attack_vectors.npy)와 아래 배열뿐이며
+hdbscan / 트리 객체는 import 하지 않는다.
+    core         (N,)      학습 점별 core distance
+    point_node   (N,)      학습 점이 속한 condensed tree 노드 (root 기준 offset)
+    point_lambda (N,)      학습 점이 노드에서 떨어져 나가는 lambda
+    node_parent  (C,)      노드별 부모 노드 (root 는 -1)
+    node_lambda  (C,)      노드가 부모에서 갈라지는 lambda
+    node_label   (C,)      노드 → 최종 클러스터 라벨 (-1 = 선택되지 않음)
+    node_max_lambda (C,)   membership strength 기준 lambda
+    node_glosh_lambda (C,) outlier score (GLOSH) 기준 subtree max lambda
+"""
+
+import numpy as np
+
+from .index import chunked_topk
+
+ARRAY_NAMES = (
+    "core", "point_node", "point_lambda",
+    "node_parent", "node_lambda", "node_label", "node_max_lambda", "node_glosh_lambda",
+)
+
+# 코사인 상위 후보를 유클리드로 재정렬할 때 필요한 이웃 수(2*min_samples) 대비 후보 배수
+# (정규화된 임베딩이면 두 순서가 같아 2 배만으로도 충분, 여유분)
+CANDIDATE_FACTOR = 2
+
+
+class DensityModel:
+    def __init__(self, data, min_samples, arrays, chunk_rows=65_536):
+        self.data = data                  # 학습 벡터 (N, dim), memmap 가능
+        self.min_samples = int(min_samples)
+        self.chunk_rows = chunk_rows
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.sq_norms = np.einsum("ij,ij->i", np.asarray(data, dtype="float32"),
+                                  np.asarray(data, dtype="float32"))
+
+    def __len__(self):
+        return int(self.data.shape[0])
+
+    @property
+    def n_candidates(self):
+        """membership(candidates=...) 에 넘길 공격 인덱스 후보 수."""
+        return CANDIDATE_FACTOR * 2 * self.min_samples
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in ARRAY_NAMES}
+
+    # --------------------------------------------------------
+    # fit 된 HDBSCAN → 배열
+    # --------------------------------------------------------
+    @classmethod
+    def from_clusterer(cls, clusterer, data):
+        pred = clusterer.prediction_data_
+        if pred is None:
+            raise RuntimeError("HDBSCAN 이 prediction_data=True 로 학습되지 않았습니다.")
+
+        raw = clusterer.condensed_tree_._raw_tree
+        root = int(raw["parent"].min())
+        n_points = int(data.shape[0])
+
+        is_point = raw["child_size"] == 1
+        nodes = raw[~is_point]
+        n_nodes = int(max(raw["parent"].max(), nodes["child"].max() if len(nodes) else root)) - root + 1
+
+        point_node = np.zeros(n_points, dtype="int32")
+        point_lambda = np.zeros(n_points, dtype="float32")
+        point_node[raw["child"][is_point]] = raw["parent"][is_point] - root
+        point_lambda[raw["child"][is_point]] = raw["lambda_val"][is_point]
+
+        node_parent = np.full(n_nodes, -1, dtype="int32")
+        node_lambda = np.zeros(n_nodes, dtype="float32")
+        node_parent[nodes["child"] - root] = nodes["parent"] - root
+        node_lambda[nodes["child"] - root] = nodes["lambda_val"]
+
+        node_label = np.full(n_nodes, -1, dtype="int64")
+        node_max_lambda = np.zeros(n_nodes, dtype="float32")
+        for node, label in pred.cluster_map.items():
+            node_label[int(node) - root] = label
+        for node, lam in pred.max_lambdas.items():
+            node_max_lambda[int(node) - root] = lam
+
+        # GLOSH: 노드 아래 (자손 포함) 가장 큰 lambda. 자식 id 가 부모보다 크므로 역순 전파
+        node_glosh_lambda = np.zeros(n_nodes, dtype="float64")
+        np.maximum.at(node_glosh_lambda, raw["parent"] - root, raw["lambda_val"])
+        for node in range(n_nodes - 1, 0, -1):
+            parent = node_parent[node]
+            if parent >= 0 and node_glosh_lambda[node] > node_glosh_lambda[parent]:
+                node_glosh_lambda[parent] = node_glosh_lambda[node]
+
+        min_samples = clusterer.min_samples or clusterer.min_cluster_size
+        return cls(data, min_samples, {
+            "core": np.asarray(pred.core_distances, dtype="float32"),
+            "point_node": point_node,
+            "point_lambda": point_lambda,
+            "node_parent": node_parent,
+            "node_lambda": node_lambda,
+            "node_label": node_label,
+            "node_max_lambda": node_max_lambda,
+            "node_glosh_lambda": node_glosh_lambda.astype("float32"),
+        })
+
+    # --------------------------------------------------------
+    # membership
+    # --------------------------------------------------------
+    def _neighbors(self, q, candidates=None):
+        """질의 (n, dim) 별 2*min_samples 최근접 학습 점 (거리 오름차순)."""
+        q_sq = np.einsum("ij,ij->i", q, q)[:, None]
+
+        if candidates is not None:
+            # 후보 행만 읽어 유클리드 거리 계산 (-1 = 후보 없음, IVF 의 빈 자리)
+            # 후보가 수십 개뿐이라 argpartition 대신 정렬 한 번 (작은 배열의 호출 오버헤드가 더 큼)
+            cand = np.asarray(candidates, dtype="int64")
+            rows = np.maximum(cand, 0)
+            x = np.asarray(self.data[rows.ravel()], dtype="float32").reshape(*rows.shape, -1)
+            sq = (self.sq_norms[rows] - 2.0 * np.matmul(x, q[:, :, None])[..., 0]) + q_sq
+            sq[cand < 0] = np.inf
+            pos = np.argsort(sq, axis=1)[:, :2 * self.min_samples]
+            r = np.arange(q.shape[0])[:, None]
+            return np.sqrt(np.maximum(sq[r, pos], 0.0)), rows[r, pos]
+
+        def neg_sq_dist(s, e):
+            return 2.0 * (q @ np.asarray(self.data[s:e], dtype="float32").T) - q_sq - self.sq_norms[s:e]
+
+        neg, ids = chunked_topk(neg_sq_dist, len(self), q.shape[0],
+                                2 * self.min_samples, chunk_rows=self.chunk_rows)
+        return np.sqrt(np.maximum(-neg, 0.0)), ids
+
+    def _predict(self, vecs, candidates=None):
+        q = np.atleast_2d(np.asarray(vecs, dtype="float32"))
+        n = q.shape[0]
+        labels = np.full(n, -1, dtype="int64")
+        strengths = np.zeros(n, dtype="float32")
+        outliers = np.ones(n, dtype="float32")
+        nodes = np.zeros(n, dtype="int32")
+        lambdas = np.zeros(n, dtype="float32")
+        cores = np.zeros(n, dtype="float32")
+        if n == 0 or len(self) == 0:
+            return labels, strengths, outliers, nodes, lambdas, cores
+
+        dists, ids = self._neighbors(q, candidates)
+        m = min(self.min_samples, dists.shape[1] - 1)
+        cores = dists[:, m]
+        mr = np.maximum(np.maximum(self.core[ids], cores[:, None]), dists)
+        best = np.argmin(mr, axis=1)
+        nearest = ids[np.arange(n), best]
+        mr_min = mr[np.arange(n), best].astype("float64")
+        lam_all = np.where(mr_min > 0, 1.0 / np.maximum(mr_min, 1e-30), np.finfo("float32").max)
+
+        for i in range(n):
+            lam = lam_all[i]
+            node = int(self.point_node[nearest[i]])
+
+            # outlier 는 이웃 노드 기준 (학습 점과 같은 위치면 그 점의 lambda 사용)
+            glosh_lam = float(self.point_lambda[nearest[i]]) if dists[i, 0] == 0 else lam
+            max_glosh = float(self.node_glosh_lambda[node])
+            outliers[i] = (max_glosh - min(glosh_lam, max_glosh)) / max_glosh if max_glosh > 0 else 0.0
+
+            # 질의의 lambda 보다 늦게 갈라진 노드면 lambda 에 맞는 조상까지 올라감
+            if self.point_lambda[nearest[i]] > lam:
+                while node > 0 and self.node_lambda[node] >= lam:
+                    node = int(self.node_parent[node])
+
+            label = int(self.node_label[node])
+            if label >= 0:
+                max_lam = float(self.node_max_lambda[node])
+                strengths[i] = min(max_lam, lam) / max_lam if max_lam > 0 else 1.0
+            labels[i] = label
+            nodes[i] = node
+            lambdas[i] = min(lam, np.finfo("float32").max)
+
+        return labels, strengths, outliers, nodes, lambdas, cores
+
+    def membership(self, vecs, candidates=None):
+        """
+        질의별 (label, strength, outlier_score). label -1 = noise.
+        candidates: 질의별 학습 행 번호 후보 (n, c) — 학습 벡터와 행 순서가 같은 공격 인덱스의
+        search(vecs, k=n_candidates) 결과. None 이면 학습 벡터 전체에서 정확히 찾는다.
+        """
+        labels, strengths, outliers, _, _, _ = self._predict(vecs, candidates)
+        return labels, strengths, outliers
+
+    def extend(self, new_vecs, data):
+        """
+        새 점을 재학습 없이 추가. 새 점은 배정된 노드에 붙고,
+        core distance / lambda 는 편입 시점 값으로 고정된다.
+        data 는 새 점까지 포함한 전체 학습 벡터.
+        """
+        _, _, _, nodes, lambdas, cores = self._predict(new_vecs)
+        arrays = self.arrays()
+        arrays["core"] = np.concatenate([self.core, cores]).astype("float32")
+        arrays["point_node"] = np.concatenate([self.point_node, nodes]).astype("int32")
+        arrays["point_lambda"] = np.concatenate([self.point_lambda, lambdas]).astype("float32")
+        return DensityModel(data, self.min_samples, arrays, chunk_rows=self.chunk_rows)
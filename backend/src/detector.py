@@ -1,20 +1,66 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+from .index import FlatIndex
+
 
 class SkyShield:
-    def __init__(self, attack_vectors, threshold_block=0.4):
+    # 차단 임계값의 이 비율 이상이면 REVIEW
+    REVIEW_RATIO = 0.8
+
+    def __init__(self, attack_vectors=None, threshold_block=0.4, index=None):
+        """
+        attack_vectors 만 주면 정규화된 FlatIndex 를 즉석에서 만든다.
+        서빙에서는 precompute 단계에서 만든 인덱스를 index 로 넘겨
+        요청마다 공격 벡터를 다시 정규화하지 않도록 한다.
+        """
+        if index is None:
+            if attack_vectors is None:
+                raise ValueError("attack_vectors 또는 index 중 하나는 필요합니다.")
+            index = FlatIndex(attack_vectors)
+
         self.attack_vectors = attack_vectors
+        self.index = index
         self.threshold_block = threshold_block
 
     def set_threshold(self, new_value):
         self.threshold_block = float(new_value)
 
     def predict(self, user_vec):
-        sims = cosine_similarity([user_vec], self.attack_vectors)[0]
-        score = float(np.max(sims))
-
-        if score >= self.threshold_block:
-            return "BLOCK", score
-        elif score >= self.threshold_block * 0.8:
-            return "REVIEW", score
-        return "ALLOW", score
+        score = float(self.index.max_similarity(np.asarray(user_vec)[None, :])[0])
+        return self._decide(score, self.threshold_block), score
+
+    def predict_batch(self, user_vecs, thresholds=None):
+        """
+        여러 입력을 한 번의 행렬곱으로 판정.
+        thresholds: 입력별 차단 임계값 (길이 기반 adaptive threshold 등). 없으면 threshold_block.
+        반환: [(decision, score), ...] (입력 순서 유지)
+        """
+        scores = self.index.max_similarity(np.asarray(user_vecs))
+        return self._decide_all(scores, thresholds)
+
+    def predict_with_neighbors(self, user_vecs, k, thresholds=None):
+        """
+        predict_batch 와 같은 판정 + 입력별 최근접 공격 벡터 행 번호 (n, k) (없는 자리는 -1).
+        인덱스 검색 1회로 점수와 후보를 같이 얻어, 밀도 membership 이
+        공격 벡터 전체를 다시 훑지 않고 이 후보만 재정렬하도록 넘긴다.
+        """
+        sims, ids = self.index.search(np.asarray(user_vecs), k=k)
+        scores = sims[:, 0] if sims.shape[1] else np.full(sims.shape[0], -1.0, dtype="float32")
+        return self._decide_all(scores, thresholds), ids
+
+    def _decide_all(self, scores, thresholds):
+        if thresholds is None:
+            thresholds = [self.threshold_block] * len(scores)
+
+        return [
+            (self._decide(float(score), thr), float(score))
+            for score, thr in zip(scores, thresholds)
+        ]
+
+    @staticmethod
+    def _decide(score, threshold):
+        if score >= threshold:
+            return "BLOCK"
+        elif score >= threshold * SkyShield.REVIEW_RATIO:
+            return "REVIEW"
+        return "ALLOW"
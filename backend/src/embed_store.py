@@ -0,0 +1,223 @@
+"""
+텍스트 단위 임베딩 캐시.
+
+- 키: sha256(모델 키 + 텍스트) → 텍스트/모델별 content-addressed
+- 1단계: 프로세스 내 LRU (OrderedDict)
+- 2단계: SQLite 파일 (float32 blob), 총 용량 초과 시 오래 안 쓴 항목부터 삭제
+
+Embedder.encode 는 get_many 로 한 번에 조회하고
+miss 난 텍스트만 API / 로컬 모델로 보낸 뒤 put_many 로 저장한다.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATH = BASE_DIR / "precomputed" / "cache" / "embeddings.sqlite"
+
+# SQLite IN (...) 한 번에 넣을 최대 키 개수
+_SQL_CHUNK = 500
+
+
+def text_key(model_key: str, text: str) -> str:
+    return hashlib.sha256(f"{model_key}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=1024 * 1024 * 1024, memory_items=10_000):
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.memory_items = int(memory_items)
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vec BLOB NOT NULL,"
+            " nbytes INTEGER NOT NULL,"
+            " atime REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_atime ON embeddings(atime)")
+        self._conn.commit()
+
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings"
+        ).fetchone()[0]
+
+        # 통계 (metrics 용)
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    # --------------------------------------------------------
+    # 조회
+    # --------------------------------------------------------
+    def get_many(self, model_key: str, texts):
+        """texts 와 같은 길이의 리스트. 캐시에 없으면 None."""
+        keys = [text_key(model_key, t) for t in texts]
+        out = [None] * len(keys)
+
+        with self._lock:
+            pending = {}
+            for i, key in enumerate(keys):
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    out[i] = vec
+                    self.hits_memory += 1
+                else:
+                    pending.setdefault(key, []).append(i)
+
+            if pending:
+                found = self._select(list(pending))
+                now = time.time()
+                for key, vec in found.items():
+                    self._remember(key, vec)
+                    for i in pending[key]:
+                        out[i] = vec
+                    self.hits_disk += len(pending[key])
+
+                if found:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET atime=? WHERE key=?",
+                        [(now, key) for key in found],
+                    )
+                    self._conn.commit()
+
+                self.misses += sum(len(pending[k]) for k in pending if k not in found)
+
+        return out
+
+    def _select(self, keys):
+        found = {}
+        for i in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[i:i + _SQL_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="float32")
+        return found
+
+    # --------------------------------------------------------
+    # 저장
+    # --------------------------------------------------------
+    def put_many(self, model_key: str, texts, vecs):
+        vecs = np.asarray(vecs, dtype="float32")
+        now = time.time()
+
+        rows = []
+        with self._lock:
+            for text, vec in zip(texts, vecs):
+                key = text_key(model_key, text)
+                vec = np.ascontiguousarray(vec)
+                self._remember(key, vec)
+                rows.append((key, model_key, int(vec.shape[0]), vec.tobytes(), int(vec.nbytes), now))
+
+            if not rows:
+                return
+
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, dim, vec, nbytes, atime) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            inserted = self._conn.total_changes - before
+            self._conn.commit()
+
+            # INSERT OR IGNORE 이므로 새로 들어간 행만 용량에 반영 (모든 행 크기가 같다고 가정)
+            if inserted:
+                self._total_bytes += inserted * rows[0][4]
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remember(self, key, vec):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_items:
+            self._lru.popitem(last=False)
+
+    def _evict(self):
+        """오래 안 쓴 항목부터 max_bytes 의 90% 까지 삭제."""
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, nbytes FROM embeddings ORDER BY atime LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+
+            freed, victims = 0, []
+            for key, nbytes in rows:
+                victims.append((key,))
+                freed += nbytes
+                if self._total_bytes - freed <= target:
+                    break
+
+            self._conn.executemany("DELETE FROM embeddings WHERE key=?", victims)
+            self._total_bytes -= freed
+        self._conn.commit()
+
+    # --------------------------------------------------------
+    # 통계
+    # --------------------------------------------------------
+    def stats(self):
+        return {
+            "path": str(self.path),
+            "bytes": int(self._total_bytes),
+            "max_bytes": self.max_bytes,
+            "memory_items": len(self._lru),
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+        }
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_default_store():
+    """
+    프로세스 공용 임베딩 캐시.
+    - SKYSHIELD_EMBED_CACHE     : SQLite 경로 ("off" 면 캐시 비활성)
+    - SKYSHIELD_EMBED_CACHE_MB  : 디스크 최대 용량 (MB)
+    - SKYSHIELD_EMBED_LRU       : 메모리 LRU 항목 수
+    """
+    global _default_store
+    path = os.getenv("SKYSHIELD_EMBED_CACHE", str(DEFAULT_PATH))
+    if path == "off":
+        return None
+
+    with _default_lock:
+        if _default_store is None:
+            _default_store = EmbeddingStore(
+                path=path,
+                max_bytes=int(float(os.getenv("SKYSHIELD_EMBED_CACHE_MB", "1024")) * 1024 * 1024),
+                memory_items=int(os.getenv("SKYSHIELD_EMBED_LRU", "10000")),
+            )
+        return _default_store
+
+
+def default_store_stats():
+    """공용 캐시가 이미 만들어졌으면 stats(), 아니면 None (새로 만들지 않음)."""
+    store = _default_store
+    return store.stats() if store is not None else None
@@ -1,5 +1,16 @@
-import os, pickle, hashlib, numpy as np
-from sentence_transformers import SentenceTransformer
+import asyncio, numpy as np
+
+from .embed_store import get_default_store
+from .local_accel import load_local_encoder
+from .reduction import parse_model_name
+
+# model_name prefix → 로컬 SentenceTransformer 모델 (첫 사용 시에만 torch import)
+LOCAL_MODELS = [
+    (lambda n: n.startswith("sentence-transformers"), "sentence-transformers/all-MiniLM-L6-v2"),
+    (lambda n: n.startswith("intfloat"), "intfloat/multilingual-e5-large"),
+    (lambda n: n.lower().startswith("thenlper") or n.lower().startswith("gte"), "thenlper/gte-large"),
+    (lambda n: n.startswith("BAAI"), "BAAI/bge-m3"),
+]
 
 
 class Embedder:
@@ -9,48 +20,70 @@ class Embedder:
     - OpenAI Embedding API
     - Mistral Embedding API
     - DeepSeek Embedding API
+
+    모델 이름에 "@256" / "@pca256" 이 붙으면 출력 벡터를 축소한다 (src/reduction.py).
+    batcher (src/batching.py) 가 있으면 aencode 의 캐시 miss 는 다른 요청과 묶어서 계산한다.
     """
 
-    def __init__(self, model_name, client=None, batch_size=128):
+    def __init__(self, model_name, client=None, batch_size=128, async_client=None, store=None,
+                 reduction=None, batcher=None):
         self.model_name = model_name
+        self.store = store          # 텍스트 단위 임베딩 캐시 (None → 프로세스 공용 store)
         self.client = client  # API 클라이언트 (OpenAI / Mistral / DeepSeek)
+        self.async_client = async_client  # asyncio 용 API 클라이언트 (없으면 스레드 위임)
         self.batch_size = batch_size
+        self.batcher = batcher      # 요청 간 micro-batching (None → 요청별 개별 호출)
         self.input_field = "input"  # 기본값
         self.model = None           # 로컬 모델 or API 모델 문자열
+        self.api_dimensions = None  # API 가 직접 축소 차원을 돌려주는 경우 (OpenAI dimensions)
 
         # ==============================
-        # SentenceTransformer (local)
+        # 축소 차원 ("모델@256" / "모델@pca256")
         # ==============================
-        if model_name.startswith("sentence-transformers"):
-            self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        base_name, parsed = parse_model_name(model_name)
+        if reduction is None and parsed is not None and parsed.kind == "pca":
+            from .utils import load_reduction   # utils → embedding 순환 import 방지
+            parsed = load_reduction(model_name)
+        self.reduction = reduction if reduction is not None else parsed
 
-        elif model_name.startswith("intfloat"):
-            self.model = SentenceTransformer("intfloat/multilingual-e5-large")
-
-        elif model_name.lower().startswith("thenlper") or model_name.lower().startswith("gte"):
-            self.model = SentenceTransformer("thenlper/gte-large")
+        # ==============================
+        # SentenceTransformer (local)
+        # ==============================
+        local_name = next((hf for match, hf in LOCAL_MODELS if match(base_name)), None)
+        self.is_local = local_name is not None
 
-        elif model_name.startswith("BAAI"):
-            self.model = SentenceTransformer("BAAI/bge-m3")
+        if self.is_local:
+            # SKYSHIELD_LOCAL_ACCEL 이 none 이면 기존 SentenceTransformer 그대로 (src/local_accel.py)
+            self.model = load_local_encoder(local_name)
 
         # ==============================
         # OpenAI / Mistral / DeepSeek
         # ==============================
-        elif "OpenAI" in model_name:
+        elif "OpenAI" in base_name:
             self.model = "text-embedding-3-large"
             self.input_field = "input"
 
-        elif "Mistral" in model_name:
+        elif "Mistral" in base_name:
             self.model = "mistral-embed"
             self.input_field = "inputs"
 
-        elif "DeepSeek" in model_name:
+        elif "DeepSeek" in base_name:
             self.model = "deepseek-embedding"
             self.input_field = "input"
 
+        # 벤치마크용 가짜 백엔드 (src/fake_backend.py)
+        elif "Fake" in base_name:
+            self.model = "fake-embedding"
+            self.input_field = "input"
+
         else:
             raise ValueError(f"Unsupported embedding backend: {model_name}")
 
+        # text-embedding-3-* 는 API 에서 바로 짧은 벡터를 받는다 (전송량도 감소)
+        if (self.reduction is not None and self.reduction.kind == "truncate"
+                and self.model in ("text-embedding-3-large", "fake-embedding")):
+            self.api_dimensions = self.reduction.dim
+
 
     # ----------------------------------------------------------
     # Array chunking
@@ -61,65 +94,138 @@ class Embedder:
 
 
     # ----------------------------------------------------------
-    # Cache path
+    # Cache (텍스트 단위 store)
     # ----------------------------------------------------------
-    def _cache_path(self, texts):
-        key = hashlib.sha256("|||".join(texts).encode()).hexdigest()[:32]
-        safe_name = self.model_name.replace("/", "_").replace(" ", "_")
-        return f"cache_embed_{safe_name}_{key}.pkl"
+    @property
+    def cache_key(self):
+        """캐시 키에 들어갈 모델 식별자."""
+        return self.model_name
+
+    def _get_store(self):
+        return self.store if self.store is not None else get_default_store()
+
+    def _lookup(self, texts, use_cache):
+        """(캐시 결과 리스트, miss 난 고유 텍스트 리스트)"""
+        store = self._get_store() if use_cache else None
+        found = store.get_many(self.cache_key, texts) if store else [None] * len(texts)
+        misses = list(dict.fromkeys(t for t, v in zip(texts, found) if v is None))
+        return found, misses
+
+    def _merge(self, texts, found, misses, miss_vecs, save_cache):
+        miss_vecs = np.asarray(miss_vecs, dtype="float32")
+        if self.reduction is not None and len(misses):
+            miss_vecs = self.reduction.apply(miss_vecs)
+
+        store = self._get_store() if save_cache else None
+        if store and len(misses):
+            store.put_many(self.cache_key, misses, miss_vecs)
+
+        by_text = dict(zip(misses, miss_vecs))
+        rows = [v if v is not None else by_text[t] for t, v in zip(texts, found)]
+        if not rows:
+            return np.empty((0, 0), dtype="float32")
+        return np.stack(rows).astype("float32", copy=False)
 
 
     # ----------------------------------------------------------
     # Encoding
     # ----------------------------------------------------------
-    def encode(self, texts, use_cache=True, save_cache=True):
-        """문장 임베딩 생성 (로컬 모델 또는 API 기반)"""
+    def _request_kwargs(self, batch):
+        kwargs = {self.input_field: batch}
+        if self.api_dimensions is not None:
+            kwargs["dimensions"] = self.api_dimensions
+        return kwargs
 
-        # 캐시 로드
-        cache_file = self._cache_path(texts)
-        if use_cache and os.path.exists(cache_file):
-            return pickle.load(open(cache_file, "rb"))
+    def encode(self, texts, use_cache=True, save_cache=True):
+        """문장 임베딩 생성 (로컬 모델 또는 API 기반). 캐시에 없는 텍스트만 계산."""
+        texts = list(texts)
+        found, misses = self._lookup(texts, use_cache)
+        miss_vecs = self._encode_uncached(misses) if misses else []
+        return self._merge(texts, found, misses, miss_vecs, save_cache)
 
+    def _encode_uncached(self, texts):
         # ==============================
         # Local transformer encoding
         # ==============================
-        if isinstance(self.model, SentenceTransformer):
-            vecs = self.model.encode(texts)
+        if self.is_local:
+            return self.model.encode(texts)
 
         # ==============================
         # API-based embedding
         # ==============================
-        else:
-            if self.client is None:
+        if self.client is None:
+            raise RuntimeError(
+                f"[Embedder ERROR] '{self.model_name}'은 API 기반 모델이지만 "
+                f"client=None 상태입니다. app.py에서 client를 전달해야 합니다."
+            )
+
+        vecs = []
+        for batch in self.chunk(texts, self.batch_size):
+
+            # API 응답
+            try:
+                resp = self.client.embeddings.create(
+                    model=self.model,
+                    **self._request_kwargs(batch)
+                )
+            except Exception as e:
+                raise RuntimeError(f"[Embedder API Error] {str(e)}")
+
+            # 데이터 파싱
+            try:
+                vecs.extend([d.embedding for d in resp.data])
+            except Exception as e:
                 raise RuntimeError(
-                    f"[Embedder ERROR] '{self.model_name}'은 API 기반 모델이지만 "
-                    f"client=None 상태입니다. app.py에서 client를 전달해야 합니다."
+                    f"[Embedder Parse Error] API 응답 구조가 예상과 다릅니다: {resp}\n{e}"
                 )
 
-            vecs = []
-            for batch in self.chunk(texts, self.batch_size):
-
-                # API 응답
-                try:
-                    resp = self.client.embeddings.create(
-                        model=self.model,
-                        **{self.input_field: batch}
-                    )
-                except Exception as e:
-                    raise RuntimeError(f"[Embedder API Error] {str(e)}")
-
-                # 데이터 파싱
-                try:
-                    vecs.extend([d.embedding for d in resp.data])
-                except Exception as e:
-                    raise RuntimeError(
-                        f"[Embedder Parse Error] API 응답 구조가 예상과 다릅니다: {resp}\n{e}"
-                    )
-
-            vecs = np.array(vecs)
-
-        # 캐싱 저장
-        if save_cache:
-            pickle.dump(vecs, open(cache_file, "wb"))
-
-        return vecs
+        return np.array(vecs)
+
+
+    # ----------------------------------------------------------
+    # Async encoding
+    # ----------------------------------------------------------
+    async def aencode(self, texts, use_cache=True, save_cache=True):
+        """
+        encode 의 asyncio 버전 (캐시 조회는 동일, miss 만 계산).
+        - async 클라이언트가 있으면 batch 들을 동시에 요청
+        - 로컬 모델 / async 클라이언트 없음 → 스레드풀에서 계산
+        - batcher 가 있고 miss 가 한 건이면 동시에 들어온 다른 요청과 묶어서 계산
+        - 캐시 조회 / 저장(SQLite 읽기·쓰기·eviction)도 스레드풀에서 (이벤트 루프를 막지 않도록)
+        """
+        texts = list(texts)
+        found, misses = await asyncio.to_thread(self._lookup, texts, use_cache)
+
+        if not misses:
+            miss_vecs = []
+        elif self.batcher is not None and len(misses) == 1:
+            miss_vecs = [await self.batcher.submit(misses[0])]
+        else:
+            miss_vecs = await self._aencode_uncached(misses)
+
+        return await asyncio.to_thread(self._merge, texts, found, misses, miss_vecs, save_cache)
+
+    async def _aencode_uncached(self, texts):
+        """캐시 / 축소 없이 texts 의 원본 벡터 (행 순서 유지)."""
+        if self.is_local or self.async_client is None:
+            return await asyncio.to_thread(self._encode_uncached, texts)
+
+        batches = list(self.chunk(texts, self.batch_size))
+        results = await asyncio.gather(*(self._aembed_batch(b) for b in batches))
+        return [v for batch_vecs in results for v in batch_vecs]
+
+    async def _aembed_batch(self, batch):
+        embeddings = self.async_client.embeddings
+        create = getattr(embeddings, "create_async", None) or embeddings.create
+
+        try:
+            resp = await create(model=self.model, **self._request_kwargs(batch))
+        except Exception as e:
+            raise RuntimeError(f"[Embedder API Error] {str(e)}")
+
+        try:
+            return [d.embedding for d in resp.data]
+        except Exception as e:
+            raise RuntimeError(
+                f"[Embedder Parse Error] API 응답 구조가 예상과 다릅니다: {resp}\n{e}"
+            )
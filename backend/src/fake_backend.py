@@ -0,0 +1,111 @@
+"""
+API 비용 없이 /analyze 를 부하 테스트하기 위한 결정적(deterministic) 가짜 백엔드.
+
+- 임베딩 모델 이름에 "Fake" 가 들어가면 get_embedding_client 가 FakeEmbeddingClient 를,
+- 요약 백엔드가 "Fake" 면 Summarizer 가 FakeChatClient 를 사용한다.
+
+실제 SDK 와 같은 모양(embeddings.create / chat.completions.create)의 응답을 돌려주므로
+Embedder / Summarizer 코드 경로는 그대로 측정된다.
+
+임베딩은 단어별 해시 가우시안 벡터의 합을 정규화한 것 (같은 텍스트 → 같은 벡터,
+단어를 공유하는 텍스트끼리 가까움). 환경변수:
+    SKYSHIELD_FAKE_DIM         : 임베딩 차원 (기본 3072, text-embedding-3-large 와 동일)
+    SKYSHIELD_FAKE_LATENCY_MS  : 호출마다 넣을 지연 (기본 0)
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+
+FAKE_DIM = int(os.getenv("SKYSHIELD_FAKE_DIM", "3072"))
+
+
+def fake_latency_ms():
+    return float(os.getenv("SKYSHIELD_FAKE_LATENCY_MS", "0"))
+
+
+def _word_vector(word, dim):
+    seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim, dtype="float32")
+
+
+def fake_embedding(text, dim=None):
+    dim = dim or FAKE_DIM
+    words = text.lower().split() or [""]
+    vec = np.sum([_word_vector(w, dim) for w in words], axis=0)
+    return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+
+def _embedding_response(batch, dim, dimensions=None):
+    """dimensions 를 주면 OpenAI shortened embedding 처럼 앞부분만 잘라 재정규화."""
+    def embed(text):
+        vec = fake_embedding(text, dim)
+        if dimensions:
+            vec = vec[:dimensions] / max(float(np.linalg.norm(vec[:dimensions])), 1e-12)
+        return vec.tolist()
+
+    return SimpleNamespace(data=[SimpleNamespace(embedding=embed(text)) for text in batch])
+
+
+def _chat_response(messages):
+    prompt = messages[-1]["content"] if messages else ""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    content = f"[fake summary {digest}] {prompt.strip()[:80]}"
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+# ------------------------------------------------------------
+# 임베딩 클라이언트
+# ------------------------------------------------------------
+class _FakeEmbeddings:
+    def __init__(self, dim):
+        self.dim = dim
+
+    def create(self, model=None, input=None, inputs=None, dimensions=None):
+        time.sleep(fake_latency_ms() / 1000)
+        return _embedding_response(input if input is not None else inputs, self.dim, dimensions)
+
+
+class _FakeAsyncEmbeddings(_FakeEmbeddings):
+    async def create(self, model=None, input=None, inputs=None, dimensions=None):
+        await asyncio.sleep(fake_latency_ms() / 1000)
+        return _embedding_response(input if input is not None else inputs, self.dim, dimensions)
+
+
+class FakeEmbeddingClient:
+    def __init__(self, dim=None):
+        self.embeddings = _FakeEmbeddings(dim or FAKE_DIM)
+
+
+class FakeAsyncEmbeddingClient:
+    def __init__(self, dim=None):
+        self.embeddings = _FakeAsyncEmbeddings(dim or FAKE_DIM)
+
+
+# ------------------------------------------------------------
+# 요약(chat) 클라이언트
+# ------------------------------------------------------------
+class _FakeCompletions:
+    def create(self, model=None, messages=None):
+        time.sleep(fake_latency_ms() / 1000)
+        return _chat_response(messages)
+
+
+class _FakeAsyncCompletions:
+    async def create(self, model=None, messages=None):
+        await asyncio.sleep(fake_latency_ms() / 1000)
+        return _chat_response(messages)
+
+
+class FakeChatClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_FakeCompletions())
+
+
+class FakeAsyncChatClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_FakeAsyncCompletions())
@@ -0,0 +1,448 @@
+"""
+공격 벡터 검색 인덱스.
+
+- FlatIndex : 미리 L2 정규화해 둔 벡터에 대한 정확한 brute-force 검색 (내적 = 코사인)
+- IVFIndex  : spherical k-means 로 벡터를 리스트(셀)로 나누고,
+              질의와 가까운 nprobe 개 리스트만 훑는 근사 검색
+
+두 인덱스 모두 precompute_jailbreak.py 에서 한 번 만들어
+precomputed/index/attack_{model}.{kind}/ 디렉터리(npy + meta.json)에 저장하고,
+서빙 시에는 읽기 전용 mmap (또는 SKYSHIELD_SHARED_STORE 의 shared memory) 으로 그대로 올린다.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .shared_store import load_npy
+
+INDEX_FORMAT_VERSION = 1
+
+# IVF 질의당 훑는 리스트 수 (기본값). 리스트 수가 ~4*sqrt(N) 이므로
+# 질의당 비용 = centroid n_lists 개 + nprobe * (N / n_lists) 행 ≈ (4 + nprobe / 4) * sqrt(N)
+IVF_DEFAULT_NPROBE = 16
+
+
+# ------------------------------------------------------------
+# 공통 유틸
+# ------------------------------------------------------------
+def l2_normalize(vecs, eps=1e-12):
+    """행 단위 L2 정규화 (float32, C-contiguous 로 반환)."""
+    vecs = np.asarray(vecs, dtype="float32")
+    if vecs.ndim == 1:
+        vecs = vecs[None, :]
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return np.ascontiguousarray(vecs / np.maximum(norms, eps), dtype="float32")
+
+
+def _topk(sims, k):
+    """sims (n, m) 에서 행별 상위 k 개 (유사도 내림차순) 의 값과 열 인덱스."""
+    k = min(k, sims.shape[1])
+    if k <= 0:
+        n = sims.shape[0]
+        return np.empty((n, 0), dtype="float32"), np.empty((n, 0), dtype="int64")
+
+    if k < sims.shape[1]:
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(sims.shape[1]), (sims.shape[0], 1))
+
+    part_sims = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_sims, axis=1)
+    return (
+        np.take_along_axis(part_sims, order, axis=1),
+        np.take_along_axis(part, order, axis=1).astype("int64"),
+    )
+
+
+def chunked_topk(score_chunk, n_rows, n_queries, k, chunk_rows=65_536):
+    """
+    큰 벡터 집합(memmap 등)을 chunk 단위로 훑으며 행별 top-k 를 유지.
+    score_chunk(start, end) → (n_queries, end - start) 유사도.
+    한 번에 chunk_rows 행만 메모리에 올라온다.
+    """
+    best_sims = np.empty((n_queries, 0), dtype="float32")
+    best_ids = np.empty((n_queries, 0), dtype="int64")
+
+    for start in range(0, n_rows, chunk_rows):
+        end = min(start + chunk_rows, n_rows)
+        sims, ids = _topk(np.asarray(score_chunk(start, end), dtype="float32"), k)
+        merged_sims = np.concatenate([best_sims, sims], axis=1)
+        merged_ids = np.concatenate([best_ids, ids + start], axis=1)
+        top_sims, pos = _topk(merged_sims, k)
+        best_sims, best_ids = top_sims, np.take_along_axis(merged_ids, pos, axis=1)
+
+    return best_sims, best_ids
+
+
+def _write_meta(path: Path, meta: dict):
+    with open(path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+# ------------------------------------------------------------
+# 1) Exact: 정규화된 벡터 brute-force
+# ------------------------------------------------------------
+class FlatIndex:
+    kind = "flat"
+
+    def __init__(self, vectors, normalized=False):
+        self.vectors = vectors if normalized else l2_normalize(vectors)
+
+    def __len__(self):
+        return int(self.vectors.shape[0])
+
+    @property
+    def dim(self):
+        return int(self.vectors.shape[1])
+
+    def similarities(self, queries):
+        """질의 (n, dim) 와 전체 벡터 간 코사인 유사도 (n, N)."""
+        return l2_normalize(queries) @ self.vectors.T
+
+    def search(self, queries, k=1):
+        return _topk(self.similarities(queries), k)
+
+    def max_similarity(self, queries):
+        sims = self.similarities(queries)
+        if sims.shape[1] == 0:
+            return np.full(sims.shape[0], -1.0, dtype="float32")
+        return sims.max(axis=1)
+
+    def add(self, vectors):
+        """새 벡터를 뒤에 붙인 인덱스를 반환 (기존 mmap 은 건드리지 않음)."""
+        return FlatIndex(np.vstack([self.vectors, l2_normalize(vectors)]), normalized=True)
+
+    # --------------------------------------------------------
+    # 저장 / 로드
+    # --------------------------------------------------------
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "vectors.npy", np.ascontiguousarray(self.vectors, dtype="float32"))
+        _write_meta(path, {
+            "format_version": INDEX_FORMAT_VERSION,
+            "kind": self.kind,
+            "n": len(self),
+            "dim": self.dim,
+        })
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        path = Path(path)
+        return cls(load_npy(path / "vectors.npy", mmap=mmap), normalized=True)
+
+
+class ChunkedFlatIndex:
+    """
+    정규화되지 않은 큰 벡터 집합(정상 벡터 memmap 등)에 대한 exact 검색.
+    chunk_rows 행씩 읽어 그 자리에서 정규화하고 부분 top-k 만 유지하므로
+    전체 집합이 RAM 에 올라오지 않는다.
+    """
+    kind = "flat-chunked"
+
+    def __init__(self, vectors, chunk_rows=65_536):
+        self.vectors = vectors
+        self.chunk_rows = int(chunk_rows)
+
+    def __len__(self):
+        return int(self.vectors.shape[0])
+
+    @property
+    def dim(self):
+        return int(self.vectors.shape[1])
+
+    @property
+    def nbytes(self):
+        return int(self.vectors.nbytes)
+
+    def search(self, queries, k=1):
+        q = l2_normalize(queries)
+        return chunked_topk(
+            lambda s, e: q @ l2_normalize(self.vectors[s:e]).T,
+            len(self), q.shape[0], k, chunk_rows=self.chunk_rows,
+        )
+
+    def max_similarity(self, queries):
+        sims, _ = self.search(queries, k=1)
+        if sims.shape[1] == 0:
+            return np.full(sims.shape[0], -1.0, dtype="float32")
+        return sims[:, 0]
+
+
+# ------------------------------------------------------------
+# 2) Approximate: IVF (inverted file) + spherical k-means
+# ------------------------------------------------------------
+def spherical_kmeans(vecs, n_clusters, n_iter=20, seed=0, sample_size=50_000):
+    """정규화된 벡터에 대한 spherical k-means. (centroids, assign) 반환."""
+    rng = np.random.default_rng(seed)
+    n = vecs.shape[0]
+    n_clusters = max(1, min(n_clusters, n))
+
+    train = vecs
+    if n > sample_size:
+        train = vecs[np.sort(rng.choice(n, sample_size, replace=False))]
+
+    centroids = np.array(train[rng.choice(train.shape[0], n_clusters, replace=False)])
+
+    for _ in range(n_iter):
+        assign = np.argmax(train @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = train[assign == c]
+            if len(members) == 0:
+                # 빈 셀은 임의 점으로 재시작
+                centroids[c] = train[rng.integers(train.shape[0])]
+            else:
+                centroids[c] = members.sum(axis=0)
+        centroids = l2_normalize(centroids)
+
+    # 전체 벡터를 최종 centroid 에 배정 (chunk 단위로 메모리 제한)
+    assign = np.empty(n, dtype="int64")
+    for i in range(0, n, 65_536):
+        assign[i:i + 65_536] = np.argmax(vecs[i:i + 65_536] @ centroids.T, axis=1)
+    return centroids, assign
+
+
+class IVFIndex:
+    kind = "ivf"
+
+    def __init__(self, centroids, vectors, ids, offsets, nprobe=IVF_DEFAULT_NPROBE):
+        self.centroids = centroids      # (n_lists, dim), 정규화됨
+        self.vectors = vectors          # (N, dim), 리스트 순서로 정렬 + 정규화됨
+        self.ids = ids                  # (N,) 정렬된 위치 -> 원래 행 번호
+        self.offsets = offsets          # (n_lists + 1,) 리스트 경계
+        self.nprobe = int(nprobe)
+
+    def __len__(self):
+        return int(self.vectors.shape[0])
+
+    @property
+    def dim(self):
+        return int(self.vectors.shape[1])
+
+    @property
+    def n_lists(self):
+        return int(self.centroids.shape[0])
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, nprobe=None, n_iter=20, seed=0):
+        vecs = l2_normalize(vectors)
+        n = vecs.shape[0]
+        if n_lists is None:
+            # 리스트 수 ~ 4*sqrt(N) → 리스트 하나의 크기도 ~sqrt(N)/4
+            n_lists = max(1, int(round(4 * np.sqrt(n))))
+        if nprobe is None:
+            # nprobe 를 N 과 무관한 상수로 둬야 질의당 비용이 O(sqrt(N))
+            # (n_lists 에 비례시키면 훑는 행 수가 N 의 일정 비율 → 다시 O(N))
+            nprobe = IVF_DEFAULT_NPROBE
+
+        centroids, assign = spherical_kmeans(vecs, n_lists, n_iter=n_iter, seed=seed)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=centroids.shape[0])
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype("int64")
+
+        return cls(
+            centroids=centroids,
+            vectors=np.ascontiguousarray(vecs[order]),
+            ids=order.astype("int64"),
+            offsets=offsets,
+            nprobe=min(nprobe, centroids.shape[0]),
+        )
+
+    def _candidates(self, probe_lists):
+        return np.concatenate(
+            [np.arange(self.offsets[c], self.offsets[c + 1]) for c in probe_lists]
+        )
+
+    def _probes(self, q, nprobe=None):
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        return _topk(q @ self.centroids.T, nprobe)[1]
+
+    def scanned(self, queries, nprobe=None):
+        """질의별로 유사도를 계산하는 벡터 수 (centroid n_lists 개 + 후보 행 수)."""
+        probes = self._probes(l2_normalize(queries), nprobe)
+        sizes = np.diff(self.offsets)
+        return self.n_lists + sizes[probes].sum(axis=1)
+
+    def search(self, queries, k=1, nprobe=None):
+        q = l2_normalize(queries)
+        probes = self._probes(q, nprobe)
+
+        out_sims = np.full((q.shape[0], k), -1.0, dtype="float32")
+        out_ids = np.full((q.shape[0], k), -1, dtype="int64")
+        for i in range(q.shape[0]):
+            cand = self._candidates(probes[i])
+            if len(cand) == 0:
+                continue
+            sims = (self.vectors[cand] @ q[i])[None, :]
+            top_sims, top_pos = _topk(sims, k)
+            kk = top_sims.shape[1]
+            out_sims[i, :kk] = top_sims[0]
+            out_ids[i, :kk] = self.ids[cand[top_pos[0]]]
+        return out_sims, out_ids
+
+    def max_similarity(self, queries):
+        sims, _ = self.search(queries, k=1)
+        return sims[:, 0]
+
+    def add(self, vectors):
+        """
+        새 벡터를 가장 가까운 기존 리스트에 넣은 인덱스를 반환.
+        centroid 는 다시 학습하지 않으며, 새 행 번호는 len(self) 부터 이어진다.
+        """
+        new = l2_normalize(vectors)
+        n_old = len(self)
+
+        old_assign = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))
+        new_assign = np.argmax(new @ self.centroids.T, axis=1)
+        assign = np.concatenate([old_assign, new_assign])
+        order = np.argsort(assign, kind="stable")
+
+        vecs = np.vstack([self.vectors, new])
+        ids = np.concatenate([self.ids, np.arange(n_old, n_old + len(new), dtype="int64")])
+        counts = np.bincount(assign, minlength=self.n_lists)
+        return IVFIndex(
+            centroids=self.centroids,
+            vectors=np.ascontiguousarray(vecs[order]),
+            ids=ids[order],
+            offsets=np.concatenate([[0], np.cumsum(counts)]).astype("int64"),
+            nprobe=self.nprobe,
+        )
+
+    # --------------------------------------------------------
+    # 저장 / 로드
+    # --------------------------------------------------------
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "centroids.npy", np.ascontiguousarray(self.centroids, dtype="float32"))
+        np.save(path / "vectors.npy", np.ascontiguousarray(self.vectors, dtype="float32"))
+        np.save(path / "ids.npy", np.asarray(self.ids, dtype="int64"))
+        np.save(path / "offsets.npy", np.asarray(self.offsets, dtype="int64"))
+        _write_meta(path, {
+            "format_version": INDEX_FORMAT_VERSION,
+            "kind": self.kind,
+            "n": len(self),
+            "dim": self.dim,
+            "n_lists": self.n_lists,
+            "nprobe": self.nprobe,
+        })
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        path = Path(path)
+        meta = json.load(open(path / "meta.json", encoding="utf-8"))
+        return cls(
+            centroids=np.load(path / "centroids.npy"),
+            vectors=load_npy(path / "vectors.npy", mmap=mmap),
+            ids=load_npy(path / "ids.npy", mmap=mmap),
+            offsets=np.load(path / "offsets.npy"),
+            nprobe=meta.get("nprobe", IVF_DEFAULT_NPROBE),
+        )
+
+
+INDEX_TYPES = {
+    FlatIndex.kind: FlatIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+# ------------------------------------------------------------
+# 3) 팩토리 / 로더
+# ------------------------------------------------------------
+# 압축 코드 위에서 점수를 계산하는 인덱스 (src/quantize.py)
+QUANTIZED_KINDS = ("fp16", "int8", "pq")
+
+
+def build_index(kind, vectors, **kwargs):
+    if kind in QUANTIZED_KINDS:
+        from .quantize import QuantizedIndex
+        return QuantizedIndex.build(kind, vectors, **kwargs)
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unsupported index kind: {kind}")
+    if kind == FlatIndex.kind:
+        return FlatIndex(vectors)
+    return INDEX_TYPES[kind].build(vectors, **kwargs)
+
+
+def load_index(path, mmap=True, **kwargs):
+    """kwargs 는 압축 인덱스의 re-ranking 옵션 (rerank_vectors, rerank_k) 으로 전달."""
+    path = Path(path)
+    meta_path = path / "meta.json"
+    if not meta_path.exists():
+        raise RuntimeError(f"인덱스 파일을 찾을 수 없습니다: {path}")
+
+    meta = json.load(open(meta_path, encoding="utf-8"))
+    if meta.get("format_version") != INDEX_FORMAT_VERSION:
+        raise RuntimeError(
+            f"지원하지 않는 인덱스 버전입니다: {meta.get('format_version')} ({path})"
+        )
+    if meta["kind"] in QUANTIZED_KINDS:
+        from .quantize import QuantizedIndex
+        return QuantizedIndex.load(path, mmap=mmap, **kwargs)
+    return INDEX_TYPES[meta["kind"]].load(path, mmap=mmap)
+
+
+# ------------------------------------------------------------
+# 4) 근사 인덱스 recall 리포트
+# ------------------------------------------------------------
+def recall_report(index, exact, queries, k=10):
+    """
+    근사 인덱스 vs exact 검색 비교.
+    - recall@1 : top-1 이웃이 일치하는 비율
+    - recall@k : exact top-k 중 근사 top-k 에 포함된 비율
+    - max_sim_abs_err : SkyShield 가 쓰는 최대 유사도의 오차
+    - scanned_per_query : 질의당 유사도를 계산한 벡터 수 (exact 는 N)
+    """
+    import time
+
+    t0 = time.perf_counter()
+    a_sims, a_ids = index.search(queries, k=k)
+    t_approx = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    e_sims, e_ids = exact.search(queries, k=k)
+    t_exact = time.perf_counter() - t0
+
+    kk = e_ids.shape[1]
+    hits = [len(set(a_ids[i, :kk]) & set(e_ids[i])) for i in range(len(e_ids))]
+    n_q = max(len(e_ids), 1)
+    scanned = float(np.mean(index.scanned(queries))) if hasattr(index, "scanned") else float(len(exact))
+
+    return {
+        "kind": index.kind,
+        "n_vectors": len(exact),
+        "n_queries": int(len(e_ids)),
+        "k": int(kk),
+        "recall@1": float(np.mean(a_ids[:, 0] == e_ids[:, 0])) if kk else 1.0,
+        f"recall@{kk}": float(np.sum(hits) / max(n_q * kk, 1)),
+        "max_sim_abs_err": float(np.max(np.abs(a_sims[:, 0] - e_sims[:, 0]))) if kk else 0.0,
+        "scanned_per_query": scanned,
+        "scanned_fraction": scanned / max(len(exact), 1),
+        "approx_ms_per_query": 1000 * t_approx / n_q,
+        "exact_ms_per_query": 1000 * t_exact / n_q,
+    }
+
+
+def scaling_report(vectors, make_queries, sizes, k=10, seed=0, **build_kwargs):
+    """
+    코퍼스 크기별 IVF recall / 질의당 훑는 벡터 수.
+    sizes 의 각 n 에 대해 vectors 에서 n 행을 뽑아 IVF 를 새로 만들고
+    make_queries(subset) 로 만든 질의를 exact(Flat) 와 비교한다.
+    scanned_per_query 가 sqrt(N) 에 비례해 늘어나는지 확인하는 용도.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in sizes:
+        n = int(min(n, vectors.shape[0]))
+        subset = np.asarray(vectors[np.sort(rng.choice(vectors.shape[0], n, replace=False))])
+        index = IVFIndex.build(subset, seed=seed, **build_kwargs)
+        report = recall_report(index, FlatIndex(subset), make_queries(subset), k=k)
+        report["n_lists"] = index.n_lists
+        report["nprobe"] = index.nprobe
+        report["scanned_per_sqrt_n"] = report["scanned_per_query"] / float(np.sqrt(n))
+        rows.append(report)
+    return rows
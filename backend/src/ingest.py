@@ -0,0 +1,375 @@
+"""
+새 공격 텍스트 온라인 편입 (전체 precompute 재실행 없이).
+
+1) 새 텍스트만 임베딩 (요청 내 중복 / 기존 공격과 거의 같은 벡터는 제외)
+2) attack_{model}.npy 가 있는 모든 임베딩 모델로 같은 텍스트를 임베딩해
+   각 모델의 attack_{model}.npy 와 precomputed/index/ 의 공격 인덱스 뒤에 추가
+   (텍스트 CSV / sidecar 는 모델 공용이므로 모든 모델의 벡터 행이 같이 늘어야 한다)
+3) 클러스터 아티팩트마다 새 벡터를 기존 클러스터에 배정 (ClusterAnalyzer.assign)
+4) 편입 이후 noise 비율이 학습 당시보다 SKYSHIELD_RECLUSTER_DRIFT 이상 늘면
+   해당 아티팩트만 HDBSCAN 재학습
+5) 텍스트는 data/jailbreak_customed.csv 에 label=1 로 추가
+   (다음 전체 precompute 에도 포함되고, load_dataset 의 공격 순서와 벡터 행이 맞음)
+   precomputed/texts/attack sidecar 가 있으면 거기에도 같은 순서로 추가
+6) precomputed/corpus_version.json 버전 +1
+   → 모든 서빙 워커가 다음 요청에서 캐시를 비우고 새 파일을 읽는다
+
+- 편입 / 재클러스터링은 호스트 단위 파일 락(precomputed/.ingest.lock, fcntl.flock) 안에서만
+  파일을 고친다 (여러 워커 / CLI 가 동시에 실행돼도 순서대로).
+- npy 는 임시 파일에 쓴 뒤 rename, 인덱스 / 아티팩트 디렉터리는
+  .versions/{이름}.{ns} 에 새로 쓴 뒤 심볼릭 링크를 교체하므로
+  경로는 항상 존재하고, 이미 mmap 으로 열어 둔 워커는 이전 파일을 그대로 읽는다.
+"""
+
+import os
+import csv
+import time
+import shutil
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+
+from .embedding import Embedder
+from .cluster_analyzer import ClusterAnalyzer
+from .summarizer import Summarizer
+from .artifacts import MANIFEST, save_cluster_artifact, load_cluster_artifact
+from .textstore import append_texts
+from .index import INDEX_TYPES, QUANTIZED_KINDS, FlatIndex, load_index
+from .utils import (
+    DATA_DIR,
+    PRE_DIR,
+    ARTIFACT_DIR,
+    safe_name,
+    attack_models,
+    attack_vectors_path,
+    write_attack_meta,
+    bump_corpus_version,
+    load_attack_texts,
+    load_attack_vectors,
+    text_store_path,
+    attack_index_path,
+    cluster_artifact_path,
+    get_embedding_client,
+)
+
+# 편입 이후 noise 비율 증가량이 이 값을 넘으면 재클러스터링
+RECLUSTER_DRIFT = float(os.getenv("SKYSHIELD_RECLUSTER_DRIFT", "0.15"))
+# drift 판단에 필요한 최소 편입 수
+RECLUSTER_MIN_NEW = int(os.getenv("SKYSHIELD_RECLUSTER_MIN_NEW", "20"))
+# 기존 공격과 이 이상 유사하면 중복으로 보고 건너뜀
+DUPLICATE_SIM = 0.999
+
+CUSTOM_CSV = DATA_DIR / "jailbreak_customed.csv"
+RECLUSTER_MODES = ("auto", "never", "force")
+
+INGEST_LOCK_PATH = PRE_DIR / ".ingest.lock"
+VERSIONS_DIR = ".versions"
+# 디렉터리 교체 후 남겨 둘 이전 버전 수 (아직 이전 버전을 열고 있는 워커용)
+KEEP_OLD_VERSIONS = 1
+
+# fcntl 이 없는 환경(Windows)에서는 프로세스 안에서만 직렬화
+_THREAD_LOCK = threading.Lock()
+
+
+@contextmanager
+def ingest_lock():
+    """편입 / 재클러스터링 파일 수정 구간. 같은 호스트의 모든 워커 / CLI 사이에서 배타적."""
+    if fcntl is None:
+        with _THREAD_LOCK:
+            yield
+        return
+    INGEST_LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(INGEST_LOCK_PATH, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ------------------------------------------------------------
+# 파일 교체 헬퍼
+# ------------------------------------------------------------
+def _save_npy_atomic(path: Path, arr):
+    tmp = path.with_name(path.stem + ".tmp.npy")
+    np.save(tmp, arr)
+    tmp.replace(path)
+
+
+def _version_number(path: Path, name: str):
+    suffix = path.name[len(name) + 1:]
+    return int(suffix) if path.name.startswith(name + ".") and suffix.isdigit() else None
+
+
+def _prune_versions(versions: Path, name: str, current: Path):
+    old = []
+    for path in versions.iterdir():
+        number = _version_number(path, name)
+        if number is not None and path != current:
+            old.append((number, path))
+    old.sort()
+    for _, path in old[:max(len(old) - KEEP_OLD_VERSIONS, 0)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _rewrite_dir(dst: Path, save_fn):
+    """
+    save_fn(새 디렉터리) 로 dst.parent/.versions/{dst.name}.{ns} 를 만든 뒤
+    dst 심볼릭 링크를 새 디렉터리로 rename 교체 (dst 가 없는 순간이 없음).
+    precompute 가 만든 일반 디렉터리는 첫 교체 때 .versions/{dst.name}.0 으로 옮긴다
+    (이 한 번만 rename 두 번 사이에 dst 가 잠깐 없다).
+    """
+    versions = dst.parent / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    new = versions / f"{dst.name}.{time.time_ns()}"
+    save_fn(new)
+
+    if dst.exists() and not dst.is_symlink():
+        dst.rename(versions / f"{dst.name}.0")
+    # 이름이 . 으로 시작해야 cluster_artifacts() 등 접두사 탐색에 걸리지 않는다
+    link = dst.with_name(f".{dst.name}.link")
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    link.symlink_to(Path(VERSIONS_DIR) / new.name, target_is_directory=True)
+    os.replace(link, dst)
+
+    _prune_versions(versions, dst.name, new)
+    return dst
+
+
+def _append_texts_csv(texts, path: Path | None = None):
+    """기존 헤더를 유지하며 text / label=1 행을 추가."""
+    path = path or CUSTOM_CSV
+    with open(path, encoding="utf-8", newline="") as f:
+        header = next(csv.reader(f))
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) != b"\n"
+
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        if needs_newline:
+            f.write("\n")
+        writer = csv.DictWriter(f, fieldnames=header, restval="")
+        for text in texts:
+            writer.writerow({"text": text, "label": 1})
+
+
+# ------------------------------------------------------------
+# 인덱스 / 아티팩트 갱신
+# ------------------------------------------------------------
+def _update_indexes(embed_model: str, new_vecs):
+    updated = []
+    for kind in (*INDEX_TYPES, *QUANTIZED_KINDS):
+        path = attack_index_path(embed_model, kind)
+        if not (path / "meta.json").exists():
+            continue
+        index = load_index(path, mmap=False).add(new_vecs)
+        _rewrite_dir(path, index.save)
+        updated.append(kind)
+    return updated
+
+
+def cluster_artifacts(embed_model: str):
+    """embed_model 로 만든 클러스터 아티팩트 경로 목록."""
+    prefix = f"cluster_{safe_name(embed_model)}_"
+    paths = []
+    if ARTIFACT_DIR.exists():
+        for path in sorted(ARTIFACT_DIR.iterdir()):
+            if path.name.startswith(prefix) and (path / MANIFEST).exists():
+                paths.append(path)
+    return paths
+
+
+def _noise_drift(stats):
+    if stats["n_since_fit"] == 0:
+        return 0.0
+    return stats["noise_since_fit"] / stats["n_since_fit"] - stats["baseline_noise"]
+
+
+def _fresh_stats(labels):
+    labels = np.asarray(labels)
+    return {
+        "baseline_noise": float((labels == -1).mean()) if len(labels) else 0.0,
+        "n_since_fit": 0,
+        "noise_since_fit": 0,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _ingest_artifact(path: Path, new_vecs):
+    analyzer, atk_vec, manifest = load_cluster_artifact(path, verify=False, mmap=False)
+    stats = manifest.get("ingest") or _fresh_stats(analyzer.labels)
+
+    labels, probs = analyzer.assign(new_vecs)
+    analyzer.extend(new_vecs, labels, probs)
+
+    stats["n_since_fit"] += int(len(labels))
+    stats["noise_since_fit"] += int((labels == -1).sum())
+    stats["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+    _rewrite_dir(path, lambda tmp: save_cluster_artifact(
+        tmp, analyzer, np.vstack([atk_vec, new_vecs]),
+        manifest["embed_model"], manifest["summ_model"], extra={"ingest": stats},
+    ))
+
+    drift = _noise_drift(stats)
+    return {
+        "embed_model": manifest["embed_model"],
+        "summ_model": manifest["summ_model"],
+        "labels": [int(x) for x in labels],
+        "drift": round(drift, 4),
+        "recluster_needed": stats["n_since_fit"] >= RECLUSTER_MIN_NEW and drift > RECLUSTER_DRIFT,
+    }
+
+
+def recluster_artifact(embed_model: str, summ_model: str):
+    """아티팩트 하나를 현재 공격 벡터 전체로 다시 학습 (이름 생성 포함)."""
+    with ingest_lock():
+        atk_vec = load_attack_vectors(embed_model)
+        atk_texts = load_attack_texts()
+        if len(atk_texts) != len(atk_vec):
+            raise RuntimeError(
+                f"공격 텍스트 수({len(atk_texts)})와 {embed_model} 벡터 행 수({len(atk_vec)})가 다릅니다. "
+                "precompute_jailbreak.py 로 다시 생성하세요."
+            )
+
+        summarizer = Summarizer(summ_model)
+        analyzer = ClusterAnalyzer(summarizer=summarizer)
+        analyzer.fit(atk_vec)
+        analyzer.generate_cluster_names(atk_texts, summarizer)
+
+        path = cluster_artifact_path(embed_model, summ_model)
+        _rewrite_dir(path, lambda tmp: save_cluster_artifact(
+            tmp, analyzer, atk_vec, embed_model, summ_model,
+            extra={"ingest": _fresh_stats(analyzer.labels)},
+        ))
+        bump_corpus_version(f"recluster {embed_model} / {summ_model}")
+        return path
+
+
+def _target_models(embed_model: str):
+    """
+    편입할 모델 이름 → attack_{model}.npy 경로.
+    이름을 알 수 없는 벡터 파일이 있으면 그 모델만 행이 모자라게 되므로 편입하지 않는다.
+    """
+    models, unknown = attack_models()
+    requested = attack_vectors_path(embed_model)
+    unknown = [p for p in unknown if p != requested]
+    if unknown:
+        raise RuntimeError(
+            "모델 이름을 알 수 없는 공격 벡터 파일이 있어 편입할 수 없습니다: "
+            + ", ".join(p.name for p in unknown)
+            + " (precompute_jailbreak.py 로 다시 생성하면 attack_{model}.meta.json 이 기록됩니다)"
+        )
+    if not requested.exists():
+        raise RuntimeError(f"공격 벡터 파일이 없습니다: {requested}")
+    models[embed_model] = requested
+    return models
+
+
+# ------------------------------------------------------------
+# 진입점
+# ------------------------------------------------------------
+def ingest_attacks(texts, embed_model: str, embedder: Embedder | None = None,
+                   recluster: str = "auto", embedder_factory=None):
+    """
+    새 공격 텍스트를 편입하고 리포트 dict 를 반환.
+
+    중복 판정은 embed_model 기준이고, 남은 텍스트는 attack_{model}.npy 가 있는
+    모든 모델로 임베딩해 함께 추가한다 (embedder_factory(model) → Embedder, 기본은 새로 생성).
+
+    recluster:
+    - "auto"  : drift 가 기준을 넘은 아티팩트만 바로 재학습
+    - "never" : 재학습하지 않고 리포트의 recluster_needed 로만 알림
+    - "force" : drift 와 무관하게 모든 아티팩트 재학습
+    """
+    if recluster not in RECLUSTER_MODES:
+        raise ValueError(f"recluster 는 {RECLUSTER_MODES} 중 하나여야 합니다: {recluster}")
+
+    # 요청 안의 빈 문자열 / 중복 제거 (순서 유지)
+    texts = list(dict.fromkeys(t.strip() for t in texts if t and t.strip()))
+    report = {
+        "n_received": len(texts),
+        "n_added": 0,
+        "n_duplicates": 0,
+        "models": [],
+        "indexes": {},
+        "clusters": [],
+        "reclustered": [],
+    }
+    if not texts:
+        return report
+
+    if embedder_factory is None:
+        def embedder_factory(model):
+            return Embedder(model, client=get_embedding_client(model))
+    if embedder is None:
+        embedder = embedder_factory(embed_model)
+
+    with ingest_lock():
+        models = _target_models(embed_model)
+        atk_vecs = {model: load_attack_vectors(model) for model in models}
+        n_rows = len(atk_vecs[embed_model])
+        misaligned = [m for m, v in atk_vecs.items() if len(v) != n_rows]
+        if misaligned:
+            raise RuntimeError(
+                f"공격 벡터 행 수가 모델마다 다릅니다 ({embed_model}: {n_rows}, "
+                + ", ".join(f"{m}: {len(atk_vecs[m])}" for m in misaligned)
+                + "). precompute_jailbreak.py 로 다시 생성하세요."
+            )
+
+        new_vecs = {embed_model: np.asarray(embedder.encode(texts), dtype="float32")}
+
+        # 기존 공격과 사실상 같은 벡터는 건너뜀
+        dup = FlatIndex(atk_vecs[embed_model]).max_similarity(new_vecs[embed_model]) >= DUPLICATE_SIM
+        keep = ~dup
+        texts = [t for t, k in zip(texts, keep) if k]
+        new_vecs[embed_model] = new_vecs[embed_model][keep]
+        report["n_duplicates"] = int(dup.sum())
+        report["n_added"] = len(texts)
+        report["n_total"] = int(n_rows + len(texts))
+        if not texts:
+            return report
+
+        # 파일을 고치기 전에 모든 모델 임베딩을 끝낸다 (중간에 실패해도 행이 어긋나지 않게)
+        for model in models:
+            if model not in new_vecs:
+                new_vecs[model] = np.asarray(embedder_factory(model).encode(texts), dtype="float32")
+
+        for model, path in models.items():
+            vecs = np.vstack([atk_vecs[model], new_vecs[model]])
+            _save_npy_atomic(path, vecs)
+            write_attack_meta(model, *vecs.shape)
+        _append_texts_csv(texts)
+        append_texts(text_store_path("attack"), texts)
+
+        for model in models:
+            report["indexes"][model] = _update_indexes(model, new_vecs[model])
+            report["clusters"] += [_ingest_artifact(p, new_vecs[model]) for p in cluster_artifacts(model)]
+        report["models"] = list(models)
+        bump_corpus_version(f"ingest {len(texts)}")
+
+    for entry in report["clusters"]:
+        if recluster == "force" or (recluster == "auto" and entry["recluster_needed"]):
+            recluster_artifact(entry["embed_model"], entry["summ_model"])
+            report["reclustered"].append(
+                {"embed_model": entry["embed_model"], "summ_model": entry["summ_model"]}
+            )
+    return report
+
+
+def read_texts_file(path):
+    """CLI 입력: .csv 면 text 열, 그 외는 한 줄에 하나."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            return [row["text"] for row in csv.DictReader(f)]
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
@@ -0,0 +1,113 @@
+"""
+공격 / 정상 양쪽 kNN 기반 점수.
+
+공격 벡터와의 최대 유사도만 보면 공격 근처에 있는 정상 프롬프트가 오탐된다.
+TwoSidedScorer 는 공격 집합과 정상 집합(정상 벡터 memmap, 약 16만 개)에서
+각각 top-k 이웃을 찾고, 두 쪽 평균 유사도의 차이(margin)를 점수로 쓴다.
+
+정상 집합은 ChunkedFlatIndex / QuantizedIndex 로 chunk 단위 검색하므로
+전체가 RAM 에 올라오지 않는다.
+
+    python -m src.knn --embed-model "OpenAI Embedding" --queries 50   # 지연시간 리포트
+"""
+
+import time
+
+import numpy as np
+
+
+class TwoSidedScorer:
+    def __init__(self, attack_index, normal_index, k=10, margin_thr=0.0):
+        self.attack_index = attack_index
+        self.normal_index = normal_index
+        self.k = int(k)
+        self.margin_thr = float(margin_thr)
+
+    def score(self, user_vecs):
+        """
+        입력별 {attack_max, normal_max, attack_sim, normal_sim, margin, attack_vote}.
+        - attack_sim / normal_sim : 각 집합 top-k 평균 유사도
+        - margin                 : attack_sim - normal_sim
+        - attack_vote            : 두 집합을 합친 top-k 중 공격 이웃 비율
+        """
+        vecs = np.atleast_2d(np.asarray(user_vecs))
+        a_sims, a_ids = self.attack_index.search(vecs, k=self.k)
+        n_sims, n_ids = self.normal_index.search(vecs, k=self.k)
+
+        results = []
+        for a, a_id, n, n_id in zip(a_sims, a_ids, n_sims, n_ids):
+            # IVF 는 probe 한 리스트가 k 개보다 적으면 (sim -1, id -1) 로 채운다 → 제외
+            a, n = a[np.asarray(a_id) >= 0], n[np.asarray(n_id) >= 0]
+            merged = np.concatenate([a, n])
+            is_attack = np.concatenate([np.ones(len(a)), np.zeros(len(n))])
+            top = np.argsort(-merged)[:self.k]
+            attack_sim = float(a.mean()) if len(a) else -1.0
+            normal_sim = float(n.mean()) if len(n) else -1.0
+            results.append({
+                "attack_max": float(a.max()) if len(a) else -1.0,
+                "normal_max": float(n.max()) if len(n) else -1.0,
+                "attack_sim": attack_sim,
+                "normal_sim": normal_sim,
+                "margin": attack_sim - normal_sim,
+                "attack_vote": float(is_attack[top].mean()) if len(top) else 0.0,
+            })
+        return results
+
+    def adjust(self, decision, knn):
+        """
+        SkyShield 판정을 score() 결과로 보정.
+        정상 이웃이 더 가깝고 (margin < margin_thr) 최근접 이웃도 정상이면
+        한 단계 낮춘다. 알려진 공격의 변형(최근접이 공격)은 그대로 둔다.
+        """
+        if knn["margin"] >= self.margin_thr or knn["attack_max"] >= knn["normal_max"]:
+            return decision
+        return {"BLOCK": "REVIEW", "REVIEW": "ALLOW"}.get(decision, decision)
+
+
+# ------------------------------------------------------------
+# 전체 코퍼스 지연시간 리포트
+# ------------------------------------------------------------
+def latency_report(scorer: TwoSidedScorer, queries):
+    timings = []
+    for q in queries:
+        t0 = time.perf_counter()
+        scorer.score(q)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    timings = np.asarray(timings)
+    return {
+        "n_queries": int(len(timings)),
+        "k": scorer.k,
+        "n_attack": int(len(scorer.attack_index)),
+        "n_normal": int(len(scorer.normal_index)),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "max_ms": float(timings.max()),
+    }
+
+
+if __name__ == "__main__":
+    import os
+    import json
+    import argparse
+
+    from .utils import load_attack_index, load_attack_vectors, load_normal_index
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-model", type=str, default="OpenAI Embedding")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--quant", type=str, default=os.getenv("SKYSHIELD_NORMAL_QUANT") or None)
+    args = parser.parse_args()
+
+    atk_vec = load_attack_vectors(args.embed_model)
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(atk_vec), min(args.queries, len(atk_vec)), replace=False)
+    noise = rng.normal(scale=0.05 / np.sqrt(atk_vec.shape[1]), size=(len(rows), atk_vec.shape[1]))
+
+    scorer = TwoSidedScorer(
+        load_attack_index(args.embed_model),
+        load_normal_index(args.embed_model, quant=args.quant),
+        k=args.k,
+    )
+    print(json.dumps(latency_report(scorer, atk_vec[rows] + noise), indent=2))
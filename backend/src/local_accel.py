@@ -0,0 +1,257 @@
+"""
+로컬 SentenceTransformer 백엔드의 CPU 추론 가속 경로.
+
+SKYSHIELD_LOCAL_ACCEL 로 선택 (Embedder 의 로컬 모델 4종 공통):
+
+    none       기존 SentenceTransformer.encode (fp32, 기본값)
+    fp32       같은 torch 모델 + 토큰 길이 bucketing
+    int8       torch dynamic int8 양자화 (nn.Linear) + bucketing
+    onnx       export 한 ONNX 모델을 onnxruntime 으로 실행 + bucketing (torch import 없음)
+    onnx-int8  onnxruntime dynamic int8 양자화 모델
+
+토큰 길이 bucketing: 입력을 한 번 토큰화해 길이순으로 정렬하고
+비슷한 길이끼리 SKYSHIELD_LOCAL_BATCH 개씩 묶어 배치마다 그 안의 최대 길이까지만 padding 한다.
+intra-op 스레드 수는 SKYSHIELD_LOCAL_THREADS (0 = 라이브러리 기본값).
+
+ONNX 모델은 미리 export 해 둔다 (torch / sentence-transformers 필요, 서빙 노드에는 불필요):
+
+    (SKY_venv) $ python -m src.local_accel --model BAAI/bge-m3 --quantize
+
+    precomputed/onnx/{model}/
+        model.onnx / model.int8.onnx   transformer 본체 (last_hidden_state 출력)
+        tokenizer 파일들
+        meta.json                      pooling (mean / cls / max), normalize, max_length
+
+정확도 / 속도 비교는 bench_local_embed.py.
+"""
+
+import os
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+
+from .registry import registry
+
+ACCEL_MODES = ("none", "fp32", "int8", "onnx", "onnx-int8")
+
+LOCAL_ACCEL = os.getenv("SKYSHIELD_LOCAL_ACCEL", "none")
+LOCAL_THREADS = int(os.getenv("SKYSHIELD_LOCAL_THREADS", "0"))
+LOCAL_BATCH = int(os.getenv("SKYSHIELD_LOCAL_BATCH", "32"))
+
+
+def onnx_dir(hf_name: str) -> Path:
+    from .utils import PRE_DIR, safe_name   # utils → embedding → local_accel 순환 import 방지
+    return Path(os.getenv("SKYSHIELD_ONNX_DIR") or PRE_DIR / "onnx") / safe_name(hf_name)
+
+
+# ------------------------------------------------------------
+# 토큰 길이 bucketing
+# ------------------------------------------------------------
+def bucket_batches(lengths, batch_size):
+    """길이순으로 정렬해 batch_size 씩 자른 원래 인덱스 배열 목록."""
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    return [order[i:i + batch_size] for i in range(0, len(order), max(int(batch_size), 1))]
+
+
+def padding_ratio(lengths, batches):
+    """padding 토큰 비율 (0 = 낭비 없음). bucketing 효과 확인용."""
+    lengths = np.asarray(lengths)
+    padded = sum(int(lengths[idx].max()) * len(idx) for idx in batches if len(idx))
+    return 1.0 - float(lengths.sum()) / max(padded, 1)
+
+
+def _pool(hidden, mask, mode):
+    if mode == "cls":
+        return hidden[:, 0]
+    mask = mask[:, :, None].astype(hidden.dtype)
+    if mode == "max":
+        return np.where(mask > 0, hidden, -1e9).max(axis=1)
+    return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+def _set_torch_threads(threads):
+    if threads > 0:
+        registry.get("torch").set_num_threads(threads)
+
+
+class _BucketedEncoder(ABC):
+    """토큰화 1회 → 길이 bucket 별 padding → forward → 원래 순서로 복원."""
+
+    def __init__(self, tokenizer, max_length, batch_size):
+        self.tokenizer = tokenizer
+        self.max_length = int(max_length)
+        self.batch_size = int(batch_size)
+        self.last_padding_ratio = None
+
+    def encode(self, texts, **_):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype="float32")
+
+        enc = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        lengths = [len(ids) for ids in enc["input_ids"]]
+        batches = bucket_batches(lengths, self.batch_size)
+        self.last_padding_ratio = padding_ratio(lengths, batches)
+
+        out = None
+        for idx in batches:
+            features = self.tokenizer.pad({k: [enc[k][i] for i in idx] for k in enc.keys()},
+                                          **self._pad_kwargs())
+            vecs = self._forward(features)
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype="float32")
+            out[idx] = vecs
+        return out
+
+    @abstractmethod
+    def _pad_kwargs(self):
+        """tokenizer.pad 에 넘길 인자 (텐서 형식)."""
+
+    @abstractmethod
+    def _forward(self, features):
+        """padding 된 배치 → (batch, dim) float32 벡터."""
+
+
+# ------------------------------------------------------------
+# torch (fp32 / dynamic int8)
+# ------------------------------------------------------------
+class TorchEncoder(_BucketedEncoder):
+    def __init__(self, hf_name, quantize=False, threads=LOCAL_THREADS, batch_size=LOCAL_BATCH):
+        torch = registry.get("torch")
+        _set_torch_threads(threads)
+        model = registry.get("sentence-transformers")(hf_name, device="cpu")
+        model.eval()
+        if quantize:
+            # nn.Linear 가중치만 int8, 활성값은 실행 시 동적 양자화
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(model.tokenizer, model.max_seq_length, batch_size)
+        self.torch = torch
+        self.model = model
+
+    def _pad_kwargs(self):
+        return {"return_tensors": "pt"}
+
+    def _forward(self, features):
+        with self.torch.inference_mode():
+            return self.model(dict(features))["sentence_embedding"].float().numpy()
+
+
+# ------------------------------------------------------------
+# onnxruntime
+# ------------------------------------------------------------
+class OnnxEncoder(_BucketedEncoder):
+    def __init__(self, path, quantized=False, threads=LOCAL_THREADS, batch_size=LOCAL_BATCH):
+        path = Path(path)
+        model_file = path / ("model.int8.onnx" if quantized else "model.onnx")
+        if not model_file.exists():
+            raise RuntimeError(
+                f"ONNX 모델 파일이 없습니다: {model_file}\n"
+                f"backend 디렉터리에서 python -m src.local_accel --model ... 로 먼저 export 하세요."
+            )
+        with open(path / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        ort = registry.get("onnxruntime")
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_file), opts, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+        tokenizer = registry.get("transformers-tokenizer").from_pretrained(str(path))
+        super().__init__(tokenizer, self.meta["max_length"], batch_size)
+
+    def _pad_kwargs(self):
+        return {"return_tensors": "np"}
+
+    def _forward(self, features):
+        feeds = {name: np.asarray(features[name], dtype="int64")
+                 for name in self.input_names if name in features}
+        hidden = self.session.run(None, feeds)[0]
+        vecs = _pool(hidden, feeds["attention_mask"], self.meta["pooling"])
+        if self.meta.get("normalize"):
+            vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        return vecs.astype("float32")
+
+
+# ------------------------------------------------------------
+# Embedder 진입점
+# ------------------------------------------------------------
+def load_local_encoder(hf_name, accel=None, threads=None, batch_size=None):
+    """encode(texts) → (n, dim) 를 가진 로컬 모델. accel=None 이면 SKYSHIELD_LOCAL_ACCEL."""
+    accel = accel or LOCAL_ACCEL
+    threads = LOCAL_THREADS if threads is None else int(threads)
+    batch_size = batch_size or LOCAL_BATCH
+    if accel not in ACCEL_MODES:
+        raise ValueError(f"지원하지 않는 로컬 가속 방식입니다: {accel} (가능: {', '.join(ACCEL_MODES)})")
+
+    if accel == "none":
+        _set_torch_threads(threads)
+        return registry.get("sentence-transformers")(hf_name)
+    if accel in ("fp32", "int8"):
+        return TorchEncoder(hf_name, quantize=accel == "int8", threads=threads, batch_size=batch_size)
+    return OnnxEncoder(onnx_dir(hf_name), quantized=accel == "onnx-int8",
+                       threads=threads, batch_size=batch_size)
+
+
+# ------------------------------------------------------------
+# export (torch + sentence-transformers 필요)
+# ------------------------------------------------------------
+def export_onnx(hf_name, out_dir=None, quantize=False, opset=17):
+    torch = registry.get("torch")
+    st_models = registry.get("sentence-transformers-models")
+    model = registry.get("sentence-transformers")(hf_name, device="cpu")
+    out_dir = Path(out_dir or onnx_dir(hf_name))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    pooling, normalize = None, False
+    for module in list(model)[1:]:
+        if isinstance(module, st_models.Pooling):
+            pooling = module.get_pooling_mode_str()
+        elif isinstance(module, st_models.Normalize):
+            normalize = True
+        else:
+            raise RuntimeError(f"ONNX export 가 지원하지 않는 모듈입니다: {type(module).__name__}")
+    if pooling not in ("mean", "cls", "max"):
+        raise RuntimeError(f"ONNX export 가 지원하지 않는 pooling 입니다: {pooling}")
+
+    transformer = model[0].auto_model.eval()
+    transformer.config.return_dict = False
+    sample = model.tokenizer(["SkyShield ONNX export"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "seq"} for n in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    with torch.inference_mode():
+        torch.onnx.export(
+            transformer, tuple(sample[n] for n in input_names), str(out_dir / "model.onnx"),
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic, opset_version=opset,
+        )
+    model.tokenizer.save_pretrained(str(out_dir))
+
+    if quantize:
+        quantization = registry.get("onnx-quantization")
+        quantization.quantize_dynamic(str(out_dir / "model.onnx"), str(out_dir / "model.int8.onnx"),
+                                      weight_type=quantization.QuantType.QInt8)
+
+    meta = {"hf_name": hf_name, "pooling": pooling, "normalize": normalize,
+            "max_length": int(model.max_seq_length), "opset": opset, "quantized": bool(quantize)}
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return out_dir
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, required=True, help="HF 모델 이름 (예: BAAI/bge-m3)")
+    parser.add_argument("--out-dir", type=str, default=None)
+    parser.add_argument("--quantize", action="store_true", help="model.int8.onnx 도 함께 생성")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    print(export_onnx(args.model, args.out_dir, quantize=args.quantize, opset=args.opset))
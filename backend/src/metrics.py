@@ -0,0 +1,211 @@
+"""
+분석 파이프라인 계측 (Prometheus text format + Server-Timing).
+
+    with timer.stage("embed"):          # 단계별 시간 → 히스토그램 + Server-Timing
+        ...
+    DECISIONS.inc(embed_model, "BLOCK") # 모델별 판정 수
+
+GET /metrics 는 METRICS.render() 결과를 그대로 반환한다.
+캐시 적중률처럼 다른 모듈이 이미 세고 있는 값은 register_collector 로
+scrape 시점에만 읽어 오므로 요청 경로에는 비용이 없다.
+외부 의존성(prometheus_client) 없이 lock + dict 갱신만 한다.
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# 단계별 지연 (초) 버킷: 0.5ms ~ 30s
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _label_str(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _label_str(self.labelnames, k), v) for k, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, *labels, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+
+        out = []
+        for labels, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lbl = _label_str(self.labelnames + ("le",), labels + (repr(float(bound)),))
+                out.append((f"{self.name}_bucket", lbl, cumulative))
+            lbl = _label_str(self.labelnames + ("le",), labels + ("+Inf",))
+            out.append((f"{self.name}_bucket", lbl, row[-1]))
+            out.append((f"{self.name}_sum", _label_str(self.labelnames, labels), row[-2]))
+            out.append((f"{self.name}_count", _label_str(self.labelnames, labels), row[-1]))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn):
+        """
+        fn() → [(name, kind, help, labelnames, [(label_values, value), ...]), ...]
+        scrape 때마다 호출 (캐시 통계 등 다른 곳에서 이미 세는 값).
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+
+        for fn in self._collectors:
+            for name, kind, help, labelnames, rows in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in rows:
+                    lines.append(f"{name}{_label_str(labelnames, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+STAGE_SECONDS = METRICS.histogram(
+    "skyshield_stage_seconds", "Per-stage duration of the analysis pipeline",
+    labelnames=("endpoint", "stage"),
+)
+REQUESTS = METRICS.counter(
+    "skyshield_requests_total", "Analysis requests by endpoint and embedding model",
+    labelnames=("endpoint", "embed_model"),
+)
+DECISIONS = METRICS.counter(
+    "skyshield_decisions_total", "Final decisions by embedding model",
+    labelnames=("embed_model", "decision"),
+)
+EMBED_BATCH_SIZE = METRICS.histogram(
+    "skyshield_embed_batch_size", "Texts per micro-batched embedding call",
+    labelnames=("embed_model",), buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+EMBED_QUEUE_SECONDS = METRICS.histogram(
+    "skyshield_embed_queue_seconds", "Time a text waited in the micro-batch queue before dispatch",
+    labelnames=("embed_model",),
+)
+TIER_DECISIONS = METRICS.counter(
+    "skyshield_tier_total", "pipeline_mode=tiered requests by the tier that produced the summary",
+    labelnames=("embed_model", "tier"),
+)
+
+
+# ------------------------------------------------------------
+# 요청 단위 타이머
+# ------------------------------------------------------------
+class StageTimer:
+    """
+    요청 하나의 단계별 시간을 재서 히스토그램에 기록하고
+    Server-Timing 헤더 값을 만든다.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.timings = []   # [(stage, seconds)]
+
+    def record(self, stage, seconds):
+        self.timings.append((stage, seconds))
+        STAGE_SECONDS.observe(self.endpoint, stage, value=seconds)
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    async def timed(self, name, awaitable):
+        """동시에 도는 코루틴(임베딩 / 요약)의 시간을 각각 잰다."""
+        t0 = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def server_timing(self):
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.timings)
+
+
+def parse_server_timing(header):
+    """'embed;dur=12.3, summary;dur=4.5' → {"embed": 12.3, "summary": 4.5} (ms)."""
+    out = {}
+    for part in (header or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]:
+            continue
+        for field in fields[1:]:
+            if field.startswith("dur="):
+                out[fields[0]] = out.get(fields[0], 0.0) + float(field[4:])
+    return out
@@ -0,0 +1,190 @@
+"""
+precompute 때 한 번 학습한 UMAP 2D 투영 (시각화용).
+
+precomputed/projection/umap_{embed}/
+    meta.json           모델, 샘플 수, n_neighbors, 좌표 범위(bounds)
+    vectors.npy         투영에 쓴 공격 / 정상 샘플 벡터 (정규화, float32)
+    coords.npy          샘플별 2D 좌표 (UMAP fit_transform 결과)
+    kinds.npy           샘플 종류 (0 = 공격, 1 = 정상)
+    center_ids.npy      클러스터 id
+    center_coords.npy   클러스터 중심의 2D 좌표 (reducer.transform)
+    reducer.pkl         학습된 umap.UMAP (오프라인 분석용, 서빙에서는 읽지 않음)
+
+서빙 시 새 입력은 umap 을 import 하지 않고 numpy 로만 투영한다.
+umap.UMAP.transform 의 초기 배치와 같은 규칙:
+    1) 샘플 벡터 중 코사인 최근접 n_neighbors 개 (GEMV 1회)
+    2) smooth_knn_dist 로 이웃별 membership 가중치 (sum = log2(k) 가 되는 sigma 이분 탐색)
+    3) 이웃 2D 좌표의 가중 평균 (같은 벡터가 있으면 그 좌표)
+UMAP 의 transform 후 SGD 미세 조정은 생략하므로 수 ms 안에 끝난다.
+"""
+
+import json
+import time
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+from .index import l2_normalize
+from .registry import registry
+
+KIND_NAMES = ("공격", "정상")
+ATTACK, NORMAL = 0, 1
+
+
+def _smooth_knn_weights(dists, n_iter=64, tol=1e-5):
+    """
+    umap.umap_.smooth_knn_dist (transform 용, local_connectivity=0 → rho=0) 의 벡터판.
+    반환: (n, k) membership 가중치.
+    """
+    n, k = dists.shape
+    target = np.log2(k)
+    lo = np.zeros(n)
+    hi = np.full(n, np.inf)
+    mid = np.ones(n)
+
+    for _ in range(n_iter):
+        psum = np.exp(-dists / mid[:, None]).sum(axis=1)
+        if np.all(np.abs(psum - target) < tol):
+            break
+        too_big = psum > target
+        hi = np.where(too_big, mid, hi)
+        lo = np.where(too_big, lo, mid)
+        mid = np.where(np.isinf(hi), mid * 2, (lo + hi) / 2)
+
+    # umap 과 같이 sigma 하한 (평균 거리의 1e-3 배)
+    mid = np.maximum(mid, 1e-3 * dists.mean(axis=1))
+    return np.exp(-dists / np.maximum(mid, 1e-12)[:, None])
+
+
+class Projection2D:
+    def __init__(self, vectors, coords, kinds, center_ids=None, center_coords=None,
+                 n_neighbors=15, bounds=None, meta=None):
+        self.vectors = vectors                      # (N, dim) 정규화
+        self.coords = coords                        # (N, 2)
+        self.kinds = kinds                          # (N,)
+        self.center_ids = np.asarray(center_ids if center_ids is not None else [], dtype="int64")
+        self.center_coords = (np.asarray(center_coords, dtype="float32") if center_coords is not None
+                              else np.empty((0, 2), dtype="float32"))
+        self.n_neighbors = int(n_neighbors)
+        self.meta = meta or {}
+        if bounds is None:
+            lo, hi = np.asarray(coords).min(axis=0), np.asarray(coords).max(axis=0)
+            bounds = [float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])]
+        self.bounds = bounds
+
+    def __len__(self):
+        return int(self.vectors.shape[0])
+
+    # --------------------------------------------------------
+    # 새 입력 → 2D
+    # --------------------------------------------------------
+    def transform(self, vecs):
+        q = l2_normalize(vecs)
+        k = min(self.n_neighbors, len(self))
+        sims = q @ self.vectors.T
+        idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        near = np.take_along_axis(sims, idx, axis=1)
+        dists = np.maximum(1.0 - near, 0.0).astype("float64")
+
+        weights = _smooth_knn_weights(dists)
+        weights /= weights.sum(axis=1, keepdims=True)
+        out = np.einsum("nk,nkd->nd", weights, np.asarray(self.coords)[idx])
+
+        # 학습 샘플과 같은 벡터면 그 좌표 그대로
+        exact = dists.min(axis=1) <= 1e-6
+        if exact.any():
+            first = idx[np.arange(len(q)), dists.argmin(axis=1)]
+            out[exact] = np.asarray(self.coords)[first[exact]]
+        return out.astype("float32")
+
+    def scale(self, coords, lo=0.0, hi=100.0, margin=0.05):
+        """좌표를 bounds 기준 [lo, hi] 로 선형 변환 (프론트 차트 축 고정용)."""
+        x0, y0, x1, y1 = self.bounds
+        span = np.array([max(x1 - x0, 1e-12), max(y1 - y0, 1e-12)])
+        unit = (np.asarray(coords, dtype="float64") - np.array([x0, y0])) / span
+        unit = margin + unit * (1 - 2 * margin)
+        return np.clip(lo + unit * (hi - lo), lo, hi)
+
+    # --------------------------------------------------------
+    # 저장 / 로드
+    # --------------------------------------------------------
+    def save(self, out_dir, reducer=None):
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "vectors": np.ascontiguousarray(self.vectors, dtype="float32"),
+            "coords": np.ascontiguousarray(self.coords, dtype="float32"),
+            "kinds": np.asarray(self.kinds, dtype="int8"),
+            "center_ids": self.center_ids,
+            "center_coords": self.center_coords,
+        }
+        for name, arr in arrays.items():
+            np.save(out_dir / f"{name}.npy", arr)
+        if reducer is not None:
+            with open(out_dir / "reducer.pkl", "wb") as f:
+                pickle.dump(reducer, f)
+
+        meta = {
+            **self.meta,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "n_attacks": int((arrays["kinds"] == ATTACK).sum()),
+            "n_normals": int((arrays["kinds"] == NORMAL).sum()),
+            "dim": int(arrays["vectors"].shape[1]),
+            "n_neighbors": self.n_neighbors,
+            "bounds": self.bounds,
+        }
+        # meta.json 은 마지막에 기록 → meta 가 있으면 번들이 완성된 것
+        tmp = out_dir / "meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        tmp.replace(out_dir / "meta.json")
+        return out_dir
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        path = Path(path)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arr = lambda name: np.load(path / f"{name}.npy", mmap_mode=mode)
+        return cls(arr("vectors"), np.asarray(arr("coords")), np.asarray(arr("kinds")),
+                   center_ids=np.asarray(arr("center_ids")),
+                   center_coords=np.asarray(arr("center_coords")),
+                   n_neighbors=meta["n_neighbors"], bounds=meta["bounds"], meta=meta)
+
+
+# ------------------------------------------------------------
+# precompute: UMAP 학습 (umap 은 여기서만 import)
+# ------------------------------------------------------------
+def fit_projection(atk_vec, norm_vec=None, centers=None, center_ids=None,
+                   n_attacks=1500, n_normals=1500, n_neighbors=15, seed=42):
+    """
+    공격 / 정상 샘플로 UMAP(metric=cosine) 을 한 번 학습.
+    norm_vec 은 memmap 가능 (무작위 행만 읽음). 반환: (Projection2D, reducer)
+    """
+    UMAP = registry.get("umap")
+    rng = np.random.default_rng(seed)
+
+    def sample(vecs, n):
+        if vecs is None or n <= 0 or vecs.shape[0] == 0:
+            return np.empty((0, atk_vec.shape[1]), dtype="float32")
+        rows = np.sort(rng.choice(vecs.shape[0], min(n, vecs.shape[0]), replace=False))
+        return np.asarray(vecs[rows], dtype="float32")
+
+    atk_s = sample(atk_vec, n_attacks)
+    norm_s = sample(norm_vec, n_normals)
+    vectors = l2_normalize(np.vstack([atk_s, norm_s]))
+    kinds = np.array([ATTACK] * len(atk_s) + [NORMAL] * len(norm_s), dtype="int8")
+
+    reducer = UMAP(metric="cosine", n_neighbors=n_neighbors, random_state=seed)
+    coords = reducer.fit_transform(vectors).astype("float32")
+
+    center_coords = None
+    if centers is not None and len(centers):
+        center_coords = reducer.transform(l2_normalize(centers)).astype("float32")
+
+    projection = Projection2D(vectors, coords, kinds, center_ids=center_ids,
+                              center_coords=center_coords, n_neighbors=n_neighbors,
+                              meta={"method": "umap", "metric": "cosine", "seed": seed})
+    return projection, reducer
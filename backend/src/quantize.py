@@ -0,0 +1,342 @@
+"""
+벡터 저장소 압축 (양자화) + 압축 코드 위에서 직접 유사도 계산.
+
+- fp16 : float16 (2배 압축)
+- int8 : 차원별 scale 을 쓰는 대칭 scalar int8 (4배 압축)
+- pq   : product quantization, 부분공간 m 개 × 256 centroid, 코드 uint8 (dim*4/m 배 압축)
+
+모든 코덱은 L2 정규화된 벡터를 압축하므로 내적 = 코사인 유사도 근사.
+QuantizedIndex 는 FlatIndex 와 같은 인터페이스(search / max_similarity)를 가지며,
+rerank_vectors 가 주어지면 근사 상위 rerank_k 후보만 float32 로 다시 계산한다.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .index import INDEX_FORMAT_VERSION, l2_normalize, chunked_topk, _topk, _write_meta
+
+
+# ------------------------------------------------------------
+# 코덱
+# ------------------------------------------------------------
+class Float16Codec:
+    name = "fp16"
+    code_dtype = "float16"
+
+    def fit(self, vecs, chunk_rows=65_536):
+        return self
+
+    def code_width(self, dim):
+        return dim
+
+    def encode(self, vecs):
+        return l2_normalize(vecs).astype("float16")
+
+    def score(self, q, codes):
+        """q: 정규화된 질의 (n, dim), codes: (N, dim) → (n, N)"""
+        return q @ np.asarray(codes, dtype="float32").T
+
+    def params(self):
+        return {}
+
+    def save(self, path: Path):
+        pass
+
+    @classmethod
+    def load(cls, path: Path, meta: dict):
+        return cls()
+
+
+class Int8Codec:
+    name = "int8"
+    code_dtype = "int8"
+
+    def __init__(self, scale=None):
+        self.scale = scale  # (dim,) 차원별 scale
+
+    def fit(self, vecs, chunk_rows=65_536):
+        # 차원별 최대 절댓값 → [-127, 127] 로 매핑 (chunk 단위로 전체를 훑음)
+        max_abs = None
+        for i in range(0, vecs.shape[0], chunk_rows):
+            chunk_max = np.abs(l2_normalize(vecs[i:i + chunk_rows])).max(axis=0)
+            max_abs = chunk_max if max_abs is None else np.maximum(max_abs, chunk_max)
+        self.scale = (np.maximum(max_abs, 1e-8) / 127.0).astype("float32")
+        return self
+
+    def code_width(self, dim):
+        return dim
+
+    def encode(self, vecs):
+        x = l2_normalize(vecs) / self.scale
+        return np.clip(np.rint(x), -127, 127).astype("int8")
+
+    def score(self, q, codes):
+        return (q * self.scale) @ np.asarray(codes, dtype="float32").T
+
+    def params(self):
+        return {}
+
+    def save(self, path: Path):
+        np.save(path / "scale.npy", self.scale)
+
+    @classmethod
+    def load(cls, path: Path, meta: dict):
+        return cls(scale=np.load(path / "scale.npy"))
+
+
+def _kmeans(x, k, n_iter=15, seed=0):
+    """유클리드 k-means (PQ 부분공간 학습용)."""
+    rng = np.random.default_rng(seed)
+    k = min(k, x.shape[0])
+    centers = x[rng.choice(x.shape[0], k, replace=False)].copy()
+    for _ in range(n_iter):
+        d = (x ** 2).sum(1, keepdims=True) - 2 * x @ centers.T + (centers ** 2).sum(1)
+        assign = np.argmin(d, axis=1)
+        for c in range(k):
+            members = x[assign == c]
+            centers[c] = members.mean(axis=0) if len(members) else x[rng.integers(x.shape[0])]
+    return centers
+
+
+class PQCodec:
+    name = "pq"
+    code_dtype = "uint8"
+
+    def __init__(self, m=None, centroids=None, n_iter=15, train_size=20_000, seed=0):
+        self.m = m                  # 부분공간 개수
+        self.centroids = centroids  # (m, ks, dsub)
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+
+    def fit(self, vecs, chunk_rows=65_536):
+        n, dim = vecs.shape
+        if self.m is None:
+            # 부분공간당 8 차원 (3072 → 384 byte/벡터, 32배 압축)
+            self.m = max(1, dim // 8)
+        if dim % self.m != 0:
+            raise ValueError(f"PQ 부분공간 수 m={self.m} 가 차원 {dim} 을 나누지 못합니다.")
+
+        rng = np.random.default_rng(self.seed)
+        rows = np.sort(rng.choice(n, min(n, self.train_size), replace=False))
+        train = l2_normalize(vecs[rows])
+
+        dsub = dim // self.m
+        self.centroids = np.stack([
+            _kmeans(train[:, j * dsub:(j + 1) * dsub], 256, n_iter=self.n_iter, seed=self.seed + j)
+            for j in range(self.m)
+        ]).astype("float32")
+        return self
+
+    def code_width(self, dim):
+        return self.m
+
+    def encode(self, vecs):
+        x = l2_normalize(vecs)
+        dsub = self.centroids.shape[2]
+        codes = np.empty((x.shape[0], self.m), dtype="uint8")
+        for j in range(self.m):
+            sub = x[:, j * dsub:(j + 1) * dsub]
+            c = self.centroids[j]
+            d = (sub ** 2).sum(1, keepdims=True) - 2 * sub @ c.T + (c ** 2).sum(1)
+            codes[:, j] = np.argmin(d, axis=1)
+        return codes
+
+    def score(self, q, codes):
+        # ADC: 질의-centroid 내적 테이블 (n, m, ks) 을 만든 뒤 코드로 조회해 합산
+        dsub = self.centroids.shape[2]
+        q_sub = q.reshape(q.shape[0], self.m, dsub)
+        lut = np.einsum("nmd,mkd->nmk", q_sub, self.centroids)
+        codes = np.asarray(codes)
+        sims = np.zeros((q.shape[0], codes.shape[0]), dtype="float32")
+        for j in range(self.m):
+            sims += lut[:, j, codes[:, j]]
+        return sims
+
+    def params(self):
+        return {"m": int(self.m)}
+
+    def save(self, path: Path):
+        np.save(path / "pq_centroids.npy", self.centroids)
+
+    @classmethod
+    def load(cls, path: Path, meta: dict):
+        return cls(m=meta["m"], centroids=np.load(path / "pq_centroids.npy"))
+
+
+CODECS = {
+    Float16Codec.name: Float16Codec,
+    Int8Codec.name: Int8Codec,
+    PQCodec.name: PQCodec,
+}
+
+
+def make_codec(kind, **kwargs):
+    if kind not in CODECS:
+        raise ValueError(f"Unsupported quantization: {kind}")
+    if kind == PQCodec.name:
+        return PQCodec(**kwargs)
+    return CODECS[kind]()
+
+
+# ------------------------------------------------------------
+# 압축 코드 인덱스
+# ------------------------------------------------------------
+class QuantizedIndex:
+    def __init__(self, codec, codes, rerank_vectors=None, rerank_k=0, chunk_rows=65_536):
+        self.codec = codec
+        self.codes = codes
+        self.rerank_vectors = rerank_vectors  # 원본 float32 벡터 (memmap 가능)
+        self.rerank_k = int(rerank_k)
+        self.chunk_rows = chunk_rows
+
+    @property
+    def kind(self):
+        return self.codec.name
+
+    def __len__(self):
+        return int(self.codes.shape[0])
+
+    @property
+    def nbytes(self):
+        return int(self.codes.nbytes)
+
+    @classmethod
+    def build(cls, kind, vectors, **codec_kwargs):
+        codec = make_codec(kind, **codec_kwargs).fit(vectors)
+        return cls(codec, codec.encode(vectors))
+
+    def approx_similarities(self, queries, start=0, end=None):
+        return self.codec.score(l2_normalize(queries), self.codes[start:end])
+
+    def search(self, queries, k=1):
+        q = l2_normalize(queries)
+        use_rerank = self.rerank_vectors is not None and self.rerank_k > 0
+        n_cand = max(k, self.rerank_k) if use_rerank else k
+
+        sims, ids = chunked_topk(
+            lambda s, e: self.codec.score(q, self.codes[s:e]),
+            len(self), q.shape[0], n_cand, chunk_rows=self.chunk_rows,
+        )
+        if not use_rerank:
+            return sims, ids
+
+        # 근사 상위 후보만 원본 벡터로 정확히 재계산
+        out_sims = np.empty((q.shape[0], min(k, ids.shape[1])), dtype="float32")
+        out_ids = np.empty_like(out_sims, dtype="int64")
+        for i in range(q.shape[0]):
+            cand = ids[i]
+            order = np.argsort(cand)  # memmap 은 정렬된 행 순서로 읽는 편이 빠름
+            exact = l2_normalize(self.rerank_vectors[cand[order]]) @ q[i]
+            top_sims, pos = _topk(exact[None, :], k)
+            out_sims[i] = top_sims[0]
+            out_ids[i] = cand[order][pos[0]]
+        return out_sims, out_ids
+
+    def max_similarity(self, queries):
+        sims, _ = self.search(queries, k=1)
+        if sims.shape[1] == 0:
+            return np.full(sims.shape[0], -1.0, dtype="float32")
+        return sims[:, 0]
+
+    def add(self, vectors):
+        """기존 codec (scale / PQ codebook) 으로 새 벡터를 인코딩해 뒤에 붙인다."""
+        codes = np.concatenate([self.codes, self.codec.encode(vectors)])
+        return QuantizedIndex(self.codec, codes, chunk_rows=self.chunk_rows)
+
+    # --------------------------------------------------------
+    # 저장 / 로드
+    # --------------------------------------------------------
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "codes.npy", np.ascontiguousarray(self.codes))
+        self.codec.save(path)
+        _write_meta(path, {
+            "format_version": INDEX_FORMAT_VERSION,
+            "kind": self.kind,
+            "n": len(self),
+            "dim": int(self._dim()),
+            **self.codec.params(),
+        })
+        return path
+
+    def _dim(self):
+        if isinstance(self.codec, PQCodec):
+            return self.codec.m * self.codec.centroids.shape[2]
+        return self.codes.shape[1]
+
+    @classmethod
+    def load(cls, path, mmap=True, rerank_vectors=None, rerank_k=0):
+        path = Path(path)
+        meta = json.load(open(path / "meta.json", encoding="utf-8"))
+        codec = CODECS[meta["kind"]].load(path, meta)
+        codes = np.load(path / "codes.npy", mmap_mode="r" if mmap else None)
+        return cls(codec, codes, rerank_vectors=rerank_vectors, rerank_k=rerank_k)
+
+
+def write_quantized_store(kind, vectors, path, chunk_rows=65_536, **codec_kwargs):
+    """
+    큰 벡터 집합 (예: 정상 벡터 memmap) 을 chunk 단위로 압축해 디스크에 저장.
+    코드 배열은 open_memmap 으로 직접 기록하므로 원본 전체를 메모리에 올리지 않는다.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    n, dim = vectors.shape
+    codec = make_codec(kind, **codec_kwargs).fit(vectors, chunk_rows=chunk_rows)
+    codes = np.lib.format.open_memmap(
+        path / "codes.npy", mode="w+", dtype=codec.code_dtype, shape=(n, codec.code_width(dim))
+    )
+    for i in range(0, n, chunk_rows):
+        codes[i:i + chunk_rows] = codec.encode(vectors[i:i + chunk_rows])
+    codes.flush()
+
+    codec.save(path)
+    _write_meta(path, {
+        "format_version": INDEX_FORMAT_VERSION,
+        "kind": kind,
+        "n": int(n),
+        "dim": int(dim),
+        **codec.params(),
+    })
+    del codes
+    return QuantizedIndex.load(path)
+
+
+# ------------------------------------------------------------
+# 판정 drift 리포트
+# ------------------------------------------------------------
+def drift_report(quantized, exact, queries, exact_nbytes, thresholds=(0.3, 0.4, 0.5, 0.6, 0.7)):
+    """
+    압축 인덱스 vs 원본(exact) 인덱스의 최대 유사도 / SkyShield 판정 차이.
+    - score_abs_err_* : 최대 유사도 절대 오차
+    - decision_flip_rate[thr] : BLOCK/REVIEW/ALLOW 판정이 바뀐 질의 비율
+    """
+    from .detector import SkyShield
+
+    approx = quantized.max_similarity(queries)
+    ref = exact.max_similarity(queries)
+    err = np.abs(approx - ref)
+
+    flips = {}
+    for thr in thresholds:
+        changed = [
+            SkyShield._decide(float(a), thr) != SkyShield._decide(float(r), thr)
+            for a, r in zip(approx, ref)
+        ]
+        flips[str(thr)] = float(np.mean(changed)) if changed else 0.0
+
+    return {
+        "kind": quantized.kind,
+        "rerank_k": quantized.rerank_k if quantized.rerank_vectors is not None else 0,
+        "n_queries": int(len(queries)),
+        "bytes": quantized.nbytes,
+        "exact_bytes": int(exact_nbytes),
+        "compression": float(exact_nbytes / max(quantized.nbytes, 1)),
+        "score_abs_err_mean": float(err.mean()) if len(err) else 0.0,
+        "score_abs_err_max": float(err.max()) if len(err) else 0.0,
+        "decision_flip_rate": flips,
+    }
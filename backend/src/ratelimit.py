@@ -0,0 +1,60 @@
+"""
+API 호출용 rate limit + 재시도 유틸 (precompute 용).
+
+- TokenBucket      : 초당 rate 만큼 토큰이 차는 버킷. acquire(n) 은 토큰이 찰 때까지 대기
+- call_with_retry  : 지수 backoff + jitter 재시도
+"""
+
+import time
+import random
+import threading
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, capacity: float | None = None):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(capacity if capacity is not None else max(rate_per_sec, 1.0))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float):
+        """분당 limit (RPM / TPM). 0 이하면 None (제한 없음)."""
+        if not limit or limit <= 0:
+            return None
+        return cls(rate_per_sec=limit / 60.0, capacity=limit)
+
+    def acquire(self, n: float = 1.0):
+        # 버킷 용량보다 큰 요청은 용량만큼만 기다린다 (영원히 대기하지 않도록)
+        n = min(float(n), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retry(fn, *args, max_retries=6, base_delay=1.0, max_delay=60.0, on_retry=None):
+    """
+    fn(*args) 를 호출하고 실패 시 지수 backoff (+/- 50% jitter) 로 재시도.
+    max_retries 를 넘기면 마지막 예외를 그대로 올린다.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.5)
+            if on_retry is not None:
+                on_retry(attempt + 1, delay, e)
+            time.sleep(delay)
+            attempt += 1
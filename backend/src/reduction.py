@@ -0,0 +1,135 @@
+"""
+축소 차원 임베딩 모드.
+
+모델 이름 뒤에 "@차원" 을 붙이면 저장 벡터와 질의 벡터 모두 같은 방식으로 축소된다.
+
+    "OpenAI Embedding@256"     truncate : 앞 256 차원만 남기고 L2 재정규화.
+                                          OpenAI 는 API 의 dimensions 파라미터로 바로 받는다
+                                          (text-embedding-3-* 의 shortened embedding 과 동일).
+    "OpenAI Embedding@pca256"  pca      : precompute 때 전체 차원 벡터로 학습한 PCA 로 투영 후
+                                          L2 재정규화. 투영 행렬은
+                                          precomputed/vectors/reduction_{model}.npz 에 저장.
+
+축소 모델 이름은 그대로 파일명 / 캐시 키가 되므로 (attack_OpenAI_Embedding@256.npy ...)
+전체 차원 데이터와 섞이지 않는다.
+truncate 는 Matryoshka 방식으로 학습된 모델(text-embedding-3-*)에서만 의미가 있다.
+"""
+
+import re
+
+import numpy as np
+
+from .index import l2_normalize
+
+REDUCTION_SEP = "@"
+_SPEC = re.compile(r"^(pca)?(\d+)$")
+
+
+class Reduction:
+    def __init__(self, kind, dim, mean=None, components=None):
+        if kind not in ("truncate", "pca"):
+            raise ValueError(f"지원하지 않는 축소 방식입니다: {kind}")
+        self.kind = kind
+        self.dim = int(dim)
+        self.mean = mean                # pca: (source_dim,)
+        self.components = components    # pca: (dim, source_dim)
+
+    @property
+    def name(self):
+        return f"pca{self.dim}" if self.kind == "pca" else str(self.dim)
+
+    @property
+    def fitted(self):
+        return self.kind == "truncate" or self.components is not None
+
+    @property
+    def source_dim(self):
+        return None if self.components is None else int(self.components.shape[1])
+
+    def describe(self):
+        """메타데이터(meta.json / manifest)에 기록할 정보."""
+        info = {"kind": self.kind, "dim": self.dim}
+        if self.kind == "pca":
+            info["source_dim"] = self.source_dim
+        return info
+
+    def apply(self, vecs):
+        """(n, source_dim) → (n, dim), 행 단위 L2 정규화."""
+        vecs = np.asarray(vecs, dtype="float32")
+        if vecs.ndim == 1:
+            vecs = vecs[None, :]
+        if vecs.shape[0] == 0:
+            return np.empty((0, self.dim), dtype="float32")
+
+        if self.kind == "truncate":
+            if vecs.shape[1] < self.dim:
+                raise RuntimeError(f"임베딩 차원({vecs.shape[1]})이 축소 차원({self.dim})보다 작습니다.")
+            return l2_normalize(vecs[:, :self.dim])
+
+        if self.components is None:
+            raise RuntimeError("PCA 투영 행렬이 없습니다. precompute_jailbreak.py 로 먼저 학습하세요.")
+        if vecs.shape[1] != self.source_dim:
+            raise RuntimeError(f"임베딩 차원({vecs.shape[1]})이 PCA 입력 차원({self.source_dim})과 다릅니다.")
+        return l2_normalize((vecs - self.mean) @ self.components.T)
+
+    # --------------------------------------------------------
+    # 저장 / 로드 (pca 만 파일이 필요)
+    # --------------------------------------------------------
+    def save(self, path):
+        np.savez(path, kind=self.kind, dim=self.dim,
+                 mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(str(f["kind"]), int(f["dim"]),
+                       mean=f["mean"].astype("float32"),
+                       components=f["components"].astype("float32"))
+
+
+def parse_model_name(model_name: str):
+    """
+    "OpenAI Embedding@pca256" → ("OpenAI Embedding", Reduction("pca", 256), 미학습)
+    "OpenAI Embedding"        → ("OpenAI Embedding", None)
+    """
+    base, sep, spec = model_name.rpartition(REDUCTION_SEP)
+    if not sep:
+        return model_name, None
+    m = _SPEC.match(spec.strip().lower())
+    if not m or int(m.group(2)) <= 0:
+        raise ValueError(f"축소 차원 표기가 올바르지 않습니다: {model_name} (예: @256, @pca256)")
+    return base, Reduction("pca" if m.group(1) else "truncate", int(m.group(2)))
+
+
+def fit_pca(chunks, dim):
+    """
+    전체 차원 벡터 chunk 들(memmap 슬라이스 등)을 한 번 훑어 공분산을 누적한 뒤
+    상위 dim 개 주성분을 구한다. 메모리는 (source_dim, source_dim) 하나.
+    """
+    total, sums, gram = 0, None, None
+    for chunk in chunks:
+        x = np.asarray(chunk, dtype="float64")
+        if x.shape[0] == 0:
+            continue
+        if sums is None:
+            sums = np.zeros(x.shape[1])
+            gram = np.zeros((x.shape[1], x.shape[1]))
+        total += x.shape[0]
+        sums += x.sum(axis=0)
+        gram += x.T @ x
+
+    if total == 0:
+        raise RuntimeError("PCA 를 학습할 벡터가 없습니다.")
+    if dim > gram.shape[0]:
+        raise RuntimeError(f"축소 차원({dim})이 원래 차원({gram.shape[0]})보다 큽니다.")
+
+    mean = sums / total
+    cov = gram / total - np.outer(mean, mean)
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    order = np.argsort(eigvals)[::-1][:dim]
+    components = eigvecs[:, order].T
+
+    reduction = Reduction("pca", dim, mean=mean.astype("float32"),
+                          components=np.ascontiguousarray(components, dtype="float32"))
+    reduction.explained_variance = float(eigvals[order].sum() / max(eigvals.sum(), 1e-12))
+    return reduction
@@ -0,0 +1,119 @@
+"""
+무거운 백엔드 라이브러리의 지연(lazy) import 레지스트리.
+
+main.py 를 import 하는 것만으로 torch(sentence-transformers), hdbscan/numba,
+openai / mistralai SDK 가 모두 올라오지 않도록, 각 백엔드는
+처음 실제로 쓰일 때 registry.get(name) 으로 import 한다.
+
+    python -m src.registry      # 백엔드별 import 시간 / 메모리 리포트
+"""
+
+import sys
+import time
+import resource
+import importlib
+import threading
+
+
+class BackendRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._specs = {}     # name -> (module, attr)
+        self._loaded = {}    # name -> object
+        self._report = {}    # name -> {"module", "import_seconds", "error"}
+
+    def register(self, name, module, attr=None):
+        self._specs[name] = (module, attr)
+
+    def get(self, name, required=True):
+        """
+        백엔드 객체(클래스/모듈)를 반환. 처음 호출 시에만 import.
+        required=False 면 패키지가 없을 때 None.
+        """
+        obj = self._loaded.get(name)
+        if obj is not None:
+            return obj
+
+        module_name, attr = self._specs[name]
+        with self._lock:
+            if name in self._loaded:
+                return self._loaded[name]
+
+            t0 = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+                obj = getattr(module, attr) if attr else module
+            except ImportError as e:
+                self._report[name] = {
+                    "module": module_name,
+                    "import_seconds": round(time.perf_counter() - t0, 4),
+                    "error": str(e),
+                }
+                if required:
+                    raise RuntimeError(
+                        f"'{module_name}' 패키지가 설치되어 있지 않습니다. ({name} 백엔드)"
+                    ) from e
+                return None
+
+            self._report[name] = {
+                "module": module_name,
+                "import_seconds": round(time.perf_counter() - t0, 4),
+                "error": None,
+            }
+            self._loaded[name] = obj
+            return obj
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def report(self):
+        """백엔드별 import 여부 / 소요 시간 + 현재 프로세스 최대 RSS."""
+        backends = {}
+        for name, (module_name, _) in self._specs.items():
+            entry = self._report.get(name)
+            backends[name] = {
+                "module": module_name,
+                "loaded": name in self._loaded,
+                "import_seconds": entry["import_seconds"] if entry else None,
+                "error": entry["error"] if entry else None,
+            }
+
+        # Linux 는 KB, macOS 는 byte 단위
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        scale = 1 if sys.platform == "darwin" else 1024
+        return {
+            "backends": backends,
+            "max_rss_mb": round(max_rss * scale / (1024 * 1024), 1),
+        }
+
+
+registry = BackendRegistry()
+
+# 임베딩 백엔드
+registry.register("sentence-transformers", "sentence_transformers", "SentenceTransformer")
+registry.register("sentence-transformers-models", "sentence_transformers.models")
+# 로컬 모델 CPU 가속 (src/local_accel.py, SKYSHIELD_LOCAL_ACCEL 을 켤 때만)
+registry.register("torch", "torch")
+registry.register("onnxruntime", "onnxruntime")
+registry.register("onnx-quantization", "onnxruntime.quantization")
+registry.register("transformers-tokenizer", "transformers", "AutoTokenizer")
+# API SDK (임베딩 + 요약 공용)
+registry.register("openai", "openai", "OpenAI")
+registry.register("openai-async", "openai", "AsyncOpenAI")
+registry.register("mistral", "mistralai", "Mistral")
+registry.register("deepseek", "deepseek", "DeepSeek")
+# 클러스터링 / 시각화 스택 (precompute 전용)
+registry.register("hdbscan", "hdbscan")
+registry.register("umap", "umap.umap_", "UMAP")
+registry.register("plotly-express", "plotly.express")
+registry.register("plotly-go", "plotly.graph_objects")
+# 데이터셋 CSV 로딩
+registry.register("pandas", "pandas")
+
+
+if __name__ == "__main__":
+    import json
+
+    for name in list(registry._specs):
+        registry.get(name, required=False)
+    print(json.dumps(registry.report(), ensure_ascii=False, indent=2))
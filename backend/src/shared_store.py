@@ -0,0 +1,232 @@
+"""
+uvicorn 워커 간 공유 벡터 저장소.
+
+워커마다 np.load 로 공격 벡터 / 클러스터 배열을 복사하면 메모리가 워커 수에 비례한다.
+여기서는 모든 저장 벡터를 읽기 전용으로만 올린다.
+
+    SKYSHIELD_SHARED_STORE=off      (기본) .npy / .dat 를 읽기 전용 mmap 으로 로드.
+                                    같은 호스트의 워커는 OS page cache 를 공유한다.
+    SKYSHIELD_SHARED_STORE=vectors  공격 벡터 / flat 인덱스 / 클러스터 아티팩트 배열을
+                                    POSIX shared memory(/dev/shm) 세그먼트에 올린다.
+    SKYSHIELD_SHARED_STORE=all      정상 벡터(.dat, 수 GB 가능)까지 shared memory 에.
+
+shared memory 세그먼트는 호스트당 한 번만 만든다.
+    - 이름은 원본 파일 경로 + 크기 + mtime 해시 (편입으로 파일이 바뀌면 새 세그먼트)
+    - 파일 락(fcntl.flock) 안에서 처음 온 워커만 만들고 채운 뒤 끝에 ready 바이트를 기록,
+      나머지 워커는 같은 세그먼트를 복사 없이 붙인다 (np.ndarray(buffer=shm.buf), 쓰기 불가)
+    - 채우는 도중 죽어 ready 바이트가 없는 세그먼트는 다음 워커가 지우고 다시 만든다
+    - 워커가 종료돼도 세그먼트는 남는다 (재시작한 워커가 그대로 붙음).
+      정리: python -m src.shared_store --cleanup
+/dev/shm 이 부족하거나 POSIX 가 아닌 환경이면 경고 후 mmap 으로 대신한다.
+"""
+
+import os
+import sys
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .metrics import METRICS
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+
+SHARED_STORE_MODES = ("off", "vectors", "all")
+SHARED_STORE = os.getenv("SKYSHIELD_SHARED_STORE", "off")
+SEGMENT_PREFIX = "skyshield_"
+LOCK_DIR = Path(os.getenv("SKYSHIELD_SHARED_LOCK_DIR") or Path(tempfile.gettempdir()) / "skyshield_locks")
+
+_READY = 1
+logger = logging.getLogger(__name__)
+_SEGMENTS = {}   # segment name -> (SharedMemory, source path, file signature, created)
+
+
+def enabled(kind="vectors"):
+    """kind="vectors" 는 vectors / all, kind="normal" 은 all 일 때만."""
+    if SHARED_STORE not in SHARED_STORE_MODES:
+        raise RuntimeError(
+            f"SKYSHIELD_SHARED_STORE 값이 올바르지 않습니다: {SHARED_STORE} "
+            f"(가능: {', '.join(SHARED_STORE_MODES)})"
+        )
+    if fcntl is None or SHARED_STORE == "off":
+        return False
+    return SHARED_STORE == "all" or kind == "vectors"
+
+
+def _signature(path: Path):
+    st = path.stat()
+    return f"{path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _segment_name(key: str) -> str:
+    # macOS 의 shm 이름 제한(31자) 안에 들도록 짧은 해시
+    return SEGMENT_PREFIX + hashlib.blake2b(key.encode("utf-8"), digest_size=10).hexdigest()
+
+
+@contextmanager
+def _host_lock(name):
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_DIR / f"{name}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _open_segment(name, size=0):
+    """
+    세그먼트 열기 / 만들기. 프로세스 종료 시 resource_tracker 가 세그먼트를 지우지 않도록
+    추적에서 뺀다 (호스트 단위 수명, 3.13+ 는 track=False).
+    """
+    create = size > 0
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _view(shm, shape, dtype):
+    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    arr.flags.writeable = False
+    return arr
+
+
+def _attach_or_create(path: Path, tag, shape, dtype, fill):
+    signature = _signature(path) + (f":{tag}" if tag else "")
+    name = _segment_name(signature)
+    entry = _SEGMENTS.get(name)
+    if entry is not None:
+        return _view(entry[0], shape, dtype)
+
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with _host_lock(name):
+        created = False
+        try:
+            shm = _open_segment(name)
+            if shm.size < nbytes + 1 or shm.buf[nbytes] != _READY:
+                # 만들던 워커가 중간에 죽은 세그먼트 → 다시 만든다
+                shm.close()
+                shm.unlink()
+                raise FileNotFoundError(name)
+        except FileNotFoundError:
+            shm = _open_segment(name, size=nbytes + 1)
+            fill(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+            shm.buf[nbytes] = _READY
+            created = True
+
+    _SEGMENTS[name] = (shm, path, signature, created)
+    return _view(shm, shape, dtype)
+
+
+def _shared_or_mmap(path, tag, shape, dtype, fill, fallback):
+    try:
+        return _attach_or_create(Path(path), tag, shape, dtype, fill)
+    except OSError as e:
+        logger.warning("shared memory 사용 불가 → mmap 으로 로드: %s (%s)", path, e)
+        return fallback()
+
+
+def _copy_chunks(src, chunk_rows=65536):
+    def fill(out):
+        for start in range(0, src.shape[0], chunk_rows):
+            out[start:start + chunk_rows] = src[start:start + chunk_rows]
+    return fill
+
+
+# ------------------------------------------------------------
+# 로더
+# ------------------------------------------------------------
+def load_npy(path, kind="vectors", mmap=True):
+    """읽기 전용 .npy. shared 모드면 호스트 공용 세그먼트, 아니면 mmap (mmap=False 면 복사)."""
+    if not mmap:
+        return np.load(path)
+    src = np.load(path, mmap_mode="r")
+    if not enabled(kind) or src.ndim == 0:
+        return src
+    return _shared_or_mmap(path, None, src.shape, src.dtype, _copy_chunks(src), lambda: src)
+
+
+def load_raw(path, dtype, shape, kind="normal"):
+    """헤더 없는 float 배열 파일(정상 벡터 .dat)을 읽기 전용으로."""
+    src = np.memmap(path, dtype=dtype, mode="r", shape=tuple(shape))
+    if not enabled(kind):
+        return src
+    return _shared_or_mmap(path, None, src.shape, src.dtype, _copy_chunks(src), lambda: src)
+
+
+def load_derived(path, tag, build, kind="vectors"):
+    """
+    파일에서 계산한 배열 (예: 정규화한 공격 벡터). shared 모드면 build 는 호스트당 한 번만,
+    아니면 워커마다 build 결과를 그대로 반환한다.
+    """
+    if not enabled(kind):
+        return build(np.load(path, mmap_mode="r"))
+
+    def fill(out):
+        out[...] = build(np.load(path, mmap_mode="r"))
+
+    src = np.load(path, mmap_mode="r")
+    return _shared_or_mmap(path, tag, src.shape, "float32", fill,
+                           lambda: build(np.load(path, mmap_mode="r")))
+
+
+def prune():
+    """
+    이 프로세스가 붙인 세그먼트 중 원본 파일이 바뀐(편입 / 재학습) 것을 unlink.
+    이미 붙어 있는 다른 워커의 매핑은 유지되고, 새로 붙는 워커는 새 세그먼트를 만든다.
+    """
+    for name, (shm, path, signature, _) in list(_SEGMENTS.items()):
+        try:
+            stale = not signature.startswith(_signature(path))
+        except FileNotFoundError:
+            stale = True
+        if stale:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            del _SEGMENTS[name]
+
+
+def segments_on_host():
+    """/dev/shm 의 skyshield 세그먼트 (Linux)."""
+    root = Path("/dev/shm")
+    if not root.exists():
+        return []
+    return sorted(p for p in root.iterdir() if p.name.startswith(SEGMENT_PREFIX))
+
+
+@METRICS.register_collector
+def shared_store_metrics():
+    rows = [
+        (("created",), sum(e[0].size for e in _SEGMENTS.values() if e[3])),
+        (("attached",), sum(e[0].size for e in _SEGMENTS.values() if not e[3])),
+    ]
+    return [(
+        "skyshield_shared_store_bytes", "gauge",
+        "Shared-memory vector segments mapped by this worker", ("source",), rows,
+    )]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cleanup", action="store_true",
+                        help="호스트의 skyshield 세그먼트 전부 unlink (붙어 있는 워커는 계속 사용 가능)")
+    args = parser.parse_args()
+
+    for path in segments_on_host():
+        print(f"{path.name}\t{path.stat().st_size / 1e6:.1f}MB")
+        if args.cleanup:
+            shared_memory.SharedMemory(name=path.name).unlink()
@@ -1,62 +1,157 @@
 import os
+import re
+import time
+import asyncio
+import threading
+import unicodedata
+from collections import OrderedDict
 from dotenv import load_dotenv
 
-# API Clients
-try:
-    from openai import OpenAI
-except:
-    OpenAI = None
+from .registry import registry
+from .fake_backend import FakeChatClient, FakeAsyncChatClient
 
-try:
-    from mistralai import Mistral
-except:
-    Mistral = None
 
-try:
-    from deepseek import DeepSeek
-except:
-    DeepSeek = None
+load_dotenv()
 
 
-load_dotenv()
+# ----------------------------------------------------
+# 백엔드별 공용 클라이언트 풀
+# (OpenAI / Mistral 클라이언트는 내부 HTTP keep-alive 풀을 가지므로
+#  Summarizer 인스턴스마다 새로 만들지 않고 공유한다)
+# ----------------------------------------------------
+_CLIENT_POOL = {}
+_CLIENT_LOCK = threading.Lock()
+
+
+def _pooled(kind, backend, factory):
+    key = (kind, backend)
+    with _CLIENT_LOCK:
+        client = _CLIENT_POOL.get(key)
+        if client is None:
+            client = factory()
+            # 키가 없어 None 이면 캐시하지 않음 (나중에 키가 설정될 수 있음)
+            if client is not None:
+                _CLIENT_POOL[key] = client
+        return client
+
+
+# ----------------------------------------------------
+# 요약 결과 TTL 캐시
+# ----------------------------------------------------
+def normalize_text(text):
+    """캐시 키용 정규화: NFKC + 공백 정리."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class SummaryCache:
+    def __init__(self, maxsize=4096, ttl=3600.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, backend, text):
+        key = (backend, normalize_text(text))
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, backend, text, summary):
+        if self.maxsize <= 0:
+            return
+        key = (backend, normalize_text(text))
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, summary)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+SUMMARY_CACHE = SummaryCache(
+    maxsize=int(os.getenv("SKYSHIELD_SUMMARY_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("SKYSHIELD_SUMMARY_CACHE_TTL", "3600")),
+)
 
 
 class Summarizer:
-    def __init__(self, backend="Google Gemini"):
+    def __init__(self, backend="Google Gemini", cache=SUMMARY_CACHE):
         self.backend = backend
+        self.cache = cache
         self.client = self._get_client()
+        self.async_client = self._get_async_client()
 
     # ----------------------------------------------------
-    # API Client 자동 선택
+    # API Client 자동 선택 (백엔드별로 한 번만 생성)
     # ----------------------------------------------------
     def _get_client(self):
-        if self.backend == "OpenAI" and OpenAI:
+        return _pooled("sync", self.backend, self._create_client)
+
+    def _get_async_client(self):
+        return _pooled("async", self.backend, self._create_async_client)
+
+    def _create_client(self):
+        # API SDK 는 해당 백엔드를 처음 쓸 때만 import
+        if self.backend == "OpenAI":
+            OpenAI = registry.get("openai", required=False)
             key = os.getenv("OPENAI_API_KEY")
-            if key:
+            if OpenAI and key:
                 return OpenAI(api_key=key)
 
-        if self.backend == "Mistral" and Mistral:
+        if self.backend == "Mistral":
+            Mistral = registry.get("mistral", required=False)
             key = os.getenv("MISTRAL_API_KEY")
-            if key:
+            if Mistral and key:
                 return Mistral(api_key=key)
 
-        if self.backend == "DeepSeek" and DeepSeek:
+        if self.backend == "DeepSeek":
+            DeepSeek = registry.get("deepseek", required=False)
             key = os.getenv("DEEPSEEK_API_KEY")
-            if key:
+            if DeepSeek and key:
                 return DeepSeek(api_key=key)
 
+        # 벤치마크용 가짜 백엔드 (API 호출 없음)
+        if self.backend == "Fake":
+            return FakeChatClient()
+
         # Google Gemini도 동일하게 추가 가능
         # API 없으면 로컬 fallback으로 자동 전환
         return None
 
-    # ----------------------------------------------------
-    # 1) 기본 의미 요약: 공격 여부를 사람이 읽기 쉽게
-    # ----------------------------------------------------
-    def summarize(self, text):
+    def _create_async_client(self):
+        """asyncio 용 클라이언트. 없으면 asummarize 가 스레드로 위임."""
+        if self.backend == "OpenAI":
+            AsyncOpenAI = registry.get("openai-async", required=False)
+            key = os.getenv("OPENAI_API_KEY")
+            if AsyncOpenAI and key:
+                return AsyncOpenAI(api_key=key)
 
-        # 1) LLM 사용 가능하면 고품질 요약
-        if self.client:
-            prompt = f"""
+        if self.backend == "Fake":
+            return FakeAsyncChatClient()
+
+        # Mistral 클라이언트는 동기/비동기 겸용 (chat.complete_async)
+        if self.backend == "Mistral" and self.client is not None:
+            return self.client
+
+        return None
+
+    def _model_name(self):
+        return "gpt-4o-mini" if self.backend=="OpenAI" else "mixtral-8x7b"
+
+    @staticmethod
+    def _intent_prompt(text):
+        return f"""
 다음 텍스트의 **의도(intent)** 를 분석하여 한 문단으로 요약하세요.
 - 공격/비공격 여부
 - 어떤 방향의 행동을 요청하는지
@@ -67,22 +162,82 @@ class Summarizer:
 {text}
 """
 
+    @staticmethod
+    def _message_content(resp):
+        message = resp.choices[0].message
+        if isinstance(message, dict):
+            return message["content"]
+        return message.content
+
+    # ----------------------------------------------------
+    # 1) 기본 의미 요약: 공격 여부를 사람이 읽기 쉽게
+    # ----------------------------------------------------
+    def summarize(self, text, use_llm=True):
+
+        # 1) LLM 사용 가능하면 고품질 요약
+        if self.client and use_llm:
+            cached = self.cache.get(self.backend, text) if self.cache is not None else None
+            if cached is not None:
+                return cached
+
+            prompt = self._intent_prompt(text)
+
             try:
                 resp = self.client.chat.completions.create(
-                    model="gpt-4o-mini" if self.backend=="OpenAI" else "mixtral-8x7b",
+                    model=self._model_name(),
                     messages=[
                         {"role": "system", "content": "You are an intent analysis expert."},
                         {"role": "user", "content": prompt}
                     ]
                 )
-                return resp.choices[0].message["content"]
+                return self._remember(text, self._message_content(resp))
 
             except Exception as e:
-                return f"[LLM 요약 실패 → 로컬 요약 사용]\n{text[:120]}..."
+                return self.failure_summary(text)
 
         # 2) API 없으면 로컬 fallback 요약
         return self._local_summary(text)
 
+    # ----------------------------------------------------
+    # 1-1) summarize 의 asyncio 버전
+    # ----------------------------------------------------
+    async def asummarize(self, text, use_llm=True):
+        if not (self.client and use_llm):
+            return self._local_summary(text)
+
+        cached = self.cache.get(self.backend, text) if self.cache is not None else None
+        if cached is not None:
+            return cached
+
+        if self.async_client is None:
+            return await asyncio.to_thread(self.summarize, text, use_llm)
+
+        messages = [
+            {"role": "system", "content": "You are an intent analysis expert."},
+            {"role": "user", "content": self._intent_prompt(text)}
+        ]
+
+        try:
+            chat = self.async_client.chat
+            if hasattr(chat, "complete_async"):
+                resp = await chat.complete_async(model=self._model_name(), messages=messages)
+            else:
+                resp = await chat.completions.create(model=self._model_name(), messages=messages)
+            return self._remember(text, self._message_content(resp))
+
+        except Exception:
+            return self.failure_summary(text)
+
+    def _remember(self, text, summary):
+        # 실패 fallback 은 캐시하지 않고, 성공한 LLM 요약만 저장
+        if self.cache is not None and summary:
+            self.cache.put(self.backend, text, summary)
+        return summary
+
+    @staticmethod
+    def failure_summary(text):
+        return f"[LLM 요약 실패 → 로컬 요약 사용]\n{text[:120]}..."
+
     # ----------------------------------------------------
     # 로컬 단순 의미 요약기
     # ----------------------------------------------------
@@ -128,7 +283,7 @@ class Summarizer:
                         {"role": "user", "content": prompt}
                     ]
                 )
-                return resp.choices[0].message["content"]
+                return self._message_content(resp)
 
             except:
                 pass
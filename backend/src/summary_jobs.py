@@ -0,0 +1,89 @@
+"""
+요약을 나중에 받아 가는 deferred 모드용 작업 저장소.
+
+/analyze 가 summary_mode="deferred" 면 판정만 바로 응답하고
+요약 코루틴은 asyncio Task 로 계속 돌린다.
+클라이언트는 응답의 request_id 로 GET /analyze/{request_id}/summary 를 호출한다.
+/analyze/stream 도 요약을 같은 저장소에 등록하고 그 작업을 스트리밍하므로,
+스트림이 끊겨도 decision 이벤트의 request_id 로 요약을 받아 갈 수 있다.
+
+- 작업은 프로세스 메모리에만 있으므로 request_id 는 같은 워커에서만 유효하다.
+  (여러 워커 뒤에서는 sticky session 또는 /analyze/stream 을 사용)
+- TTL 이 지나거나 maxsize 를 넘으면 오래된 작업부터 버린다 (끝나지 않았으면 취소).
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+
+
+class SummaryJobs:
+    def __init__(self, maxsize=10_000, ttl=600.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._jobs = OrderedDict()   # request_id -> (expires_at, task)
+
+    def submit(self, coro, request_id=None):
+        """코루틴을 Task 로 시작하고 request_id 반환 (이벤트 루프 안에서 호출)."""
+        request_id = request_id or uuid.uuid4().hex
+        self._evict()
+        self._jobs[request_id] = (time.monotonic() + self.ttl, asyncio.ensure_future(coro))
+        return request_id
+
+    def put(self, summary, request_id=None):
+        """이미 끝난 요약 (tiered 의 로컬 요약 등) 을 같은 방식으로 조회할 수 있게 등록."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(summary)
+        return self.submit(future, request_id)
+
+    def cancel(self, request_id):
+        """작업 취소 + 삭제 (판정이 실패해 request_id 가 클라이언트에게 나가지 않은 경우)."""
+        if request_id in self._jobs:
+            self._drop(request_id)
+
+    def get(self, request_id):
+        item = self._jobs.get(request_id)
+        if item is None:
+            return None
+        if item[0] <= time.monotonic():
+            self._drop(request_id)
+            return None
+        return item[1]
+
+    async def wait(self, request_id, timeout=0.0):
+        """
+        (status, summary). status: "done" / "pending" / "missing".
+        timeout > 0 이면 그 시간까지 완료를 기다린다 (long-poll).
+        """
+        task = self.get(request_id)
+        if task is None:
+            return "missing", None
+        if not task.done() and timeout > 0:
+            await asyncio.wait({task}, timeout=timeout)
+        if not task.done():
+            return "pending", None
+        return "done", task.result()
+
+    def _drop(self, request_id):
+        _, task = self._jobs.pop(request_id)
+        if not task.done():
+            task.cancel()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._jobs:
+            request_id, (expires_at, _) = next(iter(self._jobs.items()))
+            if expires_at > now and len(self._jobs) < self.maxsize:
+                break
+            self._drop(request_id)
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+SUMMARY_JOBS = SummaryJobs(
+    maxsize=int(os.getenv("SKYSHIELD_SUMMARY_JOBS", "10000")),
+    ttl=float(os.getenv("SKYSHIELD_SUMMARY_JOB_TTL", "600")),
+)
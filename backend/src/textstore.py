@@ -0,0 +1,133 @@
+"""
+공격 / 정상 텍스트 sidecar (벡터 행 순서와 같은 순서).
+
+서빙 프로세스가 텍스트가 필요할 때마다 156MB CSV 를 pandas 로 읽지 않도록
+precompute_jailbreak.py 가 텍스트를 한 번 풀어서 저장한다.
+
+precomputed/texts/
+    attack.bin           utf-8 텍스트를 구분자 없이 이어 붙인 blob
+    attack.offsets.npy   int64 (n + 1,) — i 번째 텍스트 = blob[offsets[i]:offsets[i + 1]]
+    attack.meta.json     n, bytes, 생성 시각 (마지막에 기록 → 있으면 완성된 것)
+    normal.*             (선택) 정상 텍스트, normal_{model}.dat 행 순서
+
+blob / offsets 는 mmap 으로 열고 접근한 행만 decode 한다.
+편입(src/ingest.py)은 blob 뒤에 붙이고 offsets 를 rename 으로 교체하므로
+이미 열어 둔 TextStore 는 이전 행 수 그대로 계속 읽을 수 있다.
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def _files(prefix):
+    prefix = Path(prefix)
+    return (prefix.with_name(prefix.name + ".bin"),
+            prefix.with_name(prefix.name + ".offsets.npy"),
+            prefix.with_name(prefix.name + ".meta.json"))
+
+
+def _encode(texts):
+    return [("" if t is None else str(t)).encode("utf-8") for t in texts]
+
+
+def _write_meta(meta_path, n, nbytes):
+    tmp = meta_path.with_name(meta_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"n": int(n), "bytes": int(nbytes),
+                   "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")}, f, ensure_ascii=False, indent=2)
+    tmp.replace(meta_path)
+
+
+def _save_offsets(path, offsets):
+    tmp = path.with_name(path.stem + ".tmp.npy")
+    np.save(tmp, offsets)
+    tmp.replace(path)
+
+
+class TextStore:
+    """list 처럼 len / 인덱스 / 슬라이스 / 순회가 되는 읽기 전용 텍스트 목록."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob          # uint8 (bytes,)
+        self.offsets = offsets    # int64 (n + 1,)
+
+    def __len__(self):
+        return int(self.offsets.shape[0]) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        i = int(i)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"텍스트 행 범위를 벗어났습니다: {i} (n={n})")
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        blob_path, offsets_path, meta_path = _files(prefix)
+        if not meta_path.exists():
+            raise RuntimeError(f"텍스트 sidecar 가 없습니다: {meta_path}")
+        offsets = np.load(offsets_path, mmap_mode="r" if mmap else None)
+        nbytes = int(offsets[-1])
+        if nbytes == 0:
+            blob = np.empty(0, dtype="uint8")
+        elif mmap:
+            blob = np.memmap(blob_path, dtype="uint8", mode="r", shape=(nbytes,))
+        else:
+            blob = np.fromfile(blob_path, dtype="uint8", count=nbytes)
+        return cls(blob, offsets)
+
+
+def write_texts(prefix, texts):
+    """텍스트 목록을 sidecar 로 저장 (blob → offsets → meta 순서, 각각 임시 파일 후 rename)."""
+    blob_path, offsets_path, meta_path = _files(prefix)
+    blob_path.parent.mkdir(parents=True, exist_ok=True)
+
+    encoded = _encode(texts)
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    tmp = blob_path.with_name(blob_path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        for b in encoded:
+            f.write(b)
+    tmp.replace(blob_path)
+    _save_offsets(offsets_path, offsets)
+    _write_meta(meta_path, len(encoded), offsets[-1])
+    return prefix
+
+
+def append_texts(prefix, texts):
+    """
+    기존 sidecar 뒤에 텍스트 추가 (없으면 아무것도 하지 않고 False).
+    blob 은 offsets[-1] 위치부터 덮어써서, 이전 append 가 중간에 죽어 남은 꼬리 바이트는 버린다.
+    """
+    blob_path, offsets_path, meta_path = _files(prefix)
+    if not meta_path.exists():
+        return False
+
+    offsets = np.load(offsets_path)
+    end = int(offsets[-1])
+    encoded = _encode(texts)
+    with open(blob_path, "r+b") as f:
+        f.truncate(end)
+        f.seek(end)
+        for b in encoded:
+            f.write(b)
+
+    new = end + np.cumsum([len(b) for b in encoded], dtype="int64")
+    offsets = np.concatenate([offsets, new]).astype("int64")
+    _save_offsets(offsets_path, offsets)
+    _write_meta(meta_path, len(offsets) - 1, offsets[-1])
+    return True
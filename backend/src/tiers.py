@@ -0,0 +1,124 @@
+"""
+확신도 기반 단계별(tiered) 분석 파이프라인.
+
+pipeline_mode="tiered" 면 싼 단계부터 실행하고, 비싼 LLM 요약은
+판정이 애매한 입력(REVIEW 대역)이나 호출자가 요청한 경우에만 부른다.
+
+    0) exact   : 정규화 텍스트 해시로 데이터셋 원문과 정확히 같은지 확인
+                 → 같으면 임베딩 API 대신 저장된 벡터(공격 npy / 정상 memmap 행)를 사용
+    1) lexical : 잘 알려진 탈옥 문구 정규식 → 맞으면 요약을 임베딩과 동시에 미리 시작
+    2) SkyShield 유사도 + 클러스터 판정 (full 모드와 같은 detect_one)
+    3) 에스컬레이션 판단 (escalation_reasons)
+        - final_decision 이 REVIEW
+        - score_basic 이 adaptive_thr 에서 TIER_MARGIN 안쪽 (경계 근처의 ALLOW / BLOCK)
+        - lexical 규칙이 맞음 / force_summary=True
+       해당 없으면 로컬 요약(summarize(use_llm=False))으로 바로 응답.
+
+판정(final_decision) 자체는 full 모드와 같다. 달라지는 것은 요약을 어떻게 만드느냐뿐이다.
+"""
+
+import os
+import re
+import hashlib
+
+import numpy as np
+
+from .summarizer import normalize_text
+
+PIPELINE_MODES = ("full", "tiered")
+TIERS = ("exact", "confident", "escalated")
+
+# adaptive_thr 에서 이 거리 안이면 ALLOW / BLOCK 이어도 경계 입력으로 보고 요약
+TIER_MARGIN = float(os.getenv("SKYSHIELD_TIER_MARGIN", "0.05"))
+
+ATTACK, NORMAL = 1, 0
+
+
+# ------------------------------------------------------------
+# 0) 정확 일치 조회 (정규화 텍스트 → 64bit 해시)
+# ------------------------------------------------------------
+def text_hash(text: str) -> int:
+    digest = hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class ExactMatchIndex:
+    """
+    데이터셋 텍스트의 해시 정렬 배열 + (종류, 벡터 행) 배열.
+    파이썬 dict 대신 numpy 배열이라 17만 건이어도 수 MB 이고 조회는 searchsorted 1회.
+    같은 텍스트가 여러 번 나오면 공격 쪽을 우선한다.
+    """
+
+    def __init__(self, hashes, kinds, rows):
+        self.hashes = hashes    # (n,) uint64, 정렬
+        self.kinds = kinds      # (n,) int8, ATTACK / NORMAL
+        self.rows = rows        # (n,) int64, 벡터 행 번호
+
+    @classmethod
+    def build(cls, atk_texts=(), norm_texts=()):
+        hashes = np.fromiter(
+            (text_hash(t) for t in [*atk_texts, *norm_texts]),
+            dtype="uint64", count=len(atk_texts) + len(norm_texts),
+        )
+        kinds = np.concatenate([
+            np.full(len(atk_texts), ATTACK, dtype="int8"),
+            np.full(len(norm_texts), NORMAL, dtype="int8"),
+        ])
+        rows = np.concatenate([
+            np.arange(len(atk_texts), dtype="int64"),
+            np.arange(len(norm_texts), dtype="int64"),
+        ])
+        # 해시 오름차순, 같은 해시 안에서는 공격(1)이 먼저
+        order = np.lexsort((-kinds, hashes))
+        return cls(hashes[order], kinds[order], rows[order])
+
+    def __len__(self):
+        return int(self.hashes.shape[0])
+
+    def lookup(self, text: str):
+        """(kind, row) 또는 None."""
+        if len(self) == 0:
+            return None
+        h = np.uint64(text_hash(text))
+        i = int(np.searchsorted(self.hashes, h))
+        if i >= len(self) or self.hashes[i] != h:
+            return None
+        return int(self.kinds[i]), int(self.rows[i])
+
+
+# ------------------------------------------------------------
+# 1) lexical 규칙 (임베딩 전에 알 수 있는 강한 신호)
+# ------------------------------------------------------------
+LEXICAL_RULES = (
+    ("ignore_instructions", r"\b(ignore|disregard|forget)\b.{0,40}\b(previous|prior|above|all|earlier)\b.{0,20}\b(instructions?|rules?|prompts?)\b"),
+    ("system_prompt_leak", r"\b(reveal|show|print|repeat)\b.{0,30}\b(system prompt|hidden instructions?|initial prompt)\b"),
+    ("dan_persona", r"\b(DAN|do anything now|developer mode|jailbreak(ed)?)\b"),
+    ("no_restrictions", r"\b(without|no)\s+(any\s+)?(restrictions?|filters?|limitations?|censorship)\b"),
+    ("ko_ignore_instructions", r"(이전|앞의|위의|모든)\s*(지시|지침|규칙|명령).{0,10}(무시|잊어)"),
+    ("ko_no_restrictions", r"(제한|검열|필터)\s*(없이|을 해제|를 해제|해제)"),
+)
+_LEXICAL = tuple((name, re.compile(pattern, re.IGNORECASE | re.DOTALL)) for name, pattern in LEXICAL_RULES)
+
+
+def lexical_hits(text: str):
+    """맞은 규칙 이름 목록."""
+    return [name for name, pattern in _LEXICAL if pattern.search(text)]
+
+
+# ------------------------------------------------------------
+# 3) 에스컬레이션 판단
+# ------------------------------------------------------------
+def escalation_reasons(fields: dict, lexical=(), force_summary=False, margin=TIER_MARGIN):
+    """
+    LLM 요약이 필요한 이유 목록 (비어 있으면 확신 구간 → 로컬 요약).
+    fields 는 detect_one 결과 (AnalysisResponse 필드 dict).
+    """
+    reasons = []
+    if force_summary:
+        reasons.append("forced")
+    if fields["final_decision"] == "REVIEW":
+        reasons.append("review")
+    elif abs(fields["score_basic"] - fields["adaptive_thr"]) < margin:
+        reasons.append("near_threshold")
+    reasons.extend(f"lexical:{name}" for name in lexical)
+    return reasons
@@ -1,22 +1,21 @@
 import os
 import math
+import time
 from functools import lru_cache
 from pathlib import Path
 import json
 
-import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 
-from openai import OpenAI
-from mistralai import Mistral
-
-try:
-    from deepseek import DeepSeek
-except ImportError:
-    DeepSeek = None
-
 from .embedding import Embedder
+from .registry import registry
+from .index import FlatIndex, ChunkedFlatIndex, QUANTIZED_KINDS, load_index, l2_normalize
+from .shared_store import load_npy, load_raw, load_derived, enabled as shared_store_enabled
+from .fake_backend import FakeEmbeddingClient, FakeAsyncEmbeddingClient
+from .reduction import Reduction, parse_model_name
+from .projection import Projection2D
+from .textstore import TextStore
 
 # .env 로부터 API 키 로드
 load_dotenv()
@@ -24,8 +23,13 @@ load_dotenv()
 # === 공통 경로 ===
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
-PRE_DIR = BASE_DIR / "precomputed"
+# 벤치마크 등에서 다른 사전 계산 디렉터리를 쓰려면 SKYSHIELD_PRECOMPUTED_DIR
+PRE_DIR = Path(os.getenv("SKYSHIELD_PRECOMPUTED_DIR") or BASE_DIR / "precomputed")
 VEC_DIR = PRE_DIR / "vectors"
+INDEX_DIR = PRE_DIR / "index"
+ARTIFACT_DIR = PRE_DIR / "artifacts"
+PROJECTION_DIR = PRE_DIR / "projection"
+TEXT_DIR = PRE_DIR / "texts"
 
 
 # ------------------------------------------------------------
@@ -35,6 +39,31 @@ def safe_name(s: str) -> str:
     return s.replace("/", "_").replace(" ", "_")
 
 
+# ------------------------------------------------------------
+# 1-1) 축소 차원 모드 (src/reduction.py, "모델@256" / "모델@pca256")
+# ------------------------------------------------------------
+def reduction_path(embed_model: str) -> Path:
+    return VEC_DIR / f"reduction_{safe_name(embed_model)}.npz"
+
+
+def load_reduction(embed_model: str):
+    """
+    모델 이름의 축소 설정. 축소 없음 → None.
+    pca 는 precompute 때 저장한 투영 행렬까지 로드한다.
+    """
+    _, reduction = parse_model_name(embed_model)
+    if reduction is None or reduction.kind == "truncate":
+        return reduction
+
+    path = reduction_path(embed_model)
+    if not path.exists():
+        raise RuntimeError(
+            f"PCA 투영 파일이 없습니다: {path}\n"
+            f"precompute_jailbreak.py --embed-model \"{embed_model}\" 를 먼저 실행하세요."
+        )
+    return Reduction.load(path)
+
+
 # ------------------------------------------------------------
 # 2) OpenAI / Mistral / DeepSeek embedding client
 # ------------------------------------------------------------
@@ -42,23 +71,28 @@ def get_embedding_client(model_name: str):
     """
     임베딩 모델 이름에 따라 OpenAI / Mistral / DeepSeek 클라이언트를 자동 로드.
     로컬 sentence-transformers 계열은 None 반환(Embedder 내부에서 처리).
+    "Fake" 가 들어간 이름은 벤치마크용 가짜 클라이언트 (src/fake_backend.py).
     """
+    if "Fake" in model_name:
+        return FakeEmbeddingClient()
+
     if "OpenAI" in model_name:
         key = os.getenv("OPENAI_API_KEY")
         if not key:
             raise RuntimeError("OPENAI_API_KEY 가 설정되어 있지 않습니다.")
-        return OpenAI(api_key=key)
+        return registry.get("openai")(api_key=key)
 
     if "Mistral" in model_name:
         key = os.getenv("MISTRAL_API_KEY")
         if not key:
             raise RuntimeError("MISTRAL_API_KEY 가 설정되어 있지 않습니다.")
-        return Mistral(api_key=key)
+        return registry.get("mistral")(api_key=key)
 
     if "DeepSeek" in model_name:
         key = os.getenv("DEEPSEEK_API_KEY")
         if not key:
             raise RuntimeError("DEEPSEEK_API_KEY 가 설정되어 있지 않습니다.")
+        DeepSeek = registry.get("deepseek", required=False)
         if DeepSeek is None:
             raise RuntimeError("deepseek 패키지가 설치되어 있지 않습니다.")
         return DeepSeek(api_key=key)
@@ -67,6 +101,28 @@ def get_embedding_client(model_name: str):
     return None
 
 
+def get_async_embedding_client(model_name: str):
+    """
+    asyncio 용 임베딩 클라이언트.
+    - OpenAI  : AsyncOpenAI
+    - Mistral : 같은 Mistral 클라이언트 (embeddings.create_async 사용)
+    - DeepSeek / 로컬 모델 : None (Embedder.aencode 가 스레드로 위임)
+    """
+    if "Fake" in model_name:
+        return FakeAsyncEmbeddingClient()
+
+    if "OpenAI" in model_name:
+        key = os.getenv("OPENAI_API_KEY")
+        if not key:
+            raise RuntimeError("OPENAI_API_KEY 가 설정되어 있지 않습니다.")
+        return registry.get("openai-async")(api_key=key)
+
+    if "Mistral" in model_name:
+        return get_embedding_client(model_name)
+
+    return None
+
+
 @lru_cache(maxsize=8)
 def load_all(model_name: str):
     """
@@ -79,6 +135,8 @@ def load_all(model_name: str):
     반환:
         embedder, attack_texts, normal_texts, attack_vectors, normal_vectors
     """
+    pd = registry.get("pandas")
+
     base_dir = Path(__file__).resolve().parent.parent
     data_dir = base_dir / "data"
 
@@ -114,6 +172,8 @@ def load_all(model_name: str):
 # 4) 전체 데이터 로드 (공격/정상 텍스트만)
 # ------------------------------------------------------------
 def load_dataset():
+    pd = registry.get("pandas")
+
     df_base = pd.read_csv(DATA_DIR / "jailbreak_dataset.csv")
     df_custom = pd.read_csv(DATA_DIR / "jailbreak_customed.csv")
     data = pd.concat([df_base, df_custom], ignore_index=True)
@@ -123,6 +183,33 @@ def load_dataset():
     return atk, norm
 
 
+# ------------------------------------------------------------
+# 4-1) 텍스트 sidecar (src/textstore.py, precompute 결과)
+#      있으면 CSV 를 읽지 않고 행 단위로 mmap 접근, 없으면 CSV fallback
+# ------------------------------------------------------------
+def text_store_path(kind: str) -> Path:
+    return TEXT_DIR / kind
+
+
+def load_text_store(kind: str):
+    path = text_store_path(kind)
+    if not path.with_name(path.name + ".meta.json").exists():
+        return None
+    return TextStore.load(path)
+
+
+def load_attack_texts():
+    """공격 텍스트 (attack_{model}.npy 행 순서)."""
+    store = load_text_store("attack")
+    return store if store is not None else load_dataset()[0]
+
+
+def load_normal_texts():
+    """정상 텍스트 (normal_{model}.dat 행 순서)."""
+    store = load_text_store("normal")
+    return store if store is not None else load_dataset()[1]
+
+
 # ------------------------------------------------------------
 # 5) 메모리 터지지 않는 구조:
 #    공격 벡터만 로드 (precompute_jailbreak.py 결과)
@@ -133,28 +220,189 @@ def load_attack_data(embed_model: str):
         /precomputed/vectors/attack_{model}.npy
 
     를 불러와서 (공격 텍스트 + 공격 벡터)를 반환한다.
+    텍스트는 precomputed/texts/attack sidecar (없을 때만 CSV).
     """
-    atk_texts, _ = load_dataset()
+    atk_texts = load_attack_texts()
+    atk_vec = load_attack_vectors(embed_model)
+    return atk_texts, atk_vec
+
+
+def attack_vectors_path(embed_model: str) -> Path:
+    return VEC_DIR / f"attack_{safe_name(embed_model)}.npy"
+
+
+def write_attack_meta(embed_model: str, n: int, dim: int):
+    """attack_{model}.meta.json — 파일 이름(safe_name)에서 되돌릴 수 없는 모델 이름을 기록."""
+    path = VEC_DIR / f"attack_{safe_name(embed_model)}.meta.json"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"embed_model": embed_model, "n": int(n), "dim": int(dim)}, f, ensure_ascii=False, indent=2)
+    tmp.replace(path)
 
-    atk_path = VEC_DIR / f"attack_{safe_name(embed_model)}.npy"
+
+def attack_models():
+    """
+    attack_{model}.npy 가 있는 임베딩 모델 이름 → 벡터 경로.
+    이름은 attack_{model}.meta.json, 없으면 (예전 precompute) 클러스터 아티팩트 manifest 에서 찾는다.
+    (models, unknown) — unknown 은 이름을 알 수 없는 벡터 파일 목록.
+    """
+    names = {}
+    for path in sorted(ARTIFACT_DIR.glob("cluster_*/manifest.json")) if ARTIFACT_DIR.exists() else []:
+        embed_model = json.load(open(path, encoding="utf-8")).get("embed_model")
+        if embed_model:
+            names[safe_name(embed_model)] = embed_model
+
+    models, unknown = {}, []
+    for path in sorted(VEC_DIR.glob("attack_*.npy")) if VEC_DIR.exists() else []:
+        if path.name.endswith(".tmp.npy"):
+            continue
+        key = path.name[len("attack_"):-len(".npy")]
+        meta_path = VEC_DIR / f"attack_{key}.meta.json"
+        if meta_path.exists():
+            models[json.load(open(meta_path, encoding="utf-8"))["embed_model"]] = path
+        elif key in names:
+            models[names[key]] = path
+        else:
+            unknown.append(path)
+    return models, unknown
+
+
+def load_attack_vectors(embed_model: str):
+    """
+    공격 벡터(npy)만 로드. 텍스트(CSV)는 읽지 않는다.
+    읽기 전용 mmap (SKYSHIELD_SHARED_STORE 면 호스트 공용 shared memory, src/shared_store.py).
+    """
+    atk_path = attack_vectors_path(embed_model)
     if not atk_path.exists():
         raise RuntimeError(f"공격 벡터 파일이 없습니다: {atk_path}")
 
-    atk_vec = np.load(atk_path)  # float32, shape=(n_atk, dim)
-    return atk_texts, atk_vec
+    return load_npy(atk_path)  # float32, shape=(n_atk, dim)
+
+
+# ------------------------------------------------------------
+# 5-1) 공격 벡터 검색 인덱스 (precompute_jailbreak.py --index 결과)
+# ------------------------------------------------------------
+def attack_index_path(embed_model: str, kind: str) -> Path:
+    return INDEX_DIR / f"attack_{safe_name(embed_model)}.{kind}"
+
+
+def load_attack_index(embed_model: str, kind: str | None = None):
+    """
+    사전 계산된 공격 벡터 인덱스를 mmap 으로 로드.
+
+    kind 미지정 시 환경변수 SKYSHIELD_INDEX (기본 "flat") 를 따른다.
+    - fp16 / int8 / pq : 압축 코드 위에서 직접 점수 계산.
+      SKYSHIELD_RERANK_K > 0 이면 상위 후보를 float32 원본으로 재계산
+    해당 인덱스 파일이 없으면 공격 벡터로 FlatIndex 를 즉석에서 만든다.
+    """
+    kind = kind or os.getenv("SKYSHIELD_INDEX", "flat")
+
+    path = attack_index_path(embed_model, kind)
+    if (path / "meta.json").exists():
+        if kind in QUANTIZED_KINDS:
+            rerank_k = int(os.getenv("SKYSHIELD_RERANK_K", "0"))
+            rerank_vectors = _attack_rerank_vectors(embed_model) if rerank_k > 0 else None
+            return load_index(path, rerank_vectors=rerank_vectors, rerank_k=rerank_k)
+        return load_index(path)
+
+    # 인덱스 파일이 없으면 정규화한 공격 벡터로 FlatIndex
+    # (shared store 면 정규화 결과도 호스트당 한 번만 만들어 공유)
+    if shared_store_enabled():
+        atk_path = VEC_DIR / f"attack_{safe_name(embed_model)}.npy"
+        load_attack_vectors(embed_model)   # 파일 존재 확인
+        return FlatIndex(load_derived(atk_path, "l2", l2_normalize), normalized=True)
+    return FlatIndex(load_attack_vectors(embed_model))
+
+
+def _attack_rerank_vectors(embed_model: str):
+    """re-ranking 용 float32 공격 벡터 (flat 인덱스가 있으면 그 정규화 벡터를 mmap)."""
+    flat_path = attack_index_path(embed_model, "flat")
+    if (flat_path / "vectors.npy").exists():
+        return load_npy(flat_path / "vectors.npy")
+    return load_attack_vectors(embed_model)
+
+
+# ------------------------------------------------------------
+# 5-2) 클러스터 분석 아티팩트 경로 (src/artifacts.py 포맷)
+# ------------------------------------------------------------
+def cluster_artifact_path(embed_model: str, summ_model: str) -> Path:
+    return ARTIFACT_DIR / f"cluster_{safe_name(embed_model)}_{safe_name(summ_model)}"
+
+
+# ------------------------------------------------------------
+# 5-3) UMAP 2D 투영 (src/projection.py 포맷)
+# ------------------------------------------------------------
+def projection_path(embed_model: str) -> Path:
+    return PROJECTION_DIR / f"umap_{safe_name(embed_model)}"
+
+
+def load_projection(embed_model: str):
+    path = projection_path(embed_model)
+    if not (path / "meta.json").exists():
+        raise RuntimeError(
+            f"UMAP 투영 파일이 없습니다: {path}\n"
+            f"backend 디렉터리에서 precompute_jailbreak.py 를 먼저 실행하세요."
+        )
+    return Projection2D.load(path)
+
+
+# ------------------------------------------------------------
+# 5-4) 공격 코퍼스 버전 (src/ingest.py)
+#      편입 / 재클러스터링이 끝날 때마다 증가. 서빙 워커는 요청마다 stat 해 보고
+#      바뀌었으면 공격 벡터 / 인덱스 / 아티팩트 캐시를 비운다 (main.refresh_if_corpus_changed).
+# ------------------------------------------------------------
+CORPUS_VERSION_PATH = PRE_DIR / "corpus_version.json"
+
+
+def corpus_version_stamp():
+    """파일이 바뀌었는지만 보는 값 (rename 으로 교체하므로 inode + mtime). 없으면 None."""
+    try:
+        st = CORPUS_VERSION_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def read_corpus_version() -> int:
+    try:
+        with open(CORPUS_VERSION_PATH, encoding="utf-8") as f:
+            return int(json.load(f)["version"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return 0
+
+
+def bump_corpus_version(reason: str = "") -> int:
+    """버전 +1 (호출자가 편입 락을 잡고 있어야 함)."""
+    version = read_corpus_version() + 1
+    PRE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = CORPUS_VERSION_PATH.with_name(CORPUS_VERSION_PATH.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "reason": reason,
+                   "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")}, f, ensure_ascii=False, indent=2)
+    tmp.replace(CORPUS_VERSION_PATH)
+    return version
 
 
 # ------------------------------------------------------------
 # 6) 정상 벡터는 memmap 으로 부분 로딩 (필요 시)
 # ------------------------------------------------------------
-def load_normal_memmap(embed_model: str):
+def load_normal_memmap(embed_model: str, quant: str | None = None, rerank_k: int = 0):
     """
     optional: 정상 벡터 전체가 필요할 때만 로딩.
     메모리를 사용하지 않고 디스크에서 직접 접근 가능.
+
+    quant 를 주면 (fp16 / int8 / pq) precompute_jailbreak.py --quantize 로 만든
+    압축 저장소를 QuantizedIndex 로 반환한다. rerank_k > 0 이면
+    float32 memmap 으로 상위 후보를 다시 계산한다.
     """
     meta_path = VEC_DIR / f"normal_{safe_name(embed_model)}.meta.json"
     dat_path = VEC_DIR / f"normal_{safe_name(embed_model)}.dat"
 
+    if quant is not None:
+        q_path = VEC_DIR / f"normal_{safe_name(embed_model)}.{quant}"
+        rerank_vectors = load_normal_memmap(embed_model) if rerank_k > 0 else None
+        return load_index(q_path, rerank_vectors=rerank_vectors, rerank_k=rerank_k)
+
     if not meta_path.exists() or not dat_path.exists():
         raise RuntimeError(
             f"정상 벡터 memmap 파일을 찾을 수 없습니다: {dat_path}"
@@ -164,14 +412,54 @@ def load_normal_memmap(embed_model: str):
     n = meta["n_normals"]
     dim = meta["dim"]
 
-    mem = np.memmap(dat_path, dtype="float32", mode="r", shape=(n, dim))
-    return mem
+    # SKYSHIELD_SHARED_STORE=all 이면 shared memory, 아니면 읽기 전용 memmap
+    return load_raw(dat_path, "float32", (n, dim))
+
+
+def load_normal_index(embed_model: str, quant: str | None = None, rerank_k: int = 0,
+                      chunk_rows: int | None = None):
+    """
+    정상 벡터 kNN 검색용 인덱스 (src/knn.py).
+    quant 가 없으면 float32 memmap 을 ChunkedFlatIndex 로 감싸 chunk 단위로 검색한다.
+    chunk_rows 기본값은 SKYSHIELD_KNN_CHUNK_ROWS (8192).
+    """
+    if chunk_rows is None:
+        chunk_rows = int(os.getenv("SKYSHIELD_KNN_CHUNK_ROWS", "8192"))
+
+    if quant is not None:
+        index = load_normal_memmap(embed_model, quant=quant, rerank_k=rerank_k)
+        index.chunk_rows = chunk_rows
+        return index
+    return ChunkedFlatIndex(load_normal_memmap(embed_model), chunk_rows=chunk_rows)
 
 
 # ------------------------------------------------------------
 # 7) Adaptive Threshold (기존 Streamlit 부드러운 S-curve)
 # ------------------------------------------------------------
+# S-curve 상수 (calibrate_thresholds.py 가 같은 값을 벡터화해서 사용)
+LENGTH_BOOST = 0.18
+LENGTH_SLOPE = 0.03
+LENGTH_MID = 60
+ADAPTIVE_MAX = 0.90
+
+
 def get_length_adaptive_threshold(base_thr: float, text: str) -> float:
     L = len(text)
-    boost = 0.18 * (1 / (1 + math.exp(-0.03 * (L - 60))))
-    return min(0.90, base_thr + boost)
+    boost = LENGTH_BOOST * (1 / (1 + math.exp(-LENGTH_SLOPE * (L - LENGTH_MID))))
+    return min(ADAPTIVE_MAX, base_thr + boost)
+
+
+def length_boost(lengths, amp: float = LENGTH_BOOST):
+    """텍스트 길이 배열 → S-curve boost 배열 (get_length_adaptive_threshold 의 벡터판)."""
+    lengths = np.asarray(lengths, dtype="float64")
+    return amp / (1 + np.exp(-LENGTH_SLOPE * (lengths - LENGTH_MID)))
+
+
+# ------------------------------------------------------------
+# 8) 민감도 기반 Novel / Suspicious 기준
+# ------------------------------------------------------------
+def sensitivity_thresholds(sensitivity: float):
+    """민감도 기반 Novel / Suspicious 기준."""
+    novel_thr = 0.05 + 0.15 * sensitivity
+    susp_thr = novel_thr + (0.20 + 0.20 * sensitivity)
+    return novel_thr, susp_thr
@@ -1,11 +1,19 @@
+"""
+plotly 시각화 (노트북 / 오프라인 분석용).
+
+UMAP 은 여기서 학습하지 않는다. precompute_jailbreak.py 가 저장한 투영
+(src/projection.py, utils.load_projection) 의 좌표를 그대로 쓰고
+입력 벡터만 transform 한다. plotly / pandas 는 처음 그릴 때 import.
+"""
+
 import numpy as np
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import umap.umap_ as umap
+
+from .projection import KIND_NAMES
+from .registry import registry
 
 
 def plot_radar(center_sims, cluster_ids):
+    go = registry.get("plotly-go")
     fig = go.Figure()
 
     fig.add_trace(go.Scatterpolar(
@@ -21,32 +29,32 @@ def plot_radar(center_sims, cluster_ids):
     return fig
 
 
-def plot_umap(atk_vec, norm_vec, user_vec, decision, centers):
-    reducer = umap.UMAP(metric="cosine", random_state=42)
-
-    atk_s = atk_vec[:1500]
-    norm_s = norm_vec[:1500]
-
-    all_vec = np.vstack([atk_s, norm_s, [user_vec]])
-    labels = ["공격"] * len(atk_s) + ["정상"] * len(norm_s) + ["입력"]
-
-    points = reducer.fit_transform(all_vec)
+def plot_umap(projection, user_vec, decision, center_ids=None, center_coords=None):
+    """
+    projection : Projection2D (utils.load_projection)
+    center_ids / center_coords 를 주지 않으면 투영 번들에 저장된 중심을 사용.
+    """
+    pd = registry.get("pandas")
+    px = registry.get("plotly-express")
+    go = registry.get("plotly-go")
 
+    points = np.asarray(projection.coords)
     df = pd.DataFrame({
         "x": points[:, 0],
         "y": points[:, 1],
-        "type": labels
+        "type": [KIND_NAMES[int(k)] for k in projection.kinds],
     })
 
     fig = px.scatter(df, x="x", y="y", color="type", opacity=0.65)
 
-    # 입력 표시
+    # 입력 표시 (저장된 투영으로 transform 만)
+    user_2d = projection.transform(user_vec)[0]
     color_map = {"BLOCK": "red", "REVIEW": "orange", "ALLOW": "green", "SUSPICIOUS": "orange", "NOVEL_ATTACK": "red"}
 
     fig.add_trace(
         go.Scatter(
-            x=[points[-1, 0]],
-            y=[points[-1, 1]],
+            x=[user_2d[0]],
+            y=[user_2d[1]],
             mode="markers+text",
             marker=dict(size=22, symbol="star", color=color_map.get(decision, "blue")),
             text=[f"입력 ({decision})"],
@@ -55,8 +63,9 @@ def plot_umap(atk_vec, norm_vec, user_vec, decision, centers):
     )
 
     # 클러스터 중심 표시
-    for cid, c in centers.items():
-        c2d = reducer.transform([c])[0]
+    if center_ids is None:
+        center_ids, center_coords = projection.center_ids, projection.center_coords
+    for cid, c2d in zip(center_ids, center_coords):
         fig.add_trace(
             go.Scatter(
                 x=[c2d[0]], y=[c2d[1]],
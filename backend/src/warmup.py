@@ -0,0 +1,72 @@
+"""
+서버 시작 시 (embed_model, summ_model) 조합 미리 로드 + 준비 상태 추적.
+
+    SKYSHIELD_WARMUP="OpenAI Embedding|OpenAI,sentence-transformers|Google Gemini"
+
+- 각 조합의 단계별 로드 시간과 상태(pending / loading / ready / error)를 기록
+- /ready 엔드포인트가 이 상태를 그대로 보고
+"""
+
+import time
+import threading
+
+
+def parse_warmup_pairs(spec: str):
+    """'embed|summ,embed|summ' → [(embed, summ), ...]"""
+    pairs = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "|" not in item:
+            raise ValueError(f"SKYSHIELD_WARMUP 항목 형식이 잘못되었습니다 (embed|summ): {item!r}")
+        embed_model, summ_model = (x.strip() for x in item.split("|", 1))
+        pairs.append((embed_model, summ_model))
+    return pairs
+
+
+class ModelLoadState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def register(self, embed_model, summ_model):
+        key = f"{embed_model}|{summ_model}"
+        with self._lock:
+            self._models.setdefault(key, {
+                "embed_model": embed_model,
+                "summ_model": summ_model,
+                "status": "pending",
+                "load_seconds": {},
+                "error": None,
+            })
+        return key
+
+    def run_stage(self, key, stage, fn, *args):
+        """단계 하나를 실행하고 소요 시간을 기록."""
+        with self._lock:
+            self._models[key]["status"] = "loading"
+
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            self._models[key]["load_seconds"][stage] = round(elapsed, 4)
+        return result
+
+    def mark(self, key, status, error=None):
+        with self._lock:
+            self._models[key]["status"] = status
+            self._models[key]["error"] = error
+
+    def is_ready(self):
+        with self._lock:
+            return all(m["status"] == "ready" for m in self._models.values())
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {**m, "load_seconds": dict(m["load_seconds"])}
+                for m in self._models.values()
+            ]
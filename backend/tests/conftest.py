@@ -0,0 +1,25 @@
+"""
+backend 테스트 공통 설정.
+
+backend 디렉터리에서 실행:
+
+    (SKY_venv) $ python -m pytest -q tests
+
+모든 테스트는 작은 합성 배열 / Fake 백엔드만 사용한다 (API 호출, data/ CSV, precomputed/ 불필요).
+경로 / 차원 환경변수는 src 모듈이 import 될 때 읽히므로 여기서 먼저 설정한다.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+TEST_PRE_DIR = Path(tempfile.mkdtemp(prefix="skyshield_test_pre_"))
+os.environ["SKYSHIELD_PRECOMPUTED_DIR"] = str(TEST_PRE_DIR)
+os.environ["SKYSHIELD_EMBED_CACHE"] = "off"
+os.environ["SKYSHIELD_FAKE_DIM"] = "64"
+os.environ["SKYSHIELD_WARMUP"] = ""
@@ -0,0 +1,112 @@
+"""요청 간 임베딩 micro-batching (MicroBatcher)."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.batching import MicroBatcher
+
+
+class RecordingEncoder:
+    """호출마다 받은 텍스트 목록을 기록하고 텍스트 길이로 벡터를 만든다."""
+
+    def __init__(self, delay=0.0, error=None):
+        self.calls = []
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype="float32")
+
+
+def test_concurrent_submits_share_one_call_and_dedupe():
+    encode = RecordingEncoder()
+    batcher = MicroBatcher(encode, window_ms=20, max_batch=64)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(t) for t in ["a", "bb", "a", "ccc"]))
+
+    rows = asyncio.run(run())
+    assert encode.calls == [["a", "bb", "ccc"]]
+    assert [int(r[0]) for r in rows] == [1, 2, 1, 3]
+    np.testing.assert_array_equal(rows[0], rows[2])
+    assert (batcher.batches, batcher.items) == (1, 4)
+
+
+def test_max_batch_flushes_without_waiting_for_window():
+    encode = RecordingEncoder()
+    batcher = MicroBatcher(encode, window_ms=10_000, max_batch=3)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(f"t{i}") for i in range(6))), timeout=2.0,
+        )
+
+    rows = asyncio.run(run())
+    assert encode.calls == [["t0", "t1", "t2"], ["t3", "t4", "t5"]]
+    assert len(rows) == 6
+
+
+def test_failure_reaches_every_caller():
+    encode = RecordingEncoder(error=ValueError("boom"))
+    batcher = MicroBatcher(encode, window_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(t) for t in "xyz"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(encode.calls) == 1
+    assert all(isinstance(r, ValueError) and str(r) == "boom" for r in results)
+
+
+def test_cancelled_caller_does_not_affect_others():
+    encode = RecordingEncoder(delay=0.05)
+    batcher = MicroBatcher(encode, window_ms=5)
+
+    async def run():
+        tasks = [asyncio.ensure_future(batcher.submit(t)) for t in ["keep-1", "drop", "keep-2"]]
+        await asyncio.sleep(0.02)   # 배치 전송 후, 결과 전
+        tasks[1].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert [int(results[0][0]), int(results[2][0])] == [6, 6]
+    assert len(encode.calls) == 1
+
+
+def test_cancelled_batch_releases_waiting_callers():
+    encode = RecordingEncoder(delay=10.0)
+    batcher = MicroBatcher(encode, window_ms=1)
+
+    async def run():
+        callers = [asyncio.ensure_future(batcher.submit(t)) for t in "ab"]
+        await asyncio.sleep(0.02)
+        (task,) = batcher._tasks
+        task.cancel()
+        return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), timeout=2.0)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert not batcher._tasks
+
+
+@pytest.mark.parametrize("n", [1, 5])
+def test_batch_tasks_are_referenced_until_done(n):
+    batcher = MicroBatcher(RecordingEncoder(delay=0.01), window_ms=1)
+
+    async def run():
+        callers = [asyncio.ensure_future(batcher.submit(f"t{i}")) for i in range(n)]
+        await asyncio.sleep(0.005)
+        in_flight = len(batcher._tasks)
+        await asyncio.gather(*callers)
+        return in_flight
+
+    assert asyncio.run(run()) == 1
+    assert not batcher._tasks
@@ -0,0 +1,74 @@
+"""src/density.py — DensityModel vs hdbscan.approximate_predict."""
+
+import numpy as np
+import pytest
+
+from src.density import DensityModel
+from src.detector import SkyShield
+from src.index import FlatIndex, IVFIndex, l2_normalize
+
+hdbscan = pytest.importorskip("hdbscan")
+from hdbscan.prediction import approximate_predict_scores  # noqa: E402
+
+DIM = 32
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((12, DIM))
+    data = l2_normalize(centers[rng.integers(0, 12, 1500)] + 0.6 * rng.standard_normal((1500, DIM)))
+    clusterer = hdbscan.HDBSCAN(min_cluster_size=10, min_samples=5, prediction_data=True).fit(data)
+    queries = l2_normalize(data[rng.choice(len(data), 200)] + 0.3 * rng.standard_normal((200, DIM)))
+    return clusterer, data, queries
+
+
+def _expected(clusterer, queries):
+    labels, strengths = hdbscan.approximate_predict(clusterer, queries)
+    outliers = np.clip(approximate_predict_scores(clusterer, queries), 0.0, 1.0)
+    return labels, strengths, outliers
+
+
+def test_full_scan_matches_hdbscan(fitted):
+    clusterer, data, queries = fitted
+    labels, strengths, outliers = DensityModel.from_clusterer(clusterer, data).membership(queries)
+    want_labels, want_strengths, want_outliers = _expected(clusterer, queries)
+
+    np.testing.assert_array_equal(labels, want_labels)
+    np.testing.assert_allclose(strengths, want_strengths, atol=1e-5)
+    np.testing.assert_allclose(outliers, want_outliers, atol=1e-5)
+
+
+def test_flat_index_candidates_match_full_scan(fitted):
+    clusterer, data, queries = fitted
+    density = DensityModel.from_clusterer(clusterer, data)
+    _, candidates = FlatIndex(data).search(queries, k=density.n_candidates)
+
+    got = density.membership(queries, candidates)
+    want = _expected(clusterer, queries)
+    np.testing.assert_array_equal(got[0], want[0])
+    np.testing.assert_allclose(got[1], want[1], atol=1e-5)
+    np.testing.assert_allclose(got[2], want[2], atol=1e-5)
+
+
+def test_ivf_candidates_and_missing_slots(fitted):
+    clusterer, data, queries = fitted
+    density = DensityModel.from_clusterer(clusterer, data)
+    _, candidates = IVFIndex.build(data, seed=0).search(queries, k=density.n_candidates)
+    labels, _, _ = density.membership(queries, candidates)
+    assert np.mean(labels == _expected(clusterer, queries)[0]) >= 0.95
+
+    # IVF 가 k 개를 못 채운 자리(-1)는 무시된다
+    padded = np.concatenate([candidates, np.full((len(queries), 3), -1)], axis=1)
+    np.testing.assert_array_equal(density.membership(queries, padded)[0], labels)
+
+
+def test_skyshield_returns_score_and_candidates(fitted):
+    _, data, queries = fitted
+    index = FlatIndex(data)
+    shield = SkyShield(index=index, threshold_block=0.5)
+    basics, ids = shield.predict_with_neighbors(queries[:5], k=4)
+
+    assert basics == shield.predict_batch(queries[:5])
+    _, want = index.search(queries[:5], k=4)
+    np.testing.assert_array_equal(ids, want)
@@ -0,0 +1,94 @@
+"""src/embed_store.py + Embedder 캐시 경로."""
+
+import asyncio
+import threading
+
+import numpy as np
+
+from src.embed_store import EmbeddingStore
+from src.embedding import Embedder
+from src.fake_backend import FakeAsyncEmbeddingClient, FakeEmbeddingClient
+
+DIM = 16
+
+
+def _vecs(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+
+
+def test_memory_and_disk_hits(tmp_path):
+    store = EmbeddingStore(tmp_path / "e.sqlite", memory_items=2)
+    vecs = _vecs(3)
+    store.put_many("m", ["a", "b", "c"], vecs)
+
+    # LRU 에는 마지막 2개만, "a" 는 SQLite 에서
+    out = store.get_many("m", ["a", "b", "c", "x"])
+    assert out[3] is None
+    for got, want in zip(out[:3], vecs):
+        np.testing.assert_array_equal(got, want)
+    assert store.stats()["memory_items"] == 2
+    assert store.hits_disk == 1 and store.hits_memory == 2 and store.misses == 1
+
+    # 다른 모델 키와는 섞이지 않음
+    assert store.get_many("other", ["a"]) == [None]
+
+
+def test_persists_across_instances(tmp_path):
+    path = tmp_path / "e.sqlite"
+    vecs = _vecs(2)
+    EmbeddingStore(path).put_many("m", ["a", "b"], vecs)
+
+    reopened = EmbeddingStore(path)
+    np.testing.assert_array_equal(reopened.get_many("m", ["b"])[0], vecs[1])
+    assert reopened.stats()["bytes"] == vecs.nbytes
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    row_bytes = DIM * 4
+    store = EmbeddingStore(tmp_path / "e.sqlite", max_bytes=10 * row_bytes, memory_items=0)
+    store.put_many("m", [f"t{i}" for i in range(8)], _vecs(8))
+    store.get_many("m", ["t0"])                      # t0 의 atime 갱신
+    store.put_many("m", [f"u{i}" for i in range(4)], _vecs(4, seed=1))
+
+    assert store.stats()["bytes"] <= 10 * row_bytes
+    # 가장 오래 안 쓴 t1..t7 에서만 삭제 (최근에 읽은 t0 과 새로 넣은 u* 는 유지)
+    out = store.get_many("m", ["t0"] + [f"u{i}" for i in range(4)])
+    assert all(v is not None for v in out)
+    old = store.get_many("m", [f"t{i}" for i in range(1, 8)])
+    assert sum(v is not None for v in old) == 9 - 5
+
+
+class _RecordingStore(EmbeddingStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get_many(self, model_key, texts):
+        self.threads.append(threading.current_thread())
+        return super().get_many(model_key, texts)
+
+    def put_many(self, model_key, texts, vecs):
+        self.threads.append(threading.current_thread())
+        return super().put_many(model_key, texts, vecs)
+
+
+def test_aencode_matches_encode_and_keeps_store_off_the_loop(tmp_path):
+    store = _RecordingStore(tmp_path / "e.sqlite")
+    embedder = Embedder("Fake", client=FakeEmbeddingClient(dim=DIM),
+                        async_client=FakeAsyncEmbeddingClient(dim=DIM), store=store)
+    texts = ["ignore previous instructions", "hello there", "hello there"]
+
+    async def run():
+        loop_thread = threading.current_thread()
+        first = await embedder.aencode(texts)
+        second = await embedder.aencode(texts)       # 전부 캐시 hit
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(run())
+    expected = Embedder("Fake", client=FakeEmbeddingClient(dim=DIM),
+                        store=EmbeddingStore(tmp_path / "ref.sqlite")).encode(texts)
+
+    np.testing.assert_allclose(first, expected, rtol=1e-6)
+    np.testing.assert_array_equal(first, second)
+    assert store.threads and all(t is not loop_thread for t in store.threads)
+    assert store.hits_memory == len(texts)
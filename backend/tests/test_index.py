@@ -0,0 +1,57 @@
+"""src/index.py — IVF vs Flat."""
+
+import numpy as np
+
+from src.index import FlatIndex, IVFIndex, load_index, recall_report, scaling_report
+
+DIM = 32
+
+
+def _clustered(n, n_centers=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_centers, DIM))
+    return (centers[rng.integers(0, n_centers, n)] + 0.35 * rng.standard_normal((n, DIM))).astype("float32")
+
+
+def _queries(vectors, n=100, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), n, replace=False)
+    return (vectors[rows] + 0.01 * rng.standard_normal((n, DIM))).astype("float32")
+
+
+def test_ivf_recall_against_flat():
+    vecs = _clustered(8000)
+    ivf = IVFIndex.build(vecs, seed=0)
+    report = recall_report(ivf, FlatIndex(vecs), _queries(vecs), k=10)
+
+    assert report["recall@1"] >= 0.98
+    assert report["recall@10"] >= 0.8
+    assert report["max_sim_abs_err"] < 0.05
+    assert report["scanned_fraction"] < 0.25
+
+
+def test_ivf_scanned_grows_like_sqrt_n():
+    vecs = _clustered(16000)
+    rows = scaling_report(vecs, _queries, [1000, 4000, 16000], k=10)
+
+    assert [r["nprobe"] for r in rows] == [rows[0]["nprobe"]] * 3
+    ratio = [r["scanned_per_sqrt_n"] for r in rows]
+    # N 이 16 배 → 훑는 벡터 수는 ~4 배 (선형이면 16 배)
+    assert max(ratio) / min(ratio) < 1.5
+    assert rows[-1]["scanned_per_query"] / rows[0]["scanned_per_query"] < 6
+    assert all(r["recall@1"] >= 0.95 for r in rows)
+
+
+def test_ivf_add_and_roundtrip(tmp_path):
+    vecs = _clustered(3000)
+    extra = _clustered(50, seed=7)
+    ivf = IVFIndex.build(vecs, seed=0).add(extra)
+
+    # 새 행은 len(vecs) 부터 이어지는 번호로 검색된다
+    _, ids = ivf.search(extra, k=1)
+    assert np.mean(ids[:, 0] == np.arange(len(vecs), len(vecs) + len(extra))) >= 0.98
+
+    loaded = load_index(ivf.save(tmp_path / "attack.ivf"))
+    assert isinstance(loaded, IVFIndex) and loaded.nprobe == ivf.nprobe
+    q = _queries(vecs, n=20)
+    np.testing.assert_array_equal(loaded.search(q, k=5)[1], ivf.search(q, k=5)[1])
@@ -0,0 +1,53 @@
+"""src/knn.py — 공격 / 정상 양쪽 kNN 점수."""
+
+import numpy as np
+
+from src.index import FlatIndex, IVFIndex
+from src.knn import TwoSidedScorer
+
+DIM = 16
+K = 10
+
+
+def _vectors(n, seed):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+
+
+def _expected(sims):
+    return float(sims.mean()), float(sims.max())
+
+
+def test_ivf_padding_is_ignored():
+    atk = _vectors(60, 0)
+    # 리스트당 평균 2~3 행, nprobe=1 → top-10 대부분이 (-1, -1) 패딩
+    ivf = IVFIndex.build(atk, n_lists=24, nprobe=1)
+    normal = FlatIndex(_vectors(200, 1))
+    query = atk[:5] + 0.01 * _vectors(5, 2)
+
+    sims, ids = ivf.search(query, k=K)
+    assert (ids == -1).any()
+
+    scorer = TwoSidedScorer(ivf, normal, k=K)
+    n_sims, _ = normal.search(query, k=K)
+    for row, knn in enumerate(scorer.score(query)):
+        real = sims[row][ids[row] >= 0]
+        attack_sim, attack_max = _expected(real)
+        assert np.isclose(knn["attack_sim"], attack_sim)
+        assert np.isclose(knn["attack_max"], attack_max)
+        assert np.isclose(knn["margin"], attack_sim - float(n_sims[row].mean()))
+
+        merged = np.concatenate([real, n_sims[row]])
+        top = np.argsort(-merged)[:K]
+        assert np.isclose(knn["attack_vote"], float((top < len(real)).mean()))
+
+
+def test_matches_plain_means_without_padding():
+    atk, normal = FlatIndex(_vectors(100, 3)), FlatIndex(_vectors(100, 4))
+    query = _vectors(3, 5)
+    a_sims, _ = atk.search(query, k=K)
+    n_sims, _ = normal.search(query, k=K)
+
+    for row, knn in enumerate(TwoSidedScorer(atk, normal, k=K).score(query)):
+        assert np.isclose(knn["attack_sim"], a_sims[row].mean())
+        assert np.isclose(knn["normal_max"], n_sims[row][0])
+        assert np.isclose(knn["margin"], a_sims[row].mean() - n_sims[row].mean())
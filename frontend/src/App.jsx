@@ -82,7 +82,8 @@ function App() {
       const basicDecision = data.decision_basic || "ALLOW";
       const clusterDecision = data.cluster_decision || "KNOWN_ATTACK";
 
-      const umapData = generateUMAPData(finalDecision);
+      const umapData =
+        (await fetchUMAPData(backendUrl)) || generateUMAPData(finalDecision);
       const radarData = generateRadarData(finalDecision);
 
       setResult({
@@ -137,7 +138,38 @@ function App() {
     }
   };
 
-  // ---- UMAP용 더미 데이터 (피그마 스타일에 맞춤) ----
+  // ---- UMAP: 서버에 저장된 투영으로 입력 위치만 계산 (/visualize) ----
+  async function fetchUMAPData(backendUrl) {
+    try {
+      const response = await fetch(`${backendUrl}/visualize`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify({
+          text: prompt,
+          embed_model: embeddingModel,
+          summ_model: summarizerModel,
+        }),
+      });
+      if (!response.ok) return null;
+
+      const data = await response.json();
+      return [
+        ...data.points.map((p) => ({ ...p, label: p.type })),
+        ...data.centers.map((c) => ({
+          ...c,
+          label: c.label || `C${c.cluster_id}`,
+        })),
+        { ...data.input, label: "입력" },
+      ];
+    } catch (e) {
+      console.error("UMAP 요청 중 오류:", e);
+      return null;
+    }
+  }
+
+  // ---- UMAP용 더미 데이터 (피그마 스타일에 맞춤, /visualize 실패 시) ----
   function generateUMAPData(decision) {
     const data = [];
 
@@ -753,6 +785,13 @@ function App() {
                               fill="#6366f1"
                               opacity={0.5}
                             />
+                            <Scatter
+                              name="클러스터 중심"
+                              data={result.umapData.filter(
+                                (d) => d.type === "중심"
+                              )}
+                              fill="#111827"
+                            />
                             <Scatter
                               name="입력"
                               data={result.umapData.filter(